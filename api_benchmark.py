@@ -0,0 +1,154 @@
+"""
+Throughput benchmark for the estimation API.
+
+Starts `estimation_api.py` in a separate process backed by
+`fake_bigquery.FakeBigQueryClient`, fires random scenarios at it from
+`--concurrency` concurrent clients and reports requests/sec, scenarios/sec
+and p50/p99 latency per endpoint. The first request of each run loads the
+active users data; it is excluded (see "warm-up").
+
+Usage:
+    python api_benchmark.py --requests 2000 --concurrency 32 --batch-size 100
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import random
+import socket
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from fake_bigquery import PLATFORMS, STATES
+from filter_engine import CAMPAIGN_TYPE_MAP
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(port: int, rows: int, latency: float):
+    from aiohttp import web
+    from fake_bigquery import FakeBigQueryClient, install_fake_client
+    from streamlit.logger import set_log_level
+
+    import estimation_api
+
+    set_log_level("error")
+    install_fake_client(FakeBigQueryClient(latency=latency, active_users_rows=rows))
+    web.run_app(estimation_api.create_app(), host="127.0.0.1", port=port, print=None)
+
+
+def random_scenario(rng: random.Random) -> Dict:
+    filters = {
+        "platform": rng.choice(PLATFORMS),
+        "campaign_type": rng.choice(list(CAMPAIGN_TYPE_MAP)),
+        "gender": rng.choice(["Male", "Female", "Mixed"]),
+    }
+    if rng.random() < 0.3:
+        filters["locations"] = rng.sample(STATES, 3)
+    return {
+        "filters": filters,
+        "product_desirability": rng.randint(1, 10),
+        "utility_score": rng.randint(1, 10),
+        "average_price": rng.choice([None, 150, 450, 1200]),
+    }
+
+
+async def _run(url: str, requests: int, concurrency: int, batch_size: int, seed: int) -> Dict:
+    import aiohttp
+
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors = 0
+    pending = list(range(requests))
+
+    async with aiohttp.ClientSession() as session:
+        async def post(payload):
+            nonlocal errors
+            started = time.perf_counter()
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            return time.perf_counter() - started
+
+        def payload():
+            if batch_size > 1:
+                return {"scenarios": [random_scenario(rng) for _ in range(batch_size)]}
+            return random_scenario(rng)
+
+        warmup = await post(payload())
+
+        async def client():
+            while pending:
+                pending.pop()
+                latencies.append(await post(payload()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "warmup_ms": warmup * 1000,
+        "requests_per_s": len(latencies) / wall,
+        "scenarios_per_s": len(latencies) * batch_size / wall,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def _wait_for(port: int, timeout_s: float = 30):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("estimation API did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--batch-size", type=int, default=100, help="Scenarios per batch request")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows of the active users data")
+    parser.add_argument("--latency", type=float, default=0.5, help="Injected seconds per warehouse query")
+    args = parser.parse_args(argv)
+
+    port = _free_port()
+    server = mp.get_context("spawn").Process(target=_serve, args=(port, args.rows, args.latency), daemon=True)
+    server.start()
+    try:
+        _wait_for(port)
+        runs = [
+            ("filtered-count", 1),
+            ("collaborations", 1),
+            ("collaborations/batch", args.batch_size),
+        ]
+        header = f"{'endpoint':<24}{'requests':>9}{'errors':>7}{'req/s':>9}{'scen/s':>10}{'p50 ms':>8}{'p99 ms':>8}{'warm-up ms':>12}"
+        print(header)
+        print("-" * len(header))
+        for seed, (endpoint, batch_size) in enumerate(runs):
+            r = asyncio.run(_run(
+                f"http://127.0.0.1:{port}/v1/{endpoint}", args.requests, args.concurrency, batch_size, seed
+            ))
+            print(
+                f"{endpoint:<24}{r['requests']:>9}{r['errors']:>7}{r['requests_per_s']:>9.0f}"
+                f"{r['scenarios_per_s']:>10.0f}{r['p50_ms']:>8.1f}{r['p99_ms']:>8.1f}{r['warmup_ms']:>12.0f}"
+            )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
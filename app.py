@@ -1,26 +1,38 @@
 """
 Streamlit app for BigQuery data querying and predictions.
+
+Keep module-level imports light: this file is imported on every cold start.
+Heavy dependencies (scikit-learn, the BigQuery client) load on first use.
 """
-# Workaround for numpy.fft import issue with numpy 2.0+
-try:
-    import numpy
-    # Fix for numpy 2.0 compatibility issue
-    if not hasattr(numpy.fft, '__all__'):
-        numpy.fft.__all__ = [
-            'fft', 'ifft', 'fft2', 'ifft2', 'fftn', 'ifftn',
-            'rfft', 'irfft', 'rfft2', 'irfft2', 'rfftn', 'irfftn',
-            'hfft', 'ihfft', 'fftfreq', 'rfftfreq', 'fftshift', 'ifftshift'
-        ]
-except (ImportError, AttributeError):
-    pass
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import os
-from bigquery_utils import query_bigquery, active_users_query
-from predictor import PRODUCT_UTILITY_SCORE, BRAND_SCORE
-from feasibility import calculate_feasibility
-from multiplier_calc import calculate_collaborations, DEFAULT_SAFETY_NUMBER
+from bigquery_utils import (
+    query_bigquery, shared_query, cached_query, today_utc, count_script_run, render_queue_status, render_scan_estimate,
+    render_scan_usage, summary_users_query, summary_sample_query, active_users_table_query, user_profiles_query, campaign_history_query,
+    creators_query, creator_activity_query,
+    USER_PROFILE_COLUMNS, PROGRESSIVE_SAMPLE_PERCENT, BACKGROUND, LOCAL_CACHE_TTL_S, QUERY_CACHE_TTL_S
+)
+from scores import PRODUCT_UTILITY_SCORE, BRAND_SCORE
+from dashboard_common.facets import FacetIndex, format_option
+from filter_engine import CAMPAIGN_TYPE_MAP, PLATFORM_OPTIONS, selection_mask, demographic_mask, active_users_mask
+from dashboard_common.rerun_timing import timed, render_timings, FULL_RUN
+from dashboard_common.prewarm import Prewarmer, UsageLog, PREWARM_INTERVAL_S, render_prewarm_status
+from lazy_columns import LazyColumns
+from sampling import SampleCounter
+from forecast_table import table_path, load_forecast_table, ensure_forecast_table
+from bitmaps import SegmentIndex
+from creator_index import CreatorIndex
+from propensity import propensity_scores
+from segments import CreatorSegments, SEGMENT_BINS, SEGMENT_LABELS, describe_selection
+from pincodes import LOCATION_COLUMNS, ensure_pincode_dimension, get_pincode_dimension, parse_pincode_prefixes
+from feasibility import calculate_feasibility, get_participation_rate
+from simulation import simulate_collaborations, DEFAULT_TRIALS
+from multiplier_calc import calculate_collaborations, campaign_factor, DEFAULT_SAFETY_NUMBER
 
 
 # Page configuration - must be called before any other Streamlit commands
@@ -36,6 +48,305 @@ except Exception:
     pass
 
 
+# Dropdown options until active users are loaded; afterwards the options
+# and their counts come from the facet index of the loaded data
+INDIAN_STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh",
+    "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand",
+    "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab",
+    "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal",
+    "Andaman and Nicobar Islands", "Chandigarh", "Dadra and Nagar Haveli",
+    "Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh",
+    "Lakshadweep", "Puducherry"
+]
+
+
+def update_user_facets(df, as_of_date):
+    """Build the facet index of the active users data once per as-of date"""
+    if st.session_state.get('user_facets_as_of') == as_of_date:
+        return
+    st.session_state.user_facets = FacetIndex(df, ['platform', 'execution_type', 'state'])
+    # Rows the Summary Dashboard counts (accepted_180 > 0 AND completed_180 > 0)
+    if 'accepted_180' in df.columns and 'completed_180' in df.columns:
+        st.session_state.user_facets_active = ((df['accepted_180'] > 0) & (df['completed_180'] > 0)).to_numpy()
+    else:
+        st.session_state.user_facets_active = None
+    st.session_state.user_facets_as_of = as_of_date
+
+
+def platform_values(facets, platform):
+    """Data platforms the Summary platform filter matches (case-insensitive contains)"""
+    return [v for v in facets.values['platform'] if platform.lower() in str(v).lower()]
+
+
+def summary_facet_counts(facets, active, platform, campaign_type):
+    """
+    Active users per Summary dropdown option, each under the other dropdown's
+    choice: (campaign type counts, platform counts, state counts).
+    """
+    execution_types = CAMPAIGN_TYPE_MAP.get(campaign_type, [])
+    platform_selection = platform_values(facets, platform) or [None]
+
+    by_execution = facets.counts('execution_type', {'platform': platform_selection}, base=active)
+    campaign_counts = pd.Series({
+        label: int(by_execution.reindex(values, fill_value=0).sum())
+        for label, values in CAMPAIGN_TYPE_MAP.items()
+    })
+
+    by_platform = facets.counts('platform', {'execution_type': execution_types or [None]}, base=active)
+    platform_counts = pd.Series({
+        option: int(by_platform[by_platform.index.str.lower().str.contains(option.lower(), regex=False)].sum())
+        for option in dict.fromkeys(PLATFORM_OPTIONS + list(facets.values['platform']))
+    })
+
+    state_counts = None
+    if 'state' in facets.columns:
+        state_counts = facets.counts(
+            'state', {'platform': platform_selection, 'execution_type': execution_types or [None]}, base=active
+        )
+    return campaign_counts, platform_counts, state_counts
+
+
+CAMPAIGN_HISTORY_TTL_S = 24 * 60 * 60
+
+
+@st.cache_data(ttl=CAMPAIGN_HISTORY_TTL_S, show_spinner=False)
+def load_campaign_history():
+    """Historical campaigns used to train the collaboration model (cached for a day)"""
+    return shared_query(campaign_history_query, fresh_s=CAMPAIGN_HISTORY_TTL_S)
+
+
+@st.cache_resource(show_spinner=False)
+def load_collaboration_model(history):
+    """Load the fitted model for `history` from the registry, training it only once"""
+    from predictor import ModelRegistry
+    return ModelRegistry().get_or_train(history)
+
+
+@st.cache_resource
+def get_usage_log():
+    """Summary selections applied by users, read by the speculative prefetch"""
+    return UsageLog()
+
+
+@st.cache_data(ttl=LOCAL_CACHE_TTL_S, show_spinner=False)
+def summary_selection(as_of_date, platform, campaign_type):
+    """
+    Active users of a platform and campaign type as of `as_of_date`.
+
+    Returns (selected rows, filter steps). The most common selections are
+    prefetched, so applying one of them reads this cache. The rows carry a
+    `propensity` column, scored against the whole frame they were selected from.
+    """
+    df = cached_query(summary_users_query, {"as_of_date": as_of_date})
+    mask, steps = selection_mask(df, platform, CAMPAIGN_TYPE_MAP.get(campaign_type))
+    return df[mask].assign(propensity=propensity_scores(df)[mask]), steps
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_forecast_table(as_of_date, built_at):
+    return load_forecast_table(as_of_date)
+
+
+def get_forecast_table(as_of_date):
+    """The nightly forecast table for `as_of_date` (reloaded when rebuilt), or None"""
+    try:
+        built_at = os.path.getmtime(table_path(as_of_date))
+    except OSError:
+        return None
+    return _load_forecast_table(as_of_date, built_at)
+
+
+def filtered_rows(
+    as_of_date, platform, campaign_type, gender, locations, districts=None, pincode_prefixes=None, segments=None
+):
+    """Rows behind a Summary result, for the filtered data sample"""
+    selected_df, _ = summary_selection(as_of_date, platform, campaign_type)
+    base = get_creator_segments(as_of_date).mask(selected_df["user_id"], segments) if segments else None
+    mask, _ = demographic_mask(
+        selected_df, gender=gender, locations=locations, base=base,
+        districts=districts, pincode_prefixes=pincode_prefixes
+    )
+    return selected_df[mask]
+
+
+def propensity_sum(filtered_df):
+    """Expected collaborations of `filtered_df` at the reference campaign inputs (a masked sum)"""
+    return float(filtered_df["propensity"].to_numpy(dtype=np.float64).sum())
+
+
+@st.cache_resource(ttl=QUERY_CACHE_TTL_S, max_entries=4, show_spinner=False)
+def get_creator_segments(as_of_date):
+    """Recency/frequency/completion/tenure segments of every creator, built once per as-of date"""
+    activity = shared_query(creator_activity_query, {"as_of_date": as_of_date})
+    return CreatorSegments(activity, as_of_date)
+
+
+def segment_filters():
+    """
+    Optional creator segment filters; within a dimension any selected
+    segment matches, across dimensions all must.
+    """
+    selection = {}
+    with st.expander("🧭 Creator Segments (optional)"):
+        columns = st.columns(len(SEGMENT_BINS))
+        for column, (dimension, (_, _, labels, unknown)) in zip(columns, SEGMENT_BINS.items()):
+            with column:
+                selection[dimension] = st.multiselect(
+                    SEGMENT_LABELS[dimension], labels if unknown in labels else labels + [unknown],
+                    key=f"segment_{dimension}"
+                )
+    return {dimension: labels for dimension, labels in selection.items() if labels} or None
+
+
+def finer_location_filters(key_suffix, states):
+    """
+    Optional district and pincode-prefix filters under the state selection;
+    both are looked up locally from the postcode, so they cost no extra scan.
+    """
+    dimension = get_pincode_dimension()
+    districts = None
+    if dimension is not None:
+        districts = st.multiselect(
+            "Districts (optional)", dimension.districts_in(states or None), key=f"districts_{key_suffix}"
+        )
+    prefix_text = st.text_input(
+        "Pincode prefixes (optional)", key=f"pincode_prefixes_{key_suffix}", placeholder="e.g. 110, 4000",
+        help="Keep users whose postcode starts with any of these (comma or space separated)"
+    )
+    try:
+        pincode_prefixes = parse_pincode_prefixes(prefix_text)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        pincode_prefixes = None
+    return districts or None, pincode_prefixes or None
+
+
+@st.cache_resource(ttl=QUERY_CACHE_TTL_S, max_entries=4, show_spinner=False)
+def get_user_profiles(as_of_date):
+    """
+    Profile columns of the Active Users table, fetched by user_id for the rows
+    it shows and kept for every session of this as-of date's data.
+    """
+    return LazyColumns(
+        "user_id",
+        USER_PROFILE_COLUMNS + LOCATION_COLUMNS,
+        fetch_keys=lambda user_ids: query_bigquery(user_profiles_query(), {"user_ids": sorted(user_ids)}),
+        fetch_all=lambda: shared_query(user_profiles_query(by_key=False))
+    )
+
+
+# Without a forecast table, Apply waits this long for the exact count before
+# answering from the user sample; the exact count replaces it when ready
+EXACT_WAIT_S = 0.5
+EXACT_POLL_S = 1
+
+
+@st.cache_resource(ttl=QUERY_CACHE_TTL_S, max_entries=4, show_spinner=False)
+def get_user_sample(as_of_date):
+    """Sampled users of `as_of_date` (PROGRESSIVE_SAMPLE_PERCENT), kept in memory for every session"""
+    sample = shared_query(summary_sample_query, {"as_of_date": as_of_date})
+    return SampleCounter(sample, PROGRESSIVE_SAMPLE_PERCENT / 100)
+
+
+@st.cache_resource
+def get_exact_pool():
+    """Background exact counts behind approximate Summary results"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="exact-count")
+
+
+@st.fragment(run_every=EXACT_POLL_S)
+def exact_count_refresher():
+    """Replace the approximate Summary result with the exact one once it is computed"""
+    pending = st.session_state.get('pending_exact')
+    result = st.session_state.get('collaboration_result')
+    if pending is None or result is None or not pending['future'].done():
+        return
+    st.session_state.pending_exact = None
+    try:
+        filtered_df = pending['future'].result()
+    except Exception as e:
+        result['exact_error'] = str(e)
+        st.rerun()
+    print(f"✅ Exact filtered count: {len(filtered_df):,} users (estimated {result['filtered_count']:,})")
+    as_of_date = st.session_state.filtered_selection[0]
+    st.session_state.collaboration_result = calculate_collaborations(
+        filtered_count=len(filtered_df),
+        product_desirability=result['product_desirability'],
+        average_price=result['average_price'],
+        utility_score=result['utility_score'],
+        default_safety=result['default_safety'],
+        propensity_sum=propensity_sum(filtered_df)
+    )
+    st.session_state.filtered_df = filtered_df
+    update_user_facets(cached_query(summary_users_query, {"as_of_date": as_of_date}), as_of_date)
+    st.rerun()
+
+
+@st.cache_resource(ttl=QUERY_CACHE_TTL_S, max_entries=4, show_spinner=False)
+def get_segment_index(as_of_date):
+    """Audience segment bitmaps of the Summary Dashboard's active users, built once per as-of date"""
+    df = cached_query(summary_users_query, {"as_of_date": as_of_date})
+    active = ((df["accepted_180"] > 0) & (df["completed_180"] > 0)).to_numpy()
+    return SegmentIndex(df, base=active)
+
+
+@st.cache_resource(show_spinner=False)
+def get_creator_index():
+    return CreatorIndex()
+
+
+@st.cache_resource(ttl=LOCAL_CACHE_TTL_S, show_spinner=False)
+def refreshed_creator_index():
+    """The creator index, brought up to date with the creators query at most every LOCAL_CACHE_TTL_S"""
+    index = get_creator_index()
+    index.refresh(shared_query(creators_query))
+    return index
+
+
+# Summary selections prefetched from the usage log at each warm-up
+PREFETCH_SELECTIONS = 5
+
+
+def with_locations(task):
+    """`task` once the pincode dimension is built, so the results it caches have state and district"""
+    def run():
+        ensure_pincode_dimension()
+        return task()
+    return run
+
+
+def warm_active_users():
+    """Today's active users data, then the most common recent Summary selections"""
+    as_of_date = today_utc()
+    params = {"as_of_date": as_of_date}
+    shared_query(summary_users_query, params, priority=BACKGROUND)
+    cached_query(summary_users_query, params)
+    for platform, campaign_type in get_usage_log().top(("platform", "campaign_type"), n=PREFETCH_SELECTIONS):
+        summary_selection(as_of_date, platform, campaign_type)
+
+
+def warm_campaign_history():
+    shared_query(campaign_history_query, fresh_s=CAMPAIGN_HISTORY_TTL_S, priority=BACKGROUND)
+    load_campaign_history()
+
+
+@st.cache_resource(show_spinner=False)
+def start_prewarm():
+    """Warm the dashboard's queries in the background once per process (and every PREWARM_INTERVAL_S)"""
+    return Prewarmer({
+        "pincode dimension": ensure_pincode_dimension,
+        "active users + top selections": with_locations(warm_active_users),
+        "campaign history": warm_campaign_history,
+        "forecast table": with_locations(lambda: ensure_forecast_table(today_utc())),
+        "creator index": refreshed_creator_index,
+        "creator segments": lambda: get_creator_segments(today_utc()),
+        **({"user sample": with_locations(lambda: get_user_sample(today_utc()))} if summary_sample_query else {}),
+    }, PREWARM_INTERVAL_S).start()
+
+
 def apply_filters(df, product_utility, brand_score, price_comfort_min, price_comfort_max, 
                   quantity_min, quantity_max, num_products_min, num_products_max, asin_repeat):
     """Apply filters to the dataframe"""
@@ -50,575 +361,936 @@ def apply_filters(df, product_utility, brand_score, price_comfort_min, price_com
     return filtered_df
 
 
-def main():
-    # Initialize session state
-    if 'active_users_data' not in st.session_state:
-        st.session_state.active_users_data = None
-    if 'filtered_count' not in st.session_state:
-        st.session_state.filtered_count = 0
-    if 'collaboration_result' not in st.session_state:
-        st.session_state.collaboration_result = None
-    if 'filtered_df' not in st.session_state:
-        st.session_state.filtered_df = None
-    
-    st.title("📊 Collaboration Predictor Dashboard")
-    st.markdown("Analyze collaboration data and active users")
-    
-    # Main content area with tabs
-    tab1, tab2 = st.tabs(["📈 Summary Dashboard", "👥 Active Users"])
-    
-    # Tab 1: Summary Dashboard
-    with tab1:
-        st.header("📈 Summary Dashboard")
-        
-        # Top-level filters
-        st.subheader("🔍 Top-Level Filters")
-        top_col1, top_col2 = st.columns(2)
-        
-        with top_col1:
-            campaign_type = st.selectbox(
-                "Type of Campaign",
-                ["Barter", "Cashback", "Payout", "Barter with Payout", "Other"],
-                index=0
+@st.fragment
+@timed("summary dashboard")
+def summary_dashboard(as_of_date):
+    """Summary Dashboard tab; its widgets rerun only this fragment"""
+    active_users_params = {"as_of_date": as_of_date}
+    st.header("📈 Summary Dashboard")
+
+    # Top-level filters
+    st.subheader("🔍 Top-Level Filters")
+    top_col1, top_col2 = st.columns(2)
+
+    # Option counts (active users under the other choices) once data is loaded
+    campaign_counts = platform_counts = state_counts = None
+    if st.session_state.get('user_facets_as_of') == as_of_date:
+        campaign_counts, platform_counts, state_counts = summary_facet_counts(
+            st.session_state.user_facets,
+            st.session_state.user_facets_active,
+            st.session_state.get('summary_platform', PLATFORM_OPTIONS[0]),
+            st.session_state.get('summary_campaign_type', "Barter")
+        )
+
+    with top_col1:
+        campaign_type = st.selectbox(
+            "Type of Campaign",
+            ["Barter", "Cashback", "Payout", "Barter with Payout", "Other"],
+            index=0,
+            key="summary_campaign_type",
+            format_func=lambda v: format_option(v, campaign_counts)
+        )
+
+    with top_col2:
+        platform = st.selectbox(
+            "Platform",
+            PLATFORM_OPTIONS if platform_counts is None else list(platform_counts.index),
+            index=0,
+            key="summary_platform",
+            format_func=lambda v: format_option(v, platform_counts)
+        )
+
+    # States present in the data for this platform and campaign type
+    if state_counts is None:
+        state_options = INDIAN_STATES
+    else:
+        state_options = [s for s, n in state_counts.items() if n > 0]
+
+    st.divider()
+
+    # Conditional sub-filters based on platform
+    st.subheader("📋 Sub-Filters")
+
+    # Initialize filter variables
+    gender = None
+    avg_price_or_incentive = None
+    location_specific = None
+    locations = None
+    districts = pincode_prefixes = None
+    utility_score = None
+    product_desirability = None
+
+    if platform in ["instagram", "youtube"]:
+        # Filters for IG/YT platforms
+        st.write("**Platform: Instagram/YouTube Filters**")
+
+        filter_col1, filter_col2 = st.columns(2)
+
+        with filter_col1:
+            gender = st.selectbox("Gender", ["Male", "Female", "Mixed"], index=2)
+            utility_score = st.selectbox(
+                "Utility of the Product (out of 10)",
+                options=list(range(1, 11)),
+                index=4,  # Default to 5
+                key="utility_score_igyt"
             )
-            
-        with top_col2:
-            platform = st.selectbox(
-                "Platform",
-                [
-                    "youtube",
-                    "instagram",
-                    "content_creation",
-                    "ecommerce_website",
-                    "amazon",
-                    "flipkart",
-                    "myntra",
-                    "nykaa",
-                    "purplle",
-                    "healthkart",
-                    "sublime",
-                    "1mg",
-                    "snapdeal",
-                    "bigbasket",
-                    "swiggy",
-                    "tira",
-                    "swiggy_instamart",
-                    "blinkit",
-                    "zepto",
-                    "meesho",
-                    "jiomart",
-                    "firstcry"
-                ],
-                index=0
+            product_desirability = st.selectbox(
+                "Product Desirability (out of 10)",
+                options=list(range(1, 11)),
+                index=4,  # Default to 5
+                key="product_desirability_igyt"
             )
-        
-        st.divider()
-        
-        # Conditional sub-filters based on platform
-        st.subheader("📋 Sub-Filters")
-        
-        # Initialize filter variables
-        gender = None
-        avg_price_or_incentive = None
-        location_specific = None
-        locations = None
-        utility_score = None
-        product_desirability = None
-        
-        if platform in ["instagram", "youtube"]:
-            # Filters for IG/YT platforms
-            st.write("**Platform: Instagram/YouTube Filters**")
-            
-            filter_col1, filter_col2 = st.columns(2)
-            
-            with filter_col1:
-                gender = st.selectbox("Gender", ["Male", "Female", "Mixed"], index=2)
-                utility_score = st.selectbox(
-                    "Utility of the Product (out of 10)",
-                    options=list(range(1, 11)),
-                    index=4,  # Default to 5
-                    key="utility_score_igyt"
-                )
-                product_desirability = st.selectbox(
-                    "Product Desirability (out of 10)",
-                    options=list(range(1, 11)),
-                    index=4,  # Default to 5
-                    key="product_desirability_igyt"
-                )
-            
-            with filter_col2:
-                avg_price_or_incentive = st.number_input(
-                    "Total incentive amount (Please add the total price of the product or the amount incentive involved)",
-                    value=0,
-                    step=1,
-                    min_value=0,
-                    key="total_incentive_igyt"
+
+        with filter_col2:
+            avg_price_or_incentive = st.number_input(
+                "Total incentive amount (Please add the total price of the product or the amount incentive involved)",
+                value=0,
+                step=1,
+                min_value=0,
+                key="total_incentive_igyt"
+            )
+
+            location_specific = st.selectbox("Location Specific", ["Yes", "No"], index=1)
+
+            if location_specific == "Yes":
+                locations = st.multiselect(
+                    "Select Locations (States)", state_options, key="locations_igyt",
+                    format_func=lambda v: format_option(v, state_counts)
                 )
-                
-                location_specific = st.selectbox("Location Specific", ["Yes", "No"], index=1)
-                
-                if location_specific == "Yes":
-                    # Indian states list
-                    indian_states = [
-                        "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh",
-                        "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand",
-                        "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
-                        "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab",
-                        "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
-                        "Uttar Pradesh", "Uttarakhand", "West Bengal",
-                        "Andaman and Nicobar Islands", "Chandigarh", "Dadra and Nagar Haveli",
-                        "Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh",
-                        "Lakshadweep", "Puducherry"
-                    ]
-                    locations = st.multiselect("Select Locations (States)", indian_states)
-        
-        else:
-            # Filters for other platforms (Amazon, Nykaa, Flipkart, Blinkit)
-            st.write(f"**Platform: {platform} Filters**")
-            
-            filter_col1, filter_col2 = st.columns(2)
-            
-            with filter_col1:
-                gender = st.selectbox("Gender", ["Male", "Female", "Mixed"], index=2, key="gender_other")
-                utility_score = st.selectbox(
-                    "Utility of the Product (out of 10)",
-                    options=list(range(1, 11)),
-                    index=4,  # Default to 5
-                    key="utility_score"
+                districts, pincode_prefixes = finer_location_filters("igyt", locations)
+
+    else:
+        # Filters for other platforms (Amazon, Nykaa, Flipkart, Blinkit)
+        st.write(f"**Platform: {platform} Filters**")
+
+        filter_col1, filter_col2 = st.columns(2)
+
+        with filter_col1:
+            gender = st.selectbox("Gender", ["Male", "Female", "Mixed"], index=2, key="gender_other")
+            utility_score = st.selectbox(
+                "Utility of the Product (out of 10)",
+                options=list(range(1, 11)),
+                index=4,  # Default to 5
+                key="utility_score"
+            )
+            avg_price_or_incentive = st.number_input(
+                "Total incentive amount (Please add the total price of the product or the amount incentive involved)",
+                value=0,
+                step=1,
+                min_value=0,
+                key="total_incentive_other"
+            )
+
+        with filter_col2:
+            location_specific = st.selectbox("Location Specific", ["Yes", "No"], index=1, key="loc_specific_other")
+
+            if location_specific == "Yes":
+                locations = st.multiselect(
+                    "Select Locations (States)", state_options, key="locations_other",
+                    format_func=lambda v: format_option(v, state_counts)
                 )
-                avg_price_or_incentive = st.number_input(
-                    "Total incentive amount (Please add the total price of the product or the amount incentive involved)",
-                    value=0,
-                    step=1,
-                    min_value=0,
-                    key="total_incentive_other"
+                districts, pincode_prefixes = finer_location_filters("other", locations)
+
+            product_desirability = st.selectbox(
+                "Product Desirability (out of 10)",
+                options=list(range(1, 11)),
+                index=4,  # Default to 5
+                key="product_desirability"
+            )
+
+    segments = segment_filters()
+
+    # Apply Filters Button - Always visible after all filters
+    st.divider()
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        scan_allowed = render_scan_estimate(summary_users_query, active_users_params, key="summary_scan")
+        apply_button = st.button(
+            "🔍 Apply Filters", type="primary", use_container_width=True, disabled=not scan_allowed
+        )
+
+    if apply_button:
+        applied = False
+        try:
+            with st.spinner("Fetching data from BigQuery and applying filters..."):
+                locations_applied = locations if location_specific == "Yes" else None
+                # Districts and pincode prefixes go with "Location Specific" too
+                regions_applied = (districts, pincode_prefixes) if location_specific == "Yes" else (None, None)
+
+                # Steps 1-6 are a keyed lookup when the forecast table covers the selection
+                # (neither it nor the user sample knows creator segments)
+                forecast = None if segments else get_forecast_table(as_of_date)
+                lookup_count = None if forecast is None else forecast.count(
+                    platform, campaign_type, gender, locations_applied, *regions_applied
                 )
-            
-            with filter_col2:
-                location_specific = st.selectbox("Location Specific", ["Yes", "No"], index=1, key="loc_specific_other")
-                
-                if location_specific == "Yes":
-                    indian_states = [
-                        "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh",
-                        "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand",
-                        "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
-                        "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab",
-                        "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
-                        "Uttar Pradesh", "Uttarakhand", "West Bengal",
-                        "Andaman and Nicobar Islands", "Chandigarh", "Dadra and Nagar Haveli",
-                        "Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh",
-                        "Lakshadweep", "Puducherry"
-                    ]
-                    locations = st.multiselect("Select Locations (States)", indian_states, key="locations_other")
+
+                # Otherwise a sample estimate answers first when the exact count is slow
+                estimate = exact_future = None
+                if lookup_count is None and summary_sample_query and not segments:
+                    exact_future = get_exact_pool().submit(
+                        filtered_rows, as_of_date, platform, campaign_type, gender, locations_applied, *regions_applied
+                    )
+                    try:
+                        exact_future.result(timeout=EXACT_WAIT_S)
+                    except TimeoutError:
+                        estimate = get_user_sample(as_of_date).count(
+                            platform, CAMPAIGN_TYPE_MAP.get(campaign_type), gender, locations_applied, *regions_applied
+                        )
+                    except Exception:
+                        # Reported by the exact path below
+                        pass
+
+                # Step 1: Run the active users query (only the columns counted here)
+                all_users_df = None
+                if lookup_count is None and estimate is None:
+                    all_users_df = cached_query(summary_users_query, active_users_params)
+                    update_user_facets(all_users_df, as_of_date)
                 
-                product_desirability = st.selectbox(
-                    "Product Desirability (out of 10)",
-                    options=list(range(1, 11)),
-                    index=4,  # Default to 5
-                    key="product_desirability"
-                )
-        
-        # Apply Filters Button - Always visible after all filters
-        st.divider()
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            apply_button = st.button("🔍 Apply Filters", type="primary", use_container_width=True)
-        
-        if apply_button:
-            try:
-                with st.spinner("Fetching data from BigQuery and applying filters..."):
-                    # Step 1: Run active_users_query
-                    all_users_df = query_bigquery(active_users_query)
-                    
-                    if all_users_df.empty:
-                        st.warning("⚠️ No data returned from BigQuery.")
-                        st.session_state.collaboration_result = None
-                        st.session_state.filtered_df = None
+                if all_users_df is not None and all_users_df.empty:
+                    st.warning("⚠️ No data returned from BigQuery.")
+                    st.session_state.collaboration_result = None
+                    st.session_state.filtered_df = None
+                else:
+                    # Expected collaborations from per-creator propensities
+                    expected = None
+                    if lookup_count is not None:
+                        # The sample rows are loaded on request
+                        filtered_df = None
+                        filtered_count = lookup_count
+                        expected = forecast.propensity_sum(
+                            platform, campaign_type, gender, locations_applied, *regions_applied
+                        )
+                        print(f"📋 Forecast table lookup ({as_of_date}): {filtered_count:,} users")
+                    elif estimate is not None:
+                        filtered_df = None
+                        filtered_count = estimate.estimate
+                        expected = get_user_sample(as_of_date).propensity_sum(
+                            platform, CAMPAIGN_TYPE_MAP.get(campaign_type), gender, locations_applied, *regions_applied
+                        )
+                        print(
+                            f"≈ Sample estimate ({as_of_date}): {filtered_count:,} users "
+                            f"(95% CI {estimate.low:,}–{estimate.high:,}); exact count running"
+                        )
                     else:
                         # Print total rows before filtering
                         total_rows_before_filters = len(all_users_df)
                         print(f"📊 Total rows from BigQuery (before filters): {total_rows_before_filters:,}")
-                        
-                        # Step 2: Filter by platform and campaign type (execution_type)
-                        filtered_df = all_users_df.copy()
-                        # print(filtered_df.head())
-                        
-                        # Map campaign type from UI to database values
-                        campaign_type_map = {
-                            "Barter": ["regular_barter", "barter_brand_shipment"],
-                            "Cashback": ["order_and_payout"],
-                            "Payout": ["regular_payout"],
-                            "Barter with Payout": ["barter_with_payout"],
-                            "Other": ["other"]
-                        }
-                        
-                        # Filter by platform (check if platform string is present in platform column)
-                        if platform:
-                            rows_before_platform = len(filtered_df)
-                            # Use contains to check if platform string is present in the column
-                            filtered_df = filtered_df[filtered_df['platform'].str.contains(platform, case=False, na=False)]
-                            rows_after_platform = len(filtered_df)
-                            print(f"🔍 After platform filter (contains '{platform}'): {rows_before_platform:,} → {rows_after_platform:,} rows")
-                        
-                        # Filter by execution_type (campaign type) - handle multiple values
-                        if campaign_type and campaign_type in campaign_type_map:
-                            db_execution_types = campaign_type_map[campaign_type]
-                            rows_before_execution = len(filtered_df)
-                            # If it's a list, use isin() to match any value in the list
-                            if isinstance(db_execution_types, list):
-                                # Filter for users matching ANY of the execution types in the list
-                                filtered_df = filtered_df[filtered_df['execution_type'].isin(db_execution_types)]
-                                print(f"🔍 Filtering execution_type for: {', '.join(db_execution_types)}")
-                            else:
-                                filtered_df = filtered_df[filtered_df['execution_type'] == db_execution_types]
-                                print(f"🔍 Filtering execution_type for: {db_execution_types}")
-                            rows_after_execution = len(filtered_df)
-                            print(f"🔍 After execution_type filter ({campaign_type}): {rows_before_execution:,} → {rows_after_execution:,} rows")
-                        
-                        # Step 3: Filter where accepted_180 > 0 AND completed_180 > 0
-                        rows_before_active = len(filtered_df)
-                        if 'accepted_180' in filtered_df.columns and 'completed_180' in filtered_df.columns:
-                            filtered_df = filtered_df   [
-                                (filtered_df['accepted_180'] > 0) & 
-                                (filtered_df['completed_180'] > 0)
-                            ]
-                            rows_after_active = len(filtered_df)
-                            print(f"🔍 After active users filter (accepted_180 > 0 AND completed_180 > 0): {rows_before_active:,} → {rows_after_active:,} rows")
-                        else:
+                    
+                        # Steps 2-4: platform, campaign type (execution_type) and active users
+                        # (accepted_180 > 0 AND completed_180 > 0), prefetched for common
+                        # selections; steps 5-6: gender and location on the selected rows
+                        if 'accepted_180' not in all_users_df.columns or 'completed_180' not in all_users_df.columns:
                             st.warning("⚠️ Required columns (accepted_180, completed_180) not found in data.")
-                            filtered_df = pd.DataFrame()  # Empty dataframe
-                            print(f"⚠️ Missing columns - filtered_df set to empty")
-                        
-                        # Step 4: Filter by gender if gender is selected
-                        if gender and gender != "Mixed":
-                            rows_before_gender = len(filtered_df)
-                            if 'gender' in filtered_df.columns:
-                                # Map UI gender values to database values (case-insensitive)
-                                gender_map = {
-                                    "Male": ["male", "m", "M"],
-                                    "Female": ["female", "f", "F"]
-                                }
-                                if gender in gender_map:
-                                    # Filter for users matching the selected gender (case-insensitive)
-                                    gender_values = gender_map[gender]
-                                    filtered_df = filtered_df[filtered_df['gender'].notna()]
-                                    filtered_df['gender_lower'] = filtered_df['gender'].str.lower()
-                                    filtered_df = filtered_df[filtered_df['gender_lower'].isin([g.lower() for g in gender_values])]
-                                    filtered_df = filtered_df.drop(columns=['gender_lower'])
-                                    rows_after_gender = len(filtered_df)
-                                    print(f"🔍 After gender filter ({gender}): {rows_before_gender:,} → {rows_after_gender:,} rows")
-                                else:
-                                    print(f"⚠️ Unknown gender value: {gender}")
-                            else:
-                                st.warning("⚠️ Gender column not found in data. Gender filtering skipped.")
-                                print(f"⚠️ Gender column missing - gender filtering skipped")
-                                print(f"   Available columns: {', '.join(filtered_df.columns.tolist())}")
-                        
-                        # Step 5: Filter by location (state) if location_specific is "Yes" and locations are selected
-                        if location_specific == "Yes" and locations and len(locations) > 0:
-                            rows_before_location = len(filtered_df)
-                            if 'state' in filtered_df.columns:
-                                # Filter for users in the selected states (case-insensitive matching)
-                                # Handle null values properly - only filter non-null states
-                                filtered_df = filtered_df[filtered_df['state'].notna()]
-                                # Convert to lowercase for case-insensitive comparison
-                                filtered_df['state_lower'] = filtered_df['state'].str.lower()
-                                locations_lower = [loc.lower() for loc in locations]
-                                filtered_df = filtered_df[filtered_df['state_lower'].isin(locations_lower)]
-                                # Drop the temporary column
-                                filtered_df = filtered_df.drop(columns=['state_lower'])
-                                rows_after_location = len(filtered_df)
-                                print(f"🔍 After location filter (states: {', '.join(locations)}): {rows_before_location:,} → {rows_after_location:,} rows")
-                            else:
-                                st.warning("⚠️ State column not found in data. Location filtering skipped.")
-                                print(f"⚠️ State column missing - location filtering skipped")
-                                print(f"   Available columns: {', '.join(filtered_df.columns.tolist())}")
-                        
+                        if gender and gender != "Mixed" and 'gender' not in all_users_df.columns:
+                            st.warning("⚠️ Gender column not found in data. Gender filtering skipped.")
+                        if location_specific == "Yes" and locations and 'state' not in all_users_df.columns:
+                            st.warning("⚠️ State column not found in data. Location filtering skipped.")
+                    
+                        selected_df, steps = summary_selection(as_of_date, platform, campaign_type)
+                        segment_base = None
+                        if segments:
+                            segment_base = get_creator_segments(as_of_date).mask(selected_df["user_id"], segments)
+                            steps = steps + [(f"segment filter ({describe_selection(segments)})", int(segment_base.sum()))]
+                        mask, demographic_steps = demographic_mask(
+                            selected_df,
+                            gender=gender,
+                            locations=locations_applied,
+                            base=segment_base,
+                            districts=regions_applied[0],
+                            pincode_prefixes=regions_applied[1]
+                        )
+                        rows_before = total_rows_before_filters
+                        for description, rows_after in steps + demographic_steps:
+                            print(f"🔍 After {description}: {rows_before:,} → {rows_after:,} rows")
+                            rows_before = rows_after
+                        filtered_df = selected_df[mask]
+                    
                         # Step 6: Count remaining users
                         filtered_count = len(filtered_df)
+                        expected = propensity_sum(filtered_df)
                         print(f"✅ Final filtered count: {filtered_count:,} users")
+                    
+                    # Step 7: Calculate collaborations (per-creator propensities when known, else the multiplier)
+                    # (an estimate of 0 may still be refined to a positive count)
+                    if filtered_count > 0 or estimate is not None:
+                        # Get values for multiplier calculation from user inputs
+                        # Use the filter input values directly (pass through even if 0, as 0 is a valid input)
+                        avg_price_from_data = avg_price_or_incentive if avg_price_or_incentive and avg_price_or_incentive > 0 else None
+                        # For utility and desirability, pass the value if it's set (including 0)
+                        utility_from_data = utility_score if utility_score is not None else None
+                        desirability_from_data = product_desirability if product_desirability is not None else None
                         
-                        # Step 7: Calculate collaborations using multiplier
-                        if filtered_count > 0:
-                            # Get values for multiplier calculation from user inputs
-                            # Use the filter input values directly (pass through even if 0, as 0 is a valid input)
-                            avg_price_from_data = avg_price_or_incentive if avg_price_or_incentive and avg_price_or_incentive > 0 else None
-                            # For utility and desirability, pass the value if it's set (including 0)
-                            utility_from_data = utility_score if utility_score is not None else None
-                            desirability_from_data = product_desirability if product_desirability is not None else None
-                            
-                            # Print values being used for multiplier calculation
-                            print(f"📊 Multiplier calculation inputs:")
-                            print(f"   - Filtered Count: {filtered_count:,}")
-                            print(f"   - Product Desirability: {desirability_from_data}")
-                            print(f"   - Utility Score: {utility_from_data}")
-                            print(f"   - Average Price: {avg_price_from_data}")
-                            print(f"   - Default Safety: {DEFAULT_SAFETY_NUMBER}")
-                            
-                            # Calculate collaborations
-                            collaboration_result = calculate_collaborations(
-                                filtered_count=filtered_count,
-                                product_desirability=desirability_from_data,
-                                average_price=avg_price_from_data,
-                                utility_score=utility_from_data,
-                                default_safety=DEFAULT_SAFETY_NUMBER
-                            )
-                            
-                            print(f"📊 Multiplier result: {collaboration_result['multiplier']:.4f}")
-                            print(f"📊 Total collaborations: {collaboration_result['total_collaborations']:,}")
-                            
-                            st.session_state.collaboration_result = collaboration_result
-                            st.session_state.filtered_df = filtered_df
-                            st.success(f"✅ Filters applied successfully! Found {filtered_count:,} active users.")
-                        else:
-                            st.warning("⚠️ No active users found with the selected filters (accepted_90 > 0 AND completed_90 > 0).")
-                            st.session_state.collaboration_result = None
-                            st.session_state.filtered_df = None
-            
-            except Exception as e:
-                st.error(f"❌ Error applying filters: {str(e)}")
-                import traceback
-                st.code(traceback.format_exc())
-                st.info("💡 Tip: Make sure your BigQuery connection is working and the query returns expected columns.")
-            
-            except Exception as e:
-                st.error(f"❌ Error applying filters: {str(e)}")
-                import traceback
-                st.code(traceback.format_exc())
-                st.info("💡 Tip: Make sure your BigQuery schema matches the expected column names. You may need to adjust column names in the code.")
+                        # Print values being used for multiplier calculation
+                        print(f"📊 Multiplier calculation inputs:")
+                        print(f"   - Filtered Count: {filtered_count:,}")
+                        print(f"   - Product Desirability: {desirability_from_data}")
+                        print(f"   - Utility Score: {utility_from_data}")
+                        print(f"   - Average Price: {avg_price_from_data}")
+                        print(f"   - Default Safety: {DEFAULT_SAFETY_NUMBER}")
+                        
+                        # Calculate collaborations
+                        collaboration_result = calculate_collaborations(
+                            filtered_count=filtered_count,
+                            product_desirability=desirability_from_data,
+                            average_price=avg_price_from_data,
+                            utility_score=utility_from_data,
+                            default_safety=DEFAULT_SAFETY_NUMBER,
+                            propensity_sum=expected
+                        )
+                        
+                        print(f"📊 Multiplier result: {collaboration_result['multiplier']:.4f}")
+                        print(f"📊 Total collaborations: {collaboration_result['total_collaborations']:,}")
+                        
+                        if estimate is not None:
+                            collaboration_result['filtered_count_ci'] = (estimate.low, estimate.high)
+                        st.session_state.pending_exact = None if estimate is None else {'future': exact_future}
+                        st.session_state.collaboration_result = collaboration_result
+                        st.session_state.filtered_df = filtered_df
+                        st.session_state.filtered_selection = (
+                            as_of_date, platform, campaign_type, gender, locations_applied, *regions_applied, segments
+                        )
+                        st.session_state.applied_scenario = {
+                            "platform": platform,
+                            "campaign_type": campaign_type
+                        }
+                        st.session_state.summary_notice = f"✅ Filters applied successfully! Found {filtered_count:,} active users."
+                        get_usage_log().record(platform=platform, campaign_type=campaign_type)
+                        applied = True
+                    else:
+                        st.warning("⚠️ No active users found with the selected filters (accepted_90 > 0 AND completed_90 > 0).")
+                        st.session_state.collaboration_result = None
+                        st.session_state.filtered_df = None
         
-        # Display Results (always show if available)
-        st.divider()
-        st.subheader("📊 Collaboration Results")
+        except Exception as e:
+            st.error(f"❌ Error applying filters: {str(e)}")
+            import traceback
+            st.code(traceback.format_exc())
+            st.info("💡 Tip: Make sure your BigQuery connection is working and the query returns expected columns.")
         
-        if 'collaboration_result' in st.session_state and st.session_state.collaboration_result:
-            result = st.session_state.collaboration_result
-            
-            # Main metrics - Side by side
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric(
-                    label="📊 Max Collaborations That Can Be Executed",
-                    value=f"{result['filtered_count']:,}"
+        if applied:
+            # The Collaboration Model tab compares against this result, so
+            # rerun the whole app once rather than just this fragment
+            st.rerun()
+    
+    if 'summary_notice' in st.session_state:
+        st.success(st.session_state.pop('summary_notice'))
+    
+    # Display Results (always show if available)
+    st.divider()
+    st.subheader("📊 Collaboration Results")
+
+    if 'collaboration_result' in st.session_state and st.session_state.collaboration_result:
+        result = st.session_state.collaboration_result
+
+        # Sample estimates are marked approximate until the exact count replaces them
+        approx = "≈ " if 'filtered_count_ci' in result else ""
+
+        # Main metrics - Side by side
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(
+                label="📊 Max Collaborations That Can Be Executed",
+                value=f"{approx}{result['filtered_count']:,}"
+            )
+
+        with col2:
+            st.metric(
+                label="🎯 Collaborations That Can Be Executed (safe)",
+                value=f"{approx}{result['total_collaborations']:,}",
+                delta=(
+                    f"Per-creator propensity · effective multiplier {result['multiplier']:.3f}"
+                    if result.get('propensity_sum') is not None else f"Multiplier: {result['multiplier']:.3f}"
                 )
-            
-            with col2:
-                st.metric(
-                    label="🎯 Collaborations That Can Be Executed (safe)",
-                    value=f"{result['total_collaborations']:,}",
-                    delta=f"Multiplier: {result['multiplier']:.3f}"
+            )
+
+        if approx:
+            low, high = result['filtered_count_ci']
+            st.caption(
+                f"Estimated from a {PROGRESSIVE_SAMPLE_PERCENT:g}% sample of users · 95% CI {low:,}–{high:,} users "
+                f"({int(low * result['multiplier']):,}–{int(high * result['multiplier']):,} collaborations)"
+                + (" · ⏳ refining to the exact count..." if st.session_state.get('pending_exact') else "")
+            )
+            if 'exact_error' in result:
+                st.warning(f"⚠️ The exact count failed ({result['exact_error']}); showing the sample estimate.")
+
+        # Additional details in expander
+        with st.expander("📋 Detailed Calculation Information"):
+            st.write(f"**Filtered Results from BigQuery:** {result['filtered_count']:,}")
+            st.write(f"**Multiplier Applied:** {result['multiplier']:.3f}")
+            st.write(f"**Total Collaborations:** {result['total_collaborations']:,}")
+
+            st.divider()
+            st.write("**Multiplier Factors:**")
+            if result['product_desirability'] is not None:
+                st.write(f"- Product Desirability: {result['product_desirability']:.1f}/10")
+            if result['utility_score'] is not None:
+                st.write(f"- Utility Score: {result['utility_score']:.1f}/10")
+            if result['average_price'] is not None:
+                st.write(f"- Average Price: ₹{result['average_price']:.2f}")
+            st.write(f"- Default Safety Number: {result['default_safety']:.2f}")
+
+            st.divider()
+            st.write("**Calculation:**")
+            if result.get('propensity_sum') is not None:
+                factor = campaign_factor(
+                    result['product_desirability'], result['average_price'], result['utility_score'], result['default_safety']
                 )
-            
-            # Additional details in expander
-            with st.expander("📋 Detailed Calculation Information"):
-                st.write(f"**Filtered Results from BigQuery:** {result['filtered_count']:,}")
-                st.write(f"**Multiplier Applied:** {result['multiplier']:.3f}")
-                st.write(f"**Total Collaborations:** {result['total_collaborations']:,}")
-                
-                st.divider()
-                st.write("**Multiplier Factors:**")
-                if result['product_desirability'] is not None:
-                    st.write(f"- Product Desirability: {result['product_desirability']:.1f}/10")
-                if result['utility_score'] is not None:
-                    st.write(f"- Utility Score: {result['utility_score']:.1f}/10")
-                if result['average_price'] is not None:
-                    st.write(f"- Average Price: ₹{result['average_price']:.2f}")
-                st.write(f"- Default Safety Number: {result['default_safety']:.2f}")
-                
-                st.divider()
-                st.write("**Calculation:**")
+                st.write("Total Collaborations = Σ creator propensity × Campaign Factor")
+                st.write(f"Total Collaborations = {result['propensity_sum']:,.1f} × {factor:.3f}")
+                st.write(f"Total Collaborations = {result['total_collaborations']:,}")
+                st.caption(
+                    f"Each creator's propensity is their smoothed acceptance × completion rate. The campaign "
+                    f"factor is the multiplier of these inputs relative to the defaults. The global multiplier "
+                    f"({result['global_multiplier']:.3f}) would give {int(result['filtered_count'] * result['global_multiplier']):,}."
+                )
+            else:
                 st.write(f"Total Collaborations = Filtered Count × Multiplier")
                 st.write(f"Total Collaborations = {result['filtered_count']:,} × {result['multiplier']:.3f}")
                 st.write(f"Total Collaborations = {result['total_collaborations']:,}")
-                
-                st.info("💡 Edit `multiplier_calc.py` to adjust the multiplier calculation logic.")
-            
-            # Show sample of filtered data
-            if 'filtered_df' in st.session_state and st.session_state.filtered_df is not None:
-                with st.expander("👀 View Filtered Data Sample"):
+
+            st.info("💡 Edit `multiplier_calc.py` to adjust the multiplier calculation logic.")
+
+        simulation_panel(result)
+
+        # Show sample of filtered data
+        if st.session_state.get('filtered_df') is not None or st.session_state.get('filtered_selection'):
+            with st.expander("👀 View Filtered Data Sample"):
+                # Results counted from the forecast table load their rows on request
+                if st.session_state.get('filtered_df') is None and st.button("Load sample", key="load_filtered_sample"):
+                    st.session_state.filtered_df = filtered_rows(*st.session_state.filtered_selection)
+                if st.session_state.get('filtered_df') is not None:
                     st.dataframe(st.session_state.filtered_df.head(10), use_container_width=True)
                     st.caption(f"Showing 10 of {len(st.session_state.filtered_df)} filtered records")
-        
-        else:
-            st.info("👆 Apply filters to see collaboration results")
-    
-    # Tab 2: Active Users Table
-    with tab2:
-        st.header("👥 Active Users Data")
-        
-        # Load data button for Active Users tab
-        if st.button("📥 Load Active Users Data", type="primary"):
+
+    else:
+        st.info("👆 Apply filters to see collaboration results")
+
+
+def creator_probabilities(result):
+    """
+    Each filtered creator's chance of collaborating: propensity × campaign
+    factor, from the filtered rows' own `propensity` column (rows kept from
+    before the column existed are reloaded).
+    """
+    filtered_df = st.session_state.get('filtered_df')
+    if filtered_df is None or 'propensity' not in filtered_df.columns:
+        filtered_df = st.session_state.filtered_df = filtered_rows(*st.session_state.filtered_selection)
+    factor = campaign_factor(
+        result['product_desirability'], result['average_price'], result['utility_score'], result['default_safety']
+    )
+    return np.minimum(filtered_df["propensity"].to_numpy(dtype=np.float64) * factor, 1.0)
+
+
+@st.fragment
+@timed("simulation")
+def simulation_panel(result):
+    """Monte Carlo range of the Summary result; its widgets rerun only this fragment"""
+    with st.expander("🎲 Simulate Outcomes"):
+        per_creator = result.get('propensity_sum') is not None
+        sim_col1, sim_col2, sim_col3 = st.columns(3)
+        with sim_col1:
+            source = st.radio(
+                "Draw from",
+                ["Per-creator propensity" if per_creator else "Multiplier", "Participation band"],
+                key="simulation_source",
+                help="Each creator collaborates with their own probability, or all with the same rate"
+            )
+        with sim_col2:
+            trials = st.number_input(
+                "Trials", min_value=100, max_value=100_000, value=DEFAULT_TRIALS, step=1_000, key="simulation_trials"
+            )
+            target = st.number_input("Target collaborations", min_value=0, value=result['total_collaborations'], step=1)
+        with sim_col3:
+            if source == "Participation band":
+                product_category = st.selectbox("Product category", list(PRODUCT_UTILITY_SCORE), key="simulation_category")
+                brand_strength = st.selectbox("Brand strength", list(BRAND_SCORE), key="simulation_brand")
+                rate = get_participation_rate(PRODUCT_UTILITY_SCORE[product_category] + BRAND_SCORE[brand_strength])
+                st.caption(f"Participation rate: {rate:.0%}")
+
+        inputs = (result['filtered_count'], result['total_collaborations'], source, trials, target)
+        if source == "Participation band":
+            inputs += (rate,)
+        if st.button("Run simulation", key="run_simulation"):
             try:
-                with st.spinner("Loading active users data..."):
-                    st.session_state.active_users_data = query_bigquery(active_users_query)
-                    st.success("✅ Data loaded successfully!")
+                with st.spinner("Simulating..."):
+                    if source == "Participation band":
+                        simulation = simulate_collaborations(rate, n=result['filtered_count'], trials=trials, target=target)
+                    elif per_creator:
+                        simulation = simulate_collaborations(creator_probabilities(result), trials=trials, target=target)
+                    else:
+                        simulation = simulate_collaborations(
+                            result['multiplier'], n=result['filtered_count'], trials=trials, target=target
+                        )
+                st.session_state.simulation = (inputs, simulation)
             except Exception as e:
-                st.error(f"❌ Error loading data: {str(e)}")
-        
-        # Check if data is available
-        if 'active_users_data' in st.session_state and st.session_state.active_users_data is not None:
-            active_users_df = st.session_state.active_users_data
-        else:
-            active_users_df = None
+                st.error(f"❌ Error running simulation: {str(e)}")
+
+        stored = st.session_state.get('simulation')
+        if stored is None or stored[0] != inputs:
+            st.caption("Draws the campaign many times to show how far the outcome can swing.")
+            return
+        simulation = stored[1]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("P10 (pessimistic)", f"{simulation.p10:,}")
+        col2.metric("P50 (median)", f"{simulation.p50:,}")
+        col3.metric("P90 (optimistic)", f"{simulation.p90:,}")
+        col4.metric(f"P(≥ {simulation.target:,})", f"{simulation.target_probability:.0%}")
+        st.caption(
+            f"{simulation.trials:,} simulated campaigns in {simulation.seconds * 1000:,.0f} ms · "
+            f"mean {simulation.mean:,.0f} collaborations. 80% of them fell between P10 and P90."
+        )
+
+
+@st.fragment
+@timed("active users")
+def active_users_tab(as_of_date):
+    """Active Users tab; filters are batched in a form and rerun only this fragment"""
+    active_users_params = {"as_of_date": as_of_date}
+    st.header("👥 Active Users Data")
+    creator_search()
+    st.divider()
+
+    # Load data button for Active Users tab
+    scan_allowed = render_scan_estimate(active_users_table_query, active_users_params, key="active_users_scan")
+    if st.button("📥 Load Active Users Data", type="primary", disabled=not scan_allowed):
+        try:
+            with st.spinner("Loading active users data..."):
+                st.session_state.active_users_data = cached_query(active_users_table_query, active_users_params)
+                st.session_state.active_users_facets = FacetIndex(
+                    st.session_state.active_users_data, ['platform', 'execution_type']
+                )
+                st.session_state.active_users_version += 1
+                st.success("✅ Data loaded successfully!")
+        except Exception as e:
+            st.error(f"❌ Error loading data: {str(e)}")
+
+    # Check if data is available
+    if 'active_users_data' in st.session_state and st.session_state.active_users_data is not None:
+        active_users_df = st.session_state.active_users_data
+    else:
+        active_users_df = None
+
+    if active_users_df is None or active_users_df.empty:
+        st.info("👆 Click 'Load Active Users Data' button to fetch data from BigQuery.")
+        return
+    
+    # Filters section: batched in a form, so editing them causes no reruns
+    # until "Apply" is pressed
+    st.subheader("🔍 Filters")
+    
+    with st.form("active_users_filters"):
+        filter_col1, filter_col2 = st.columns(2)
         
-        if active_users_df is None or active_users_df.empty:
-            st.info("👆 Click 'Load Active Users Data' button to fetch data from BigQuery.")
-        else:
-            # Filters section
-            st.subheader("🔍 Filters")
-            
-            filter_col1, filter_col2 = st.columns(2)
-            
-            with filter_col1:
-                # Platform filter
-                if 'platform' in active_users_df.columns:
-                    unique_platforms = ['All'] + sorted(active_users_df['platform'].dropna().unique().tolist())
-                    selected_platform = st.selectbox("Platform", unique_platforms, index=0)
-                else:
-                    selected_platform = "All"
-                
-                # Execution type filter
-                if 'execution_type' in active_users_df.columns:
-                    unique_execution_types = ['All'] + sorted(active_users_df['execution_type'].dropna().unique().tolist())
-                    selected_execution_type = st.selectbox("Execution Type", unique_execution_types, index=0)
-                else:
-                    selected_execution_type = "All"
-            
-            with filter_col2:
-                # Acceptance filters
-                st.write("**Acceptance Filters (Greater Than)**")
-                accepted_min = st.number_input("Accepted (min)", value=0, min_value=0, step=1, key="au_accepted")
-                accepted_90_min = st.number_input("Accepted 90 (min)", value=0, min_value=0, step=1, key="au_accepted_90")
-                accepted_180_min = st.number_input("Accepted 180 (min)", value=0, min_value=0, step=1, key="au_accepted_180")
-            
-            filter_col3, filter_col4 = st.columns(2)
-            
-            with filter_col3:
-                # Completion filters
-                st.write("**Completion Filters (Greater Than)**")
-                completed_min = st.number_input("Completed (min)", value=0, min_value=0, step=1, key="au_completed")
-                completed_90_min = st.number_input("Completed 90 (min)", value=0, min_value=0, step=1, key="au_completed_90")
-                completed_180_min = st.number_input("Completed 180 (min)", value=0, min_value=0, step=1, key="au_completed_180")
-            
-            with filter_col4:
-                # Additional filters
-                st.write("**Additional Filters**")
-                if 'accepted_30' in active_users_df.columns:
-                    accepted_30_min = st.number_input("Accepted 30 (min)", value=0, min_value=0, step=1, key="au_accepted_30")
-                else:
-                    accepted_30_min = 0
-                
-                if 'completed_60' in active_users_df.columns:
-                    completed_60_min = st.number_input("Completed 60 (min)", value=0, min_value=0, step=1, key="au_completed_60")
-                else:
-                    completed_60_min = 0
-                
-                if 'invited' in active_users_df.columns:
-                    invited_min = st.number_input("Invited (min)", value=0, min_value=0, step=1, key="au_invited")
-                else:
-                    invited_min = 0
-            
-            # Apply filters to dataframe
-            filtered_active_users_df = active_users_df.copy()
-            
-            # Platform filter
-            if selected_platform != "All" and 'platform' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['platform'] == selected_platform]
-            
-            # Execution type filter
-            if selected_execution_type != "All" and 'execution_type' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['execution_type'] == selected_execution_type]
-            
-            # Acceptance filters
-            if 'accepted' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['accepted'] >= accepted_min]
-            if 'accepted_90' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['accepted_90'] >= accepted_90_min]
-            if 'accepted_180' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['accepted_180'] >= accepted_180_min]
-            if 'accepted_30' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['accepted_30'] >= accepted_30_min]
-            
-            # Completion filters
-            if 'completed' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['completed'] >= completed_min]
-            if 'completed_90' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['completed_90'] >= completed_90_min]
-            if 'completed_180' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['completed_180'] >= completed_180_min]
-            if 'completed_60' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['completed_60'] >= completed_60_min]
-            
-            # Invited filter
-            if 'invited' in filtered_active_users_df.columns:
-                filtered_active_users_df = filtered_active_users_df[filtered_active_users_df['invited'] >= invited_min]
-            
-            # Show filter results summary
-            st.info(f"📊 Showing {len(filtered_active_users_df):,} of {len(active_users_df):,} users after filters")
-            
-            st.divider()
-            
-            # Pagination settings
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                items_per_page = st.selectbox(
-                    "Items per page",
-                    [10, 25, 50, 100],
-                    index=1
+        with filter_col1:
+            # Platform and execution type options from the facet index,
+            # each counted under the other's selection
+            facets = st.session_state.active_users_facets
+            au_selections = {
+                'platform': st.session_state.get('au_platform'),
+                'execution_type': st.session_state.get('au_execution_type'),
+            }
+            if 'platform' in facets.columns:
+                au_platform_counts = facets.counts('platform', au_selections)
+                selected_platform = st.selectbox(
+                    "Platform", ['All'] + facets.options('platform'), index=0, key="au_platform",
+                    format_func=lambda v: format_option(v, au_platform_counts)
                 )
+            else:
+                selected_platform = "All"
             
-            # Calculate pagination based on filtered data
-            total_rows = len(filtered_active_users_df)
-            total_pages = (total_rows - 1) // items_per_page + 1 if total_rows > 0 else 1
-            
-            # Page selector
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                page_number = st.number_input(
-                    "Page",
-                    min_value=1,
-                    max_value=total_pages,
-                    value=1,
-                    step=1
+            if 'execution_type' in facets.columns:
+                au_execution_counts = facets.counts('execution_type', au_selections)
+                selected_execution_type = st.selectbox(
+                    "Execution Type", ['All'] + facets.options('execution_type'), index=0, key="au_execution_type",
+                    format_func=lambda v: format_option(v, au_execution_counts)
                 )
+            else:
+                selected_execution_type = "All"
+        
+        with filter_col2:
+            # Acceptance filters
+            st.write("**Acceptance Filters (Greater Than)**")
+            accepted_min = st.number_input("Accepted (min)", value=0, min_value=0, step=1, key="au_accepted")
+            accepted_90_min = st.number_input("Accepted 90 (min)", value=0, min_value=0, step=1, key="au_accepted_90")
+            accepted_180_min = st.number_input("Accepted 180 (min)", value=0, min_value=0, step=1, key="au_accepted_180")
+        
+        filter_col3, filter_col4 = st.columns(2)
+        
+        with filter_col3:
+            # Completion filters
+            st.write("**Completion Filters (Greater Than)**")
+            completed_min = st.number_input("Completed (min)", value=0, min_value=0, step=1, key="au_completed")
+            completed_90_min = st.number_input("Completed 90 (min)", value=0, min_value=0, step=1, key="au_completed_90")
+            completed_180_min = st.number_input("Completed 180 (min)", value=0, min_value=0, step=1, key="au_completed_180")
+        
+        with filter_col4:
+            # Additional filters
+            st.write("**Additional Filters**")
+            if 'accepted_30' in active_users_df.columns:
+                accepted_30_min = st.number_input("Accepted 30 (min)", value=0, min_value=0, step=1, key="au_accepted_30")
+            else:
+                accepted_30_min = 0
             
-            # Calculate slice
-            start_idx = (page_number - 1) * items_per_page
-            end_idx = start_idx + items_per_page
-            
-            # Display paginated data (from filtered dataframe)
-            paginated_df = filtered_active_users_df.iloc[start_idx:end_idx]
-            
-            st.dataframe(
-                paginated_df,
-                use_container_width=True,
-                height=400
-            )
-            
-            # Pagination info
-            st.caption(
-                f"Showing {start_idx + 1} to {min(end_idx, total_rows)} of {total_rows} users "
-                f"(Page {page_number} of {total_pages})"
-            )
+            if 'completed_60' in active_users_df.columns:
+                completed_60_min = st.number_input("Completed 60 (min)", value=0, min_value=0, step=1, key="au_completed_60")
+            else:
+                completed_60_min = 0
             
-            # Download buttons
+            if 'invited' in active_users_df.columns:
+                invited_min = st.number_input("Invited (min)", value=0, min_value=0, step=1, key="au_invited")
+            else:
+                invited_min = 0
+        
+        st.form_submit_button("🔍 Apply Active Users Filters")
+    
+    # Filtered data is memoized per dataset version and filter values, so
+    # reruns that do not change the filters reuse it
+    minimums = {
+        "accepted": accepted_min, "accepted_30": accepted_30_min,
+        "accepted_90": accepted_90_min, "accepted_180": accepted_180_min,
+        "completed": completed_min, "completed_60": completed_60_min,
+        "completed_90": completed_90_min, "completed_180": completed_180_min,
+        "invited": invited_min,
+    }
+    filter_key = (
+        st.session_state.active_users_version,
+        selected_platform,
+        selected_execution_type,
+        tuple(minimums.items()),
+    )
+    if st.session_state.get('active_users_filter_key') != filter_key:
+        mask = active_users_mask(active_users_df, selected_platform, selected_execution_type, minimums)
+        st.session_state.active_users_filtered = active_users_df[mask]
+        st.session_state.active_users_filter_key = filter_key
+    filtered_active_users_df = st.session_state.active_users_filtered
+    
+    # Show filter results summary
+    st.info(f"📊 Showing {len(filtered_active_users_df):,} of {len(active_users_df):,} users after filters")
+    
+    st.divider()
+    
+    active_users_table(filtered_active_users_df, active_users_df, get_user_profiles(as_of_date))
+
+
+@st.fragment
+@timed("creator search")
+def creator_search():
+    """Creator lookup by user ID, Instagram ID, Amazon ID, username or name; typing reruns only this fragment"""
+    st.subheader("🔎 Find a Creator")
+    query = st.text_input(
+        "User ID, Instagram ID, Amazon ID, username or name", key="creator_query",
+        placeholder="e.g. 1007, @radhika_writter or radhika"
+    )
+    if not query.strip():
+        return
+    try:
+        with st.spinner("Loading creator index..."):
+            index = refreshed_creator_index()
+    except Exception as e:
+        st.error(f"❌ Error loading creators: {str(e)}")
+        return
+
+    started = time.perf_counter()
+    matches = index.search(query)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if matches.empty:
+        st.warning(f"No creators match '{query}'")
+        return
+    st.caption(f"{len(matches)} matches of {len(index):,} creators in {elapsed_ms:.1f} ms")
+    st.dataframe(matches, use_container_width=True, hide_index=True)
+
+    # Their rows in the loaded active users data
+    active_users_df = st.session_state.get('active_users_data')
+    if active_users_df is not None and 'user_id' in active_users_df.columns:
+        rows = active_users_df[active_users_df['user_id'].isin(matches['user_id'])]
+        if not rows.empty:
+            st.write(f"**Active users rows of these creators** ({len(rows):,})")
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+@st.fragment
+@timed("active users table")
+def active_users_table(filtered_active_users_df, active_users_df, profiles):
+    """Paginated table and downloads; paging reruns only this fragment"""
+    # Pagination settings
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        items_per_page = st.selectbox(
+            "Items per page",
+            [10, 25, 50, 100],
+            index=1
+        )
+    
+    # Calculate pagination based on filtered data
+    total_rows = len(filtered_active_users_df)
+    total_pages = (total_rows - 1) // items_per_page + 1 if total_rows > 0 else 1
+    
+    # Page selector
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        page_number = st.number_input(
+            "Page",
+            min_value=1,
+            max_value=total_pages,
+            value=1,
+            step=1
+        )
+    
+    # Calculate slice
+    start_idx = (page_number - 1) * items_per_page
+    end_idx = start_idx + items_per_page
+    
+    # Display paginated data (from filtered dataframe)
+    # Profile columns are fetched for the shown rows only
+    paginated_df = profiles.join(filtered_active_users_df.iloc[start_idx:end_idx])
+    
+    st.dataframe(
+        paginated_df,
+        use_container_width=True,
+        height=400
+    )
+    
+    # Pagination info
+    st.caption(
+        f"Showing {start_idx + 1} to {min(end_idx, total_rows)} of {total_rows} users "
+        f"(Page {page_number} of {total_pages})"
+    )
+    
+    # Download buttons; the CSVs are only generated when clicked
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Download Filtered Data (CSV)",
+            data=lambda: profiles.join(filtered_active_users_df).to_csv(index=False),
+            file_name="active_users_filtered.csv",
+            mime="text/csv"
+        )
+    with col2:
+        st.download_button(
+            label="📥 Download Full Dataset (CSV)",
+            data=lambda: profiles.join(active_users_df).to_csv(index=False),
+            file_name="active_users_all.csv",
+            mime="text/csv"
+        )
+
+
+@st.fragment
+@timed("audience overlap")
+def audience_overlap_tab(as_of_date):
+    """Distinct-user overlap between segments of the Summary Dashboard's active users"""
+    st.header("🔀 Audience Overlap")
+    st.caption("Active users (accepted and completed in the last 180 days), counted once each across their rows.")
+
+    params = {"as_of_date": as_of_date}
+    scan_allowed = render_scan_estimate(summary_users_query, params, key="overlap_scan")
+    if st.button("📥 Load Audience Segments", type="primary", disabled=not scan_allowed):
+        st.session_state.overlap_as_of = as_of_date
+    if st.session_state.get('overlap_as_of') != as_of_date:
+        st.info("👆 Click 'Load Audience Segments' to build the segment bitmaps.")
+        return
+
+    try:
+        with st.spinner("Building audience segments..."):
+            index = get_segment_index(as_of_date)
+    except Exception as e:
+        st.error(f"❌ Error loading data: {str(e)}")
+        return
+    st.caption(
+        f"{len(index.all):,} active users in {len(index.segments):,} segments "
+        f"({index.nbytes / 1024 ** 2:,.1f} MiB of bitmaps)"
+    )
+
+    st.subheader("📊 Overlap Matrix")
+    column_labels = {
+        "platform": "Platform", "execution_type": "Execution Type", "gender": "Gender",
+        "state": "State", "district": "District",
+    }
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        column = st.selectbox(
+            "Segment by", index.columns, format_func=lambda c: column_labels.get(c, c), key="overlap_column"
+        )
+        as_share = st.checkbox("Show as % of row segment", key="overlap_share")
+    with col2:
+        values = st.multiselect(
+            "Segments", index.values(column), default=index.values(column)[:6], key=f"overlap_values_{column}"
+        )
+    if values:
+        started = time.perf_counter()
+        matrix = index.overlap_matrix(column, values)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if as_share:
+            sizes = pd.Series(np.diag(matrix), index=matrix.index).replace(0, np.nan)
+            matrix = (matrix.div(sizes, axis=0) * 100).round(1)
+        st.dataframe(matrix, use_container_width=True)
+        st.caption(f"Users in both the row and column segment (segment size on the diagonal); {elapsed_ms:,.1f} ms")
+
+    st.subheader("🧮 Distinct Users")
+    segments = [(c, v) for c in index.columns for v in index.values(c)]
+
+    def label(segment):
+        return f"{column_labels.get(segment[0], segment[0])}: {segment[1]}"
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        all_of = st.multiselect("In all of", segments, format_func=label, key="overlap_all_of")
+    with col2:
+        any_of = st.multiselect("In any of", segments, format_func=label, key="overlap_any_of")
+    with col3:
+        none_of = st.multiselect("In none of", segments, format_func=label, key="overlap_none_of")
+    started = time.perf_counter()
+    distinct = index.count(all_of, any_of, none_of)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.metric("Distinct Active Users", f"{distinct:,}")
+    st.caption(
+        f"Computed in {elapsed_ms:,.2f} ms. A user is in a segment if any of their rows is, "
+        "so e.g. a platform and an execution type together mean users with both, not necessarily on one row."
+    )
+
+
+@st.fragment
+@timed("collaboration model")
+def collaboration_model_tab():
+    """Collaboration Model tab"""
+    st.header("🤖 Collaboration Model")
+    st.markdown(
+        "Random Forest trained on historical campaigns (platform, execution type, audience size → collaborations). "
+        "Fitted models are saved in `models/` keyed by a hash of the training data, so they are trained once."
+    )
+
+    scan_allowed = render_scan_estimate(campaign_history_query, key="campaign_history_scan")
+    if st.button("🧠 Train / Load Model", type="primary", disabled=not scan_allowed):
+        try:
+            with st.spinner("Loading campaign history and model..."):
+                history = load_campaign_history()
+                model, model_key, trained = load_collaboration_model(history)
+                st.session_state.collaboration_model = model
+                action = "Trained and saved" if trained else "Loaded"
+                st.success(f"✅ {action} model `{model_key}` ({model.n_training_rows_:,} campaigns).")
+        except Exception as e:
+            st.error(f"❌ Error loading model: {str(e)}")
+
+    model = st.session_state.collaboration_model
+    if model is None:
+        st.info("👆 Click 'Train / Load Model' to fit the model on historical campaigns.")
+    else:
+        if model.cv_metrics_:
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric("CV MAE (collaborations)", f"{model.cv_metrics_['mae']:,.1f}")
+            metric_col2.metric("CV WAPE", f"{model.cv_metrics_['wape']:.1%}")
+            metric_col3.metric("CV R²", f"{model.cv_metrics_['r2']:.3f}")
+
+        st.divider()
+        st.subheader("🔮 Make Predictions")
+
+        scenario = st.session_state.applied_scenario
+        result = st.session_state.collaboration_result
+        if scenario and result:
+            audience = result['filtered_count']
+            execution_types = CAMPAIGN_TYPE_MAP.get(scenario['campaign_type'], [])
+            scenarios = pd.DataFrame({
+                "platform": scenario['platform'],
+                "execution_type": execution_types,
+                "audience_size": audience
+            })
+            model_estimate = int(model.predict(scenarios).mean())
             col1, col2 = st.columns(2)
-            with col1:
-                csv_filtered = filtered_active_users_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Filtered Data (CSV)",
-                    data=csv_filtered,
-                    file_name="active_users_filtered.csv",
-                    mime="text/csv"
+            col1.metric(
+                f"Model estimate: {scenario['platform']} / {scenario['campaign_type']}",
+                f"{model_estimate:,}"
+            )
+            col2.metric("Multiplier estimate", f"{result['total_collaborations']:,}")
+
+            # Same audience on every platform × execution type, scored in one batch
+            grid = pd.MultiIndex.from_product(
+                [sorted(model.categories_['platform']), sorted(model.categories_['execution_type'])],
+                names=["platform", "execution_type"]
+            ).to_frame(index=False)
+            grid["audience_size"] = audience
+            grid["predicted_collaborations"] = model.predict(grid).round().astype(int)
+            with st.expander(f"📋 Predicted collaborations for {audience:,} users on every platform"):
+                st.dataframe(
+                    grid.pivot(index="platform", columns="execution_type", values="predicted_collaborations"),
+                    use_container_width=True
                 )
-            with col2:
-                csv_all = active_users_df.to_csv(index=False)
+        else:
+            st.info("💡 Apply filters in the Summary Dashboard to predict for the current audience.")
+
+        uploaded = st.file_uploader(
+            "Batch predictions: CSV with platform, execution_type and audience_size columns",
+            type="csv"
+        )
+        if uploaded is not None:
+            try:
+                scenarios = pd.read_csv(uploaded)
+                scenarios["predicted_collaborations"] = model.predict(scenarios).round().astype(int)
+                st.dataframe(scenarios, use_container_width=True, height=400)
                 st.download_button(
-                    label="📥 Download Full Dataset (CSV)",
-                    data=csv_all,
-                    file_name="active_users_all.csv",
+                    label="📥 Download Predictions (CSV)",
+                    data=scenarios.to_csv(index=False),
+                    file_name="collaboration_predictions.csv",
                     mime="text/csv"
                 )
+            except KeyError as e:
+                st.error(f"❌ Missing column in CSV: {str(e)}")
+
+
+@timed(FULL_RUN)
+def main():
+    count_script_run()
+    prewarmer = start_prewarm()
+
+    # Initialize session state
+    if 'active_users_data' not in st.session_state:
+        st.session_state.active_users_data = None
+    if 'active_users_version' not in st.session_state:
+        st.session_state.active_users_version = 0
+    if 'filtered_count' not in st.session_state:
+        st.session_state.filtered_count = 0
+    if 'collaboration_result' not in st.session_state:
+        st.session_state.collaboration_result = None
+    if 'filtered_df' not in st.session_state:
+        st.session_state.filtered_df = None
+    if 'applied_scenario' not in st.session_state:
+        st.session_state.applied_scenario = None
+    if 'collaboration_model' not in st.session_state:
+        st.session_state.collaboration_model = None
+    
+    st.title("📊 Collaboration Predictor Dashboard")
+    st.markdown("Analyze collaboration data and active users")
+    
+    # All date-relative queries run "as of" this date, so results are cacheable per day
+    as_of_date = st.date_input(
+        "As of date",
+        value=today_utc(),
+        max_value=today_utc(),
+        help="Activity windows (e.g. accepted in the last 180 days) are counted back from this date"
+    )
+    
+    # Main content area with tabs
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["📈 Summary Dashboard", "👥 Active Users", "🔀 Audience Overlap", "🤖 Collaboration Model"]
+    )
+    
+    # Each tab is a fragment: widget changes inside a tab rerun only that tab
+    with tab1:
+        summary_dashboard(as_of_date)
+        if st.session_state.get('pending_exact'):
+            exact_count_refresher()
+    
+    with tab2:
+        active_users_tab(as_of_date)
+    
+    with tab3:
+        audience_overlap_tab(as_of_date)
+    
+    with tab4:
+        collaboration_model_tab()
+    
+    render_timings()
+    render_queue_status()
+    render_scan_usage()
+    render_prewarm_status(prewarmer)
 
 
 if __name__ == "__main__":
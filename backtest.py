@@ -0,0 +1,346 @@
+"""
+Backtesting and calibration for the collaboration multiplier.
+
+Replays historical campaigns (audience size after filters, planner inputs and
+the collaborations actually executed) through the `multiplier_calc` formula,
+reports how far off it is, and searches the weights and price-band factors for
+a better parameter set.
+
+The multiplier is linear in its parameters, so a block of P candidate
+parameter sets is scored against C campaigns with one (P x K) @ (K x C)
+matrix product. Blocks are spread over a process pool.
+
+Input CSV columns:
+    filtered_count, collaborations                     (required)
+    product_desirability, utility_score, average_price (optional, blank = not set)
+    product_category, brand_strength, campaign_type,
+    incentive_type, eligible_users                     (optional, feasibility backtest)
+
+Usage:
+    python backtest.py campaigns.csv --candidates 100000 --output calibrated_params.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import multiplier_calc
+from scores import (
+    PRODUCT_UTILITY_SCORE,
+    BRAND_SCORE,
+    PARTICIPATION_RATE_BY_SCORE,
+    PLATFORM_CONFIDENCE
+)
+
+
+N_PRICE_BANDS = len(multiplier_calc.PRICE_BAND_EDGES) + 1
+
+PARAM_NAMES = (
+    ["default_safety", "desirability_weight", "utility_weight", "price_weight"]
+    + [f"price_factor_{i}" for i in range(N_PRICE_BANDS)]
+)
+
+# Search bounds for random search and the refinement rounds
+PARAM_BOUNDS = {
+    "default_safety": (-0.2, 0.5),
+    "desirability_weight": (0.0, 0.8),
+    "utility_weight": (0.0, 0.8),
+    "price_weight": (0.0, 0.6),
+    **{f"price_factor_{i}": (0.0, 1.5) for i in range(N_PRICE_BANDS)},
+}
+
+METRICS = ["mae", "wape", "rmse", "bias", "over_rate"]
+
+# Upper bound on the size of one (candidates x campaigns) block, in cells
+BLOCK_CELLS = 20_000_000
+
+
+def baseline_params() -> Dict[str, float]:
+    """The parameters `multiplier_calc` currently uses"""
+    values = [
+        multiplier_calc.DEFAULT_SAFETY_NUMBER,
+        multiplier_calc.DESIRABILITY_WEIGHT,
+        multiplier_calc.UTILITY_WEIGHT,
+        multiplier_calc.PRICE_WEIGHT,
+    ] + list(multiplier_calc.PRICE_BAND_FACTORS) + [multiplier_calc.ABOVE_MAX_PRICE_FACTOR]
+    return dict(zip(PARAM_NAMES, values))
+
+
+def design_matrix(campaigns: pd.DataFrame) -> np.ndarray:
+    """
+    Per-campaign features the multiplier is linear in.
+
+    Columns: 1, desirability / 10, utility / 10, one-hot price band (zero
+    when no price was given). Missing inputs contribute nothing, matching
+    `calculate_multiplier` skipping None.
+    """
+    n = len(campaigns)
+    X = np.zeros((n, 3 + N_PRICE_BANDS))
+    X[:, 0] = 1.0
+    for column, j in (("product_desirability", 1), ("utility_score", 2)):
+        if column in campaigns.columns:
+            X[:, j] = np.nan_to_num(pd.to_numeric(campaigns[column], errors="coerce").to_numpy() / 10.0)
+
+    if "average_price" in campaigns.columns:
+        price = pd.to_numeric(campaigns["average_price"], errors="coerce").to_numpy()
+        has_price = ~np.isnan(price)
+        edges = multiplier_calc.PRICE_BAND_EDGES
+        band = np.searchsorted(edges[:-1], np.nan_to_num(price), side="right")
+        # The last edge is inclusive; above it is the final band
+        band = np.where(np.nan_to_num(price) > edges[-1], N_PRICE_BANDS - 1, band)
+        rows = np.flatnonzero(has_price)
+        X[rows, 3 + band[rows]] = 1.0
+    return X
+
+
+def candidate_coefficients(candidates: np.ndarray) -> np.ndarray:
+    """Map (P, len(PARAM_NAMES)) parameter sets to (P, K) coefficients on `design_matrix`"""
+    safety, w_desirability, w_utility, w_price = candidates[:, :4].T
+    return np.column_stack([
+        safety - multiplier_calc.MULTIPLIER_OFFSET,
+        w_desirability,
+        w_utility,
+        w_price[:, None] * candidates[:, 4:],
+    ])
+
+
+def _score_block(X: np.ndarray, audience: np.ndarray, actual: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Error metrics for one block of candidates; returns (P, len(METRICS))"""
+    multipliers = candidate_coefficients(candidates) @ X.T
+    # int() in calculate_collaborations truncates toward zero
+    predicted = np.trunc(multipliers * audience)
+    error = predicted - actual
+    abs_error = np.abs(error)
+    return np.column_stack([
+        abs_error.mean(axis=1),
+        abs_error.sum(axis=1) / max(actual.sum(), 1.0),
+        np.sqrt((error ** 2).mean(axis=1)),
+        error.mean(axis=1),
+        (error > 0).mean(axis=1),
+    ])
+
+
+def evaluate_candidates(
+    campaigns: pd.DataFrame,
+    candidates: np.ndarray,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Score every candidate parameter set against every campaign.
+
+    Args:
+        campaigns: Historical campaigns (see module docstring)
+        candidates: Array of shape (P, len(PARAM_NAMES))
+        workers: Process pool size (default: CPU count; 1 = run inline)
+
+    Returns:
+        DataFrame with one row per candidate and a column per metric
+    """
+    X = design_matrix(campaigns)
+    audience = campaigns["filtered_count"].to_numpy(dtype=float)
+    actual = campaigns["collaborations"].to_numpy(dtype=float)
+
+    block_size = max(1, BLOCK_CELLS // max(len(campaigns), 1))
+    blocks = [candidates[i:i + block_size] for i in range(0, len(candidates), block_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(blocks) == 1:
+        scores = [_score_block(X, audience, actual, block) for block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            scores = list(pool.map(
+                _score_block,
+                [X] * len(blocks), [audience] * len(blocks), [actual] * len(blocks), blocks
+            ))
+    return pd.DataFrame(np.vstack(scores), columns=METRICS)
+
+
+def grid_candidates(grid: Dict[str, list]) -> np.ndarray:
+    """Cartesian product of per-parameter value lists (missing names keep their baseline value)"""
+    base = baseline_params()
+    axes = [np.asarray(grid.get(name, [base[name]]), dtype=float) for name in PARAM_NAMES]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+def random_candidates(n: int, rng: np.random.Generator, bounds: Optional[Dict[str, tuple]] = None) -> np.ndarray:
+    """Uniform samples within `bounds` (defaults to PARAM_BOUNDS)"""
+    bounds = bounds or PARAM_BOUNDS
+    low = np.array([bounds[name][0] for name in PARAM_NAMES])
+    high = np.array([bounds[name][1] for name in PARAM_NAMES])
+    return rng.uniform(low, high, size=(n, len(PARAM_NAMES)))
+
+
+def calibrate(
+    campaigns: pd.DataFrame,
+    n_candidates: int = 100_000,
+    objective: str = "wape",
+    refine_rounds: int = 2,
+    workers: Optional[int] = None,
+    seed: int = 0
+) -> Dict:
+    """
+    Random search over PARAM_BOUNDS, then refinement rounds that resample
+    around the best candidate with a shrinking box.
+
+    Args:
+        campaigns: Historical campaigns
+        n_candidates: Candidates per round
+        objective: Metric to minimize (one of METRICS except bias; |bias| is used for bias)
+        refine_rounds: Number of shrinking-box rounds after the first
+        workers: Process pool size
+        seed: Random seed
+
+    Returns:
+        Dictionary with baseline and calibrated params and metrics
+    """
+    if objective not in METRICS:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {METRICS}")
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    base = baseline_params()
+    base_vector = np.array([[base[name] for name in PARAM_NAMES]])
+
+    def best_of(candidates):
+        scores = evaluate_candidates(campaigns, candidates, workers)
+        key = scores[objective].abs() if objective == "bias" else scores[objective]
+        i = int(key.to_numpy().argmin())
+        return candidates[i], scores.iloc[i]
+
+    best, best_scores = best_of(np.vstack([base_vector, random_candidates(n_candidates, rng)]))
+    bounds = dict(PARAM_BOUNDS)
+    for _ in range(refine_rounds):
+        bounds = {
+            name: (
+                max(PARAM_BOUNDS[name][0], value - (high - low) / 4),
+                min(PARAM_BOUNDS[name][1], value + (high - low) / 4),
+            )
+            for (name, (low, high)), value in zip(bounds.items(), best)
+        }
+        candidates = np.vstack([best[None, :], random_candidates(n_candidates, rng, bounds)])
+        best, best_scores = best_of(candidates)
+
+    baseline_scores = evaluate_candidates(campaigns, base_vector, workers=1).iloc[0]
+    return {
+        "objective": objective,
+        "n_campaigns": len(campaigns),
+        "n_candidates": n_candidates * (refine_rounds + 1),
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "baseline": {"params": base, "metrics": baseline_scores.to_dict()},
+        "calibrated": {
+            "params": {name: round(float(v), 4) for name, v in zip(PARAM_NAMES, best)},
+            "metrics": best_scores.to_dict(),
+        },
+    }
+
+
+def backtest_feasibility(campaigns: pd.DataFrame) -> Optional[Dict]:
+    """
+    Compare `feasibility.calculate_feasibility` max_safe_volume with actual
+    collaborations, and fit a participation rate per score band.
+
+    Returns None when the feasibility input columns are missing.
+    """
+    required = ["product_category", "brand_strength", "campaign_type", "incentive_type"]
+    if not set(required).issubset(campaigns.columns):
+        return None
+
+    eligible = campaigns.get("eligible_users", campaigns["filtered_count"]).to_numpy(dtype=float)
+    actual = campaigns["collaborations"].to_numpy(dtype=float)
+    score = (
+        campaigns["product_category"].map(PRODUCT_UTILITY_SCORE)
+        + campaigns["brand_strength"].map(BRAND_SCORE)
+    ).to_numpy(dtype=float)
+    confidence = np.array([
+        PLATFORM_CONFIDENCE.get(key, np.nan)
+        for key in zip(campaigns["campaign_type"], campaigns["incentive_type"])
+    ])
+
+    bands = list(PARTICIPATION_RATE_BY_SCORE.items())
+    rate = np.full(len(campaigns), 0.2)
+    band_index = np.full(len(campaigns), -1)
+    for i, ((low, high), band_rate) in enumerate(bands):
+        in_band = (score >= low) & (score <= high)
+        rate[in_band] = band_rate
+        band_index[in_band] = i
+
+    valid = ~np.isnan(score) & ~np.isnan(confidence) & (eligible > 0)
+    predicted = np.trunc(eligible * rate * confidence)
+    error = (predicted - actual)[valid]
+
+    # Rate that would have reproduced each campaign exactly; the per-band
+    # median is a robust calibrated participation rate
+    implied = actual / np.where(valid, eligible * confidence, np.nan)
+    fitted = {
+        f"{low}-{high}": round(float(np.nanmedian(implied[valid & (band_index == i)])), 4)
+        if np.any(valid & (band_index == i)) else None
+        for i, ((low, high), _) in enumerate(bands)
+    }
+    return {
+        "n_campaigns": int(valid.sum()),
+        "mae": float(np.abs(error).mean()) if error.size else float("nan"),
+        "wape": float(np.abs(error).sum() / max(actual[valid].sum(), 1.0)),
+        "bias": float(error.mean()) if error.size else float("nan"),
+        "fitted_participation_rate_by_score": fitted,
+    }
+
+
+def _print_metrics(label: str, metrics: Dict[str, float]):
+    print(
+        f"   {label:<11} MAE {metrics['mae']:>10.1f}  WAPE {metrics['wape']:>7.1%}  "
+        f"RMSE {metrics['rmse']:>10.1f}  bias {metrics['bias']:>+9.1f}  over-estimates {metrics['over_rate']:>6.1%}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("campaigns_csv", help="Historical campaigns CSV")
+    parser.add_argument("--candidates", type=int, default=100_000, help="Candidates per search round")
+    parser.add_argument("--rounds", type=int, default=2, help="Refinement rounds after the first")
+    parser.add_argument("--objective", default="wape", choices=METRICS)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the calibrated parameter set as JSON")
+    args = parser.parse_args(argv)
+
+    campaigns = pd.read_csv(args.campaigns_csv)
+    campaigns = campaigns.dropna(subset=["filtered_count", "collaborations"]).reset_index(drop=True)
+    print(f"📊 Backtesting {len(campaigns):,} campaigns")
+
+    result = calibrate(
+        campaigns,
+        n_candidates=args.candidates,
+        objective=args.objective,
+        refine_rounds=args.rounds,
+        workers=args.workers,
+        seed=args.seed
+    )
+    print(f"🔍 Searched {result['n_candidates']:,} parameter sets in {result['elapsed_s']}s (objective: {args.objective})")
+    _print_metrics("current", result["baseline"]["metrics"])
+    _print_metrics("calibrated", result["calibrated"]["metrics"])
+    print("✅ Calibrated parameters:")
+    for name, value in result["calibrated"]["params"].items():
+        print(f"   - {name}: {value} (current {result['baseline']['params'][name]})")
+
+    feasibility = backtest_feasibility(campaigns)
+    if feasibility is not None:
+        result["feasibility"] = feasibility
+        print(f"📋 Feasibility max_safe_volume: MAE {feasibility['mae']:.1f}, WAPE {feasibility['wape']:.1%}, "
+              f"bias {feasibility['bias']:+.1f} over {feasibility['n_campaigns']:,} campaigns")
+        print(f"   Fitted participation rates by score: {feasibility['fitted_participation_rate_by_score']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Saved to {args.output}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
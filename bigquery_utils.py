@@ -1,58 +1,47 @@
 """
 BigQuery utility functions for querying data.
+
+Queries never call CURRENT_DATE(): non-deterministic functions make BigQuery
+skip its result cache. Date-relative queries take an `@as_of_date` parameter
+computed in Python instead (see `today_utc`).
 """
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import pandas as pd
 import os
-from typing import Optional, Dict, Any
-import streamlit as st
-
-# Lazy initialization of BigQuery client
-_client = None
-
-def get_bigquery_client():
-    """Get or create BigQuery client (lazy initialization)"""
-    global _client
-    if _client is None:
-        try:
-            credentials = service_account.Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"]
-            )
-
-            test = bigquery.Client(
-                credentials=credentials,
-                project=credentials.project_id,
-            )
-
-        except Exception as e:
-            raise Exception(
-                f"Failed to initialize BigQuery client: {str(e)}"
-            )
-
-    return test
-
-
-def query_bigquery(query):
-    """Execute a BigQuery query and return results as DataFrame"""
-    client = get_bigquery_client()
-    df = client.query(query).to_dataframe()
-    return df
-
-active_users_query="""
-    WITH users as (
+
+from dashboard_common.warehouse import (  # noqa: F401 (re-exported for the app)
+    get_bigquery_client, today_utc, query_bigquery, shared_query, cached_query, estimate_query_bytes,
+    add_result_transform, current_owner, count_script_run, render_queue_status, render_scan_estimate,
+    render_scan_usage, scheduler, scan_ledger, shared_cache, INTERACTIVE, BACKGROUND, QUERY_CACHE_TTL_S,
+    LOCAL_CACHE_TTL_S
+)
+from pincodes import add_locations
+
+
+def _with_locations(df):
+    """State and district for results with a `postcode` column (pincodes.py)"""
+    return add_locations(df) if "postcode" in df.columns else df
+
+
+add_result_transform(_with_locations)
+
+# The active users data is built from two parts: per-user collaboration
+# counts by platform and execution type, and each user's profile (gender and
+# postcode, from a JSON parse). State and district are looked up from the
+# postcode locally (see pincodes.py). Queries select only the columns a view
+# needs and skip the profile join when none of it is needed.
+_active_users_cte = """
+users as (
   SELECT user_id,
     COALESCE(plat, platform) as platform,
     execution_type,
     COUNT(c.id) as invited, 
     COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false') as accepted,
-    COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(CURRENT_DATE(), DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) < 180) as accepted_180,
-    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(CURRENT_DATE(), DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) < 90) as accepted_90,    
-    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(CURRENT_DATE(), DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) < 30) as accepted_30, 
+    COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(@as_of_date, DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) BETWEEN 0 AND 179) as accepted_180,
+    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(@as_of_date, DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) < 90) as accepted_90,    
+    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND DATE_DIFF(@as_of_date, DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')), DAY) < 30) as accepted_30, 
     -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true') as completed, 
-    COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(CURRENT_DATE(), DATE(completed_at), DAY) < 180) as completed_180,
-    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(CURRENT_DATE(), DATE(completed_at), DAY) < 90) as completed_90,
-    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(CURRENT_DATE(), DATE(completed_at), DAY) < 60) as completed_60
+    COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(@as_of_date, DATE(completed_at), DAY) BETWEEN 0 AND 179) as completed_180,
+    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(@as_of_date, DATE(completed_at), DAY) < 90) as completed_90,
+    -- COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false' AND is_completed = 'true' AND DATE_DIFF(@as_of_date, DATE(completed_at), DAY) < 60) as completed_60
   FROM opa_hybrid.collaboration c
   LEFT JOIN opa_hybrid.campaign cam
   ON c.campaign_id = cam.id
@@ -69,21 +58,148 @@ active_users_query="""
   GROUP BY 1, 2, 3
   HAVING accepted >0
   order by 1
-), 
+)
+"""
 
+_user_profile_cte = """
 location as (
-  SELECT id, gender, state from opa_hybrid.user u
-  LEFT JOIN(
-    SELECT pincode, state, ROW_NUMBER() OVER(partition by pincode) as rn
-    FROM `facts.dim_pincode`
-    Qualify rn = 1
-  ) dim
-  ON CAST(JSON_VALUE(profile, '$.postcode') as INT64) = pincode
+  SELECT id, gender, CAST(JSON_VALUE(profile, '$.postcode') as INT64) as postcode from opa_hybrid.user u
 )
-SELECT * EXCEPT(id) FROM users u
-lEFT JOIN location l
-ON u.user_id = l.id
 """
 
+# Column -> the part it comes from ("u": counts, "l": profile)
+ACTIVE_USERS_COLUMNS = {
+    "user_id": "u", "platform": "u", "execution_type": "u",
+    "invited": "u", "accepted": "u", "accepted_180": "u", "completed_180": "u",
+    "gender": "l", "postcode": "l",
+}
+
+# What the Summary Dashboard counts (and the forecast table / estimation API)
+# (results with a postcode also get LOCATION_COLUMNS, see `_with_locations`)
+# (invited and accepted feed the per-creator propensity scores, see propensity.py)
+SUMMARY_COLUMNS = [
+    "user_id", "platform", "execution_type", "invited", "accepted", "accepted_180", "completed_180", "gender", "postcode"
+]
+
+# What the Active Users tab filters on; its profile columns are fetched by
+# key for the rows it shows (see `user_profiles_query`)
+ACTIVE_USERS_TABLE_COLUMNS = ["user_id", "platform", "execution_type", "invited", "accepted", "accepted_180", "completed_180"]
+USER_PROFILE_COLUMNS = ["gender", "postcode"]
+
+
+def sample_predicate(column: str, sample_percent: float) -> str:
+    """
+    True for a fixed `sample_percent` of the ids in `column`: each id is kept
+    or dropped on its own fingerprint (a per-user Bernoulli sample, unlike
+    TABLESAMPLE which keeps whole storage blocks of users).
+    """
+    return f"MOD(ABS(FARM_FINGERPRINT(CAST({column} AS STRING))), 10000) < {round(sample_percent * 100)}"
+
 
+def active_users_columns_query(columns, sample_percent=None) -> str:
+    """
+    Active users query selecting only `columns` (see ACTIVE_USERS_COLUMNS).
 
+    With `sample_percent`, only the collaborations and profiles of a
+    `sample_predicate` sample of users are joined and aggregated (every row
+    of each sampled user is kept). BigQuery still reads the columns of the
+    whole collaboration table, so the sample saves time, not scan bytes.
+    """
+    unknown = [c for c in columns if c not in ACTIVE_USERS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown active users column(s): {', '.join(unknown)}")
+    users_cte = _active_users_cte.strip()
+    profile_cte = _user_profile_cte.strip()
+    if sample_percent:
+        users_cte = users_cte.replace(
+            "  GROUP BY 1, 2, 3",
+            f"  WHERE {sample_predicate('c.user_id', sample_percent)}\n  GROUP BY 1, 2, 3",
+            1
+        )
+        profile_cte = profile_cte.replace(
+            "from opa_hybrid.user u", f"from opa_hybrid.user u WHERE {sample_predicate('id', sample_percent)}", 1
+        )
+    select = ", ".join(f"{ACTIVE_USERS_COLUMNS[c]}.{c}" for c in columns)
+    if any(ACTIVE_USERS_COLUMNS[c] == "l" for c in columns):
+        return (
+            f"WITH {users_cte},\n\n{profile_cte}\n"
+            f"SELECT {select} FROM users u\nLEFT JOIN location l\nON u.user_id = l.id\n"
+        )
+    return f"WITH {users_cte}\nSELECT {select} FROM users u\n"
+
+
+def user_profiles_query(columns=USER_PROFILE_COLUMNS, by_key=True) -> str:
+    """Profile `columns` with `user_id`, for the users in @user_ids (or everyone)"""
+    where = "WHERE l.id IN UNNEST(@user_ids)\n" if by_key else ""
+    select = ", ".join(f"l.{c}" for c in columns)
+    return f"WITH {_user_profile_cte.strip()}\nSELECT l.id as user_id, {select} FROM location l\n{where}"
+
+
+# Every column; views should prefer the projections above
+active_users_query = active_users_columns_query(list(ACTIVE_USERS_COLUMNS))
+summary_users_query = active_users_columns_query(SUMMARY_COLUMNS)
+active_users_table_query = active_users_columns_query(ACTIVE_USERS_TABLE_COLUMNS)
+
+# Users sampled for the Summary Dashboard's approximate first answer
+# (PROGRESSIVE_SAMPLE_PERCENT, 0 to turn progressive answers off)
+PROGRESSIVE_SAMPLE_PERCENT = float(os.environ.get("PROGRESSIVE_SAMPLE_PERCENT", 1))
+summary_sample_query = (
+    active_users_columns_query(SUMMARY_COLUMNS, PROGRESSIVE_SAMPLE_PERCENT) if PROGRESSIVE_SAMPLE_PERCENT else None
+)
+
+# Activity dates and counts per creator as of @as_of_date, bucketed into
+# recency / frequency / completion / tenure segments (see segments.py). Only
+# acceptances and completions on or before the as-of date count, so a past
+# date sees the history as it was then; columns as in filtered_output.csv
+creator_activity_query = """
+SELECT c.user_id,
+  DATE(u.created_at) as signup_date,
+  MIN(IF(cam.platform = 'product_trials', DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at')), NULL)) as first_pt_accepted_on,
+  MAX(DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at'))) as last_accepted_on,
+  COUNT(*) as accepted_collabs,
+  COUNTIF(c.is_completed = 'true' AND DATE(c.completed_at) <= @as_of_date) as completed_collabs,
+  COUNTIF(DATE_DIFF(@as_of_date, DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at')), DAY) BETWEEN 0 AND 29) as accepted_last_30_days,
+  COUNTIF(DATE_DIFF(@as_of_date, DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at')), DAY) BETWEEN 0 AND 89) as accepted_last_90_days,
+  COUNTIF(DATE_DIFF(@as_of_date, DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at')), DAY) BETWEEN 0 AND 179) as accepted_last_180_days
+FROM opa_hybrid.collaboration c
+JOIN opa_hybrid.user u
+ON c.user_id = u.id
+LEFT JOIN opa_hybrid.campaign cam
+ON c.campaign_id = cam.id
+WHERE c.invite_stage = 'ACCEPTED' AND c.is_revoked = 'false'
+  AND DATE(JSON_VALUE(c.participation_props, '$.acceptance.created_at')) <= @as_of_date
+  AND DATE(u.created_at) <= @as_of_date
+GROUP BY 1, 2
+"""
+
+# Creator directory searched from the Active Users tab (see creator_index.py):
+# one row per user with at least one collaboration, with the IDs ops search by
+creators_query = """
+SELECT u.id as user_id, u.name, u.username, u.instagram_id, u.amazon_id
+FROM opa_hybrid.user u
+WHERE u.id IN (SELECT DISTINCT user_id FROM opa_hybrid.collaboration)
+"""
+
+
+campaign_history_query="""
+SELECT c.campaign_id,
+  COALESCE(d.plat, cam.platform) as platform,
+  cam.execution_type,
+  COUNT(DISTINCT c.user_id) as audience_size,
+  COUNTIF(invite_stage = 'ACCEPTED' AND is_revoked = 'false') as collaborations
+FROM opa_hybrid.collaboration c
+LEFT JOIN opa_hybrid.campaign cam
+ON c.campaign_id = cam.id
+LEFT JOIN (
+  SELECT campaign_id, MAX(d.platform) as plat from opa_hybrid.deliverable d
+  LEFT JOIN opa_hybrid.campaign cam
+  ON d.campaign_id = cam.id
+  WHERE cam.platform not IN('instagram', 'youtube', 'instagram_and_product_trials')
+  GROUP BY 1
+) d
+ON c.campaign_id = d.campaign_id
+-- Only finished campaigns have final collaboration counts
+WHERE cam.stage NOT IN ('LIVE', 'PAUSED')
+GROUP BY 1, 2, 3
+HAVING audience_size > 0
+"""
@@ -0,0 +1,257 @@
+"""
+Compressed user bitmaps for audience overlap.
+
+`Bitmap` is a roaring-style set of non-negative integers: values are split
+into chunks of 65,536 by their high 16 bits, and each chunk is stored as a
+sorted uint16 array while it holds at most 4,096 values, or as a 1,024-word
+uint64 bitset once it is denser. Set operations work chunk by chunk on
+whichever representation each side has, and every chunk keeps its
+cardinality, so counts never decompress anything.
+
+`SegmentIndex` gives every user of a dataset a dense ordinal and builds one
+bitmap per segment (each value of platform, execution type, gender, state
+and district), so distinct-user counts of unions, intersections and
+differences of segments are a few container operations.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+# A chunk with more values than this is stored as a bitset
+ARRAY_MAX = 4096
+WORDS = CHUNK_SIZE // 64
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def _popcount(words: np.ndarray) -> int:
+    return int(_POPCOUNT8[words.view(np.uint8)].sum())
+
+
+def _to_words(values: np.ndarray) -> np.ndarray:
+    bits = np.zeros(CHUNK_SIZE, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _from_words(words: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _contains(words: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Which of `values` are set in the bitset `words`"""
+    return ((words[values >> 6] >> (values & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _container(data: np.ndarray, cardinality: Optional[int] = None) -> Optional[tuple]:
+    """(data, cardinality) in the smaller representation, or None when empty"""
+    if data.dtype == np.uint64:
+        cardinality = _popcount(data) if cardinality is None else cardinality
+        if cardinality > ARRAY_MAX:
+            return data, cardinality
+        data = _from_words(data)
+    if len(data) == 0:
+        return None
+    if len(data) > ARRAY_MAX:
+        return _to_words(data), len(data)
+    return data, len(data)
+
+
+def _is_bitset(data: np.ndarray) -> bool:
+    return data.dtype == np.uint64
+
+
+def _in_array(values: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """Which of `values` are in the array container `other`"""
+    present = np.zeros(CHUNK_SIZE, dtype=bool)
+    present[other] = True
+    return present[values]
+
+
+def _and(a: np.ndarray, b: np.ndarray):
+    if _is_bitset(a) and _is_bitset(b):
+        return _container(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        return _container(a[_contains(b, a)])
+    return _container(a[_in_array(a, b)])
+
+
+def _or(a: np.ndarray, b: np.ndarray):
+    if not _is_bitset(a) and not _is_bitset(b):
+        if len(a) + len(b) <= ARRAY_MAX:
+            return _container(np.union1d(a, b))
+        return _container(_to_words(np.concatenate([a, b])))
+    a = a if _is_bitset(a) else _to_words(a)
+    b = b if _is_bitset(b) else _to_words(b)
+    return _container(a | b)
+
+
+def _andnot(a: np.ndarray, b: np.ndarray):
+    if not _is_bitset(a):
+        keep = ~_contains(b, a) if _is_bitset(b) else ~_in_array(a, b)
+        return _container(a[keep])
+    return _container(a & ~(b if _is_bitset(b) else _to_words(b)))
+
+
+class Bitmap:
+    """
+    Roaring-style compressed set of integers in [0, 2**32).
+
+    Supports `&`, `|`, `-` and `len()`; build one with `Bitmap.from_values`.
+    """
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, tuple]] = None):
+        # high 16 bits -> (uint16 array or uint64 bitset, cardinality)
+        self._chunks: Dict[int, tuple] = chunks or {}
+
+    @classmethod
+    def from_values(cls, values: Iterable[int]) -> "Bitmap":
+        values = np.unique(np.asarray(values, dtype=np.int64))
+        if len(values) and (values[0] < 0 or values[-1] >= 1 << 32):
+            raise ValueError("Bitmap values must be in [0, 2**32)")
+        high = values >> CHUNK_BITS
+        bounds = np.flatnonzero(np.diff(high)) + 1
+        chunks = {}
+        for part in np.split(values, bounds) if len(values) else []:
+            chunks[int(part[0] >> CHUNK_BITS)] = _container((part & (CHUNK_SIZE - 1)).astype(np.uint16))
+        return cls(chunks)
+
+    def _combine(self, other: "Bitmap", op, keys) -> "Bitmap":
+        chunks = {}
+        for key in keys:
+            mine, theirs = self._chunks.get(key), other._chunks.get(key)
+            if theirs is None:
+                result = mine if op is not _and else None
+            elif mine is None:
+                result = theirs if op is _or else None
+            else:
+                result = op(mine[0], theirs[0])
+            if result is not None:
+                chunks[key] = result
+        return Bitmap(chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _and, self._chunks.keys() & other._chunks.keys())
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _or, self._chunks.keys() | other._chunks.keys())
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _andnot, self._chunks.keys())
+
+    def __len__(self) -> int:
+        return sum(cardinality for _, cardinality in self._chunks.values())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitmap) and np.array_equal(self.to_array(), other.to_array())
+
+    def to_array(self) -> np.ndarray:
+        """Sorted values"""
+        parts = [
+            (key << CHUNK_BITS) + (_from_words(data) if _is_bitset(data) else data).astype(np.int64)
+            for key, (data, _) in sorted(self._chunks.items())
+        ]
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(data.nbytes for data, _ in self._chunks.values())
+
+
+def union(bitmaps: Iterable[Bitmap]) -> Bitmap:
+    result = Bitmap()
+    for bitmap in bitmaps:
+        result = result | bitmap
+    return result
+
+
+# Segment columns of the active users data
+SEGMENT_COLUMNS = ("platform", "execution_type", "gender", "state", "district")
+
+
+class SegmentIndex:
+    """
+    Distinct users per segment, as bitmaps over dense user ordinals.
+
+    Args:
+        df: Active users data (one row per user, platform and execution type)
+        columns: Segment columns (missing ones are skipped)
+        key: User column
+        base: Optional row mask; only these rows define segment membership
+            (e.g. the Summary Dashboard's active users)
+
+    A user is in segment (column, value) if any of their rows has that
+    value, so intersecting a platform with an execution type counts users
+    with both, not necessarily on the same row.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        columns: Iterable[str] = SEGMENT_COLUMNS,
+        key: str = "user_id",
+        base: Optional[np.ndarray] = None
+    ):
+        ordinals, self.users = pd.factorize(df[key])
+        rows = ordinals >= 0 if base is None else (ordinals >= 0) & base
+        ordinals = ordinals[rows]
+        self.n_users = len(self.users)
+        self.all = Bitmap.from_values(ordinals)
+        self.columns: List[str] = [c for c in columns if c in df.columns]
+        self.segments: Dict[Tuple[str, object], Bitmap] = {}
+        for column in self.columns:
+            codes, values = pd.factorize(df[column].to_numpy()[rows])
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+            for part in np.split(order, bounds) if len(order) else []:
+                code = codes[part[0]]
+                if code >= 0:
+                    self.segments[(column, values[code])] = Bitmap.from_values(ordinals[part])
+
+    def segment(self, column: str, value) -> Bitmap:
+        return self.segments.get((column, value), Bitmap())
+
+    def values(self, column: str) -> List:
+        """Values of `column`, largest segment first"""
+        found = [(value, len(bitmap)) for (c, value), bitmap in self.segments.items() if c == column]
+        return [value for value, _ in sorted(found, key=lambda item: -item[1])]
+
+    def select(self, all_of=(), any_of=(), none_of=()) -> Bitmap:
+        """
+        Users in every segment of `all_of`, in at least one of `any_of` (if
+        given) and in none of `none_of`; segments are (column, value) pairs.
+        """
+        result = self.all
+        for segment in all_of:
+            result = result & self.segment(*segment)
+        if any_of:
+            result = result & union(self.segment(*segment) for segment in any_of)
+        for segment in none_of:
+            result = result - self.segment(*segment)
+        return result
+
+    def count(self, all_of=(), any_of=(), none_of=()) -> int:
+        """Distinct users `select` keeps"""
+        return len(self.select(all_of, any_of, none_of))
+
+    def overlap_matrix(self, column: str, values: List) -> pd.DataFrame:
+        """Distinct users in both segments for every pair of `values` (segment sizes on the diagonal)"""
+        bitmaps = [self.segment(column, value) for value in values]
+        matrix = np.zeros((len(values), len(values)), dtype=np.int64)
+        for i, a in enumerate(bitmaps):
+            matrix[i, i] = len(a)
+            for j in range(i + 1, len(bitmaps)):
+                matrix[i, j] = matrix[j, i] = len(a & bitmaps[j])
+        return pd.DataFrame(matrix, index=values, columns=values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.all.nbytes + sum(bitmap.nbytes for bitmap in self.segments.values())
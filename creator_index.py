@@ -0,0 +1,276 @@
+"""
+In-memory creator search over user_id, username, instagram_id and amazon_id.
+
+Ops look creators up by an exact ID, by the start of a username or name, or
+by a misspelt username. `CreatorIndex` answers all three without scanning
+the frame:
+
+- exact IDs: a hash index (pandas) of every distinct normalized ID value,
+  pointing at the rows carrying it
+- prefixes: the lower-cased usernames and names as sorted fixed-width
+  bytes, searched by bisection
+- fuzzy: trigram postings (pg_trgm-style padding), ranked by Dice similarity
+
+`refresh` brings the index up to date with a new version of the data. Rows
+whose searchable values did not change are kept; changed and removed rows
+are tombstoned and their new versions go to a small delta that is searched
+linearly, until the delta grows past `rebuild_fraction` and everything is
+rebuilt in one vectorized pass.
+"""
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ID_COLUMNS = ["user_id", "instagram_id", "amazon_id", "username"]
+NAME_COLUMNS = ["username", "name"]
+
+# Bytes kept per name; longer prefixes are checked against the full names
+NAME_WIDTH = 24
+MIN_FUZZY_SCORE = 0.3
+SPACE = ord(" ")
+
+
+def _normalize(values: pd.Series) -> pd.Series:
+    """Search form of IDs and names: trimmed lower-case strings ("" when missing)"""
+    if pd.api.types.is_float_dtype(values):
+        # IDs exported as floats (e.g. 7094070944009737.0) are matched as integers
+        whole = values.notna() & (values == np.floor(values))
+        values = values.astype(object).where(~whole, values[whole].astype("int64").astype(str))
+    text = values.astype("string").fillna("").str.strip().str.lower()
+    return text.str.lstrip("@").astype(object)
+
+
+def _normalize_query(query) -> str:
+    """`_normalize` of a single value"""
+    if isinstance(query, float) and query.is_integer():
+        query = int(query)
+    return str(query).strip().lower().lstrip("@")
+
+
+def _name_bytes(names) -> np.ndarray:
+    """UTF-8 names as fixed-width bytes (truncated to NAME_WIDTH)"""
+    return pd.Series(names, dtype=object).str.encode("utf-8").to_numpy().astype(f"S{NAME_WIDTH}")
+
+
+def _trigrams(name_bytes: np.ndarray):
+    """
+    Trigram codes of names padded as "  name " (so short names and first
+    letters count), with the name of each code and the trigrams per name.
+    """
+    n = len(name_bytes)
+    chars = name_bytes.view(np.uint8).reshape(n, NAME_WIDTH)
+    lengths = (chars != 0).sum(axis=1)
+    padded = np.zeros((n, NAME_WIDTH + 3), dtype=np.int32)
+    padded[:, :2] = SPACE
+    padded[:, 2:NAME_WIDTH + 2] = chars
+    padded[np.arange(n), lengths + 2] = SPACE
+    codes = (padded[:, :-2] << 16) | (padded[:, 1:-1] << 8) | padded[:, 2:]
+    valid = padded[:, 2:] != 0
+    names = np.broadcast_to(np.arange(n, dtype=np.int32)[:, None], codes.shape)
+    return codes[valid], names[valid], valid.sum(axis=1).astype(np.int32)
+
+
+class CreatorIndex:
+    """
+    Args:
+        key: Creator key column; `refresh` matches versions of a row on it
+        id_columns: Columns matched exactly
+        name_columns: Columns matched by prefix and fuzzily
+        rebuild_fraction: Rebuild once the delta holds this share of the rows
+    """
+
+    def __init__(
+        self,
+        key: str = "user_id",
+        id_columns: List[str] = ID_COLUMNS,
+        name_columns: List[str] = NAME_COLUMNS,
+        rebuild_fraction: float = 0.2
+    ):
+        self.key = key
+        self.id_columns = list(id_columns)
+        self.name_columns = list(name_columns)
+        self.rebuild_fraction = rebuild_fraction
+        self.records = pd.DataFrame()
+        self.version = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._alive = np.zeros(0, dtype=bool)
+        self._hashes = pd.Series(dtype="uint64")
+        self._rows = pd.Series(dtype="int64")
+        self._built_rows = 0
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    # -- building -------------------------------------------------------
+
+    def _entries(self, records: pd.DataFrame, columns: List[str], offset: int = 0):
+        """(normalized values, record rows) of `columns`, skipping empty values"""
+        columns = [c for c in columns if c in records.columns]
+        if not columns:
+            return np.array([], dtype=object), np.array([], dtype=np.int32)
+        values = np.concatenate([_normalize(records[c]).to_numpy() for c in columns])
+        rows = np.tile(np.arange(offset, offset + len(records), dtype=np.int32), len(columns))
+        keep = values != ""
+        return values[keep], rows[keep]
+
+    def _build(self, records: pd.DataFrame):
+        # Exact IDs: distinct values -> CSR lists of rows
+        ids, id_rows = self._entries(records, self.id_columns)
+        codes, uniques = pd.factorize(ids)
+        self._ids = pd.Index(uniques)
+        self._id_rows = id_rows[np.argsort(codes, kind="stable")]
+        self._id_starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+
+        # Names: sorted bytes for prefixes, trigram postings for fuzzy matches
+        names, name_rows = self._entries(records, self.name_columns)
+        name_bytes = _name_bytes(names)
+        order = np.argsort(name_bytes, kind="stable")
+        self._names = name_bytes[order]
+        self._name_rows = name_rows[order]
+        tri_codes, tri_names, tri_counts = _trigrams(name_bytes)
+        tri_order = np.argsort(tri_codes, kind="stable")
+        self._tri_codes = tri_codes[tri_order]
+        self._tri_names = tri_names[tri_order]
+        self._name_trigrams = tri_counts
+        self._name_rows_by_build = name_rows
+
+        self.records = records.reset_index(drop=True)
+        self._alive = np.ones(len(records), dtype=bool)
+        self._delta_ids: Dict[str, List[int]] = {}
+        self._delta_names: List[tuple] = []
+        self._built_rows = len(records)
+        self.rebuilds += 1
+
+    def _append(self, records: pd.DataFrame):
+        """Add rows to the delta (searched linearly until the next rebuild)"""
+        offset = len(self.records)
+        self.records = pd.concat([self.records, records], ignore_index=True)
+        self._alive = np.concatenate([self._alive, np.ones(len(records), dtype=bool)])
+        for value, row in zip(*self._entries(records, self.id_columns, offset)):
+            self._delta_ids.setdefault(value, []).append(row)
+        self._delta_names.extend(zip(*self._entries(records, self.name_columns, offset)))
+
+    def refresh(self, df: pd.DataFrame) -> dict:
+        """
+        Bring the index up to date with `df` (one row per creator).
+
+        Returns counts of added, changed and removed creators, whether the
+        index was rebuilt and the seconds taken.
+        """
+        started = time.perf_counter()
+        wanted = {self.key, *self.id_columns, *self.name_columns}
+        columns = [c for c in df.columns if c in wanted]
+        df = df[columns].drop_duplicates(self.key).reset_index(drop=True)
+        hashes = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(), index=df[self.key].to_numpy())
+        with self._lock:
+            previous = self._hashes
+            common = hashes.index.intersection(previous.index)
+            changed = common[hashes.loc[common].to_numpy() != previous.loc[common].to_numpy()]
+            added = hashes.index.difference(previous.index)
+            removed = previous.index.difference(hashes.index)
+            stale = len(self.records) - self._built_rows + len(changed) + len(added) + len(removed)
+            rebuilt = not self._built_rows or stale > self.rebuild_fraction * len(df)
+            if rebuilt:
+                self._build(df)
+                self._rows = pd.Series(np.arange(len(df)), index=df[self.key].to_numpy())
+            elif len(changed) or len(added) or len(removed):
+                gone = changed.append(removed)
+                self._alive[self._rows.loc[gone].to_numpy()] = False
+                fresh = df[df[self.key].isin(changed.append(added))]
+                offset = len(self.records)
+                self._append(fresh)
+                self._rows = pd.concat([
+                    self._rows.drop(gone),
+                    pd.Series(np.arange(offset, offset + len(fresh)), index=fresh[self.key].to_numpy())
+                ])
+            self._hashes = hashes
+            self.version += 1
+        return {
+            "added": len(added), "changed": len(changed), "removed": len(removed), "rebuilt": rebuilt,
+            "seconds": time.perf_counter() - started,
+        }
+
+    # -- searching ------------------------------------------------------
+
+    def _exact(self, value: str) -> np.ndarray:
+        at = self._ids.get_indexer([value])[0]
+        found = self._id_rows[self._id_starts[at]:self._id_starts[at + 1]] if at >= 0 else self._id_rows[:0]
+        return np.concatenate([found, np.asarray(self._delta_ids.get(value, []), dtype=np.int32)])
+
+    def _prefix(self, prefix: str, limit: int) -> np.ndarray:
+        key = prefix.encode("utf-8")[:NAME_WIDTH]
+        low = np.searchsorted(self._names, np.array(key, dtype=self._names.dtype), side="left")
+        if len(key) < NAME_WIDTH:
+            high = np.searchsorted(self._names, np.array(key + b"\xff", dtype=self._names.dtype), side="left")
+        else:
+            # A full-width key has no room for the "\xff" bound: the stored names
+            # it prefixes are the ones equal to it
+            high = np.searchsorted(self._names, np.array(key, dtype=self._names.dtype), side="right")
+        # Tombstoned rows are rare; a few spare candidates cover them
+        rows = self._name_rows[low:min(high, low + limit * 4)]
+        if len(rows) and len(prefix.encode("utf-8")) > NAME_WIDTH:
+            candidates = self.records.iloc[rows]
+            matching = np.zeros(len(rows), dtype=bool)
+            for column in self.name_columns:
+                if column in candidates:
+                    matching |= _normalize(candidates[column]).str.startswith(prefix).to_numpy(dtype=bool)
+            rows = rows[matching]
+        delta = [row for name, row in self._delta_names if name.startswith(prefix)]
+        return np.concatenate([rows, np.asarray(delta, dtype=np.int32)])
+
+    def _fuzzy(self, text: str, limit: int):
+        codes = np.unique(_trigrams(np.array([text.encode("utf-8")], dtype=f"S{NAME_WIDTH}"))[0])
+        low = np.searchsorted(self._tri_codes, codes, side="left")
+        high = np.searchsorted(self._tri_codes, codes, side="right")
+        hits = np.concatenate([self._tri_names[a:b] for a, b in zip(low, high)])
+        names, shared = np.unique(hits, return_counts=True)
+        scores = 2 * shared / (len(codes) + self._name_trigrams[names])
+        rows = self._name_rows_by_build[names]
+        # Delta names are few; score them directly
+        if self._delta_names:
+            delta_names, delta_rows = zip(*self._delta_names)
+            delta_codes, delta_of, delta_counts = _trigrams(
+                np.array([name.encode("utf-8") for name in delta_names], dtype=f"S{NAME_WIDTH}")
+            )
+            delta_shared = np.bincount(delta_of[np.isin(delta_codes, codes)], minlength=len(delta_names))
+            rows = np.concatenate([rows, np.asarray(delta_rows, dtype=np.int32)])
+            scores = np.concatenate([scores, 2 * delta_shared / (len(codes) + delta_counts)])
+        keep = (scores >= MIN_FUZZY_SCORE) & self._alive[rows]
+        rows, scores = rows[keep], scores[keep]
+        top = np.argsort(-scores, kind="stable")[:limit * 2]
+        return rows[top], scores[top]
+
+    def search(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Creators matching `query`: exact ID matches first, then username/name
+        prefixes, then fuzzy username/name matches.
+
+        Returns up to `limit` rows of the indexed columns plus `match` and
+        `score` (1.0 for exact and prefix matches).
+        """
+        text = _normalize_query(query)
+        with self._lock:
+            records = self.records
+            if not text or not self._built_rows:
+                return records.iloc[:0].assign(match=[], score=[])
+            found = []
+            for kind, rows in (("exact", self._exact(text)), ("prefix", self._prefix(text, limit))):
+                rows = rows[self._alive[rows]]
+                found.append((rows, kind, np.ones(len(rows))))
+            # An exact ID match is what was asked for; fuzzy matches are for names
+            if not len(found[0][0]) and len(found[1][0]) < limit and len(text) >= 2:
+                rows, scores = self._fuzzy(text, limit)
+                found.append((rows, "fuzzy", scores))
+        rows = np.concatenate([rows for rows, _, _ in found])
+        kinds = np.concatenate([np.full(len(rows), kind, dtype=object) for rows, kind, _ in found])
+        scores = np.concatenate([scores for _, _, scores in found])
+        _, first = np.unique(rows, return_index=True)
+        first = np.sort(first)[:limit]
+        result = records.iloc[rows[first]].reset_index(drop=True)
+        result["match"] = kinds[first]
+        result["score"] = scores[first].round(2)
+        return result
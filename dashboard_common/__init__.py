@@ -0,0 +1,5 @@
+"""
+Modules shared by the dashboard (`app.py`) and the query viewer
+(`query_viewer/app.py`): facet index, rerun timing, job scheduler, scan
+budgets, shared result cache and pre-warming.
+"""
@@ -0,0 +1,124 @@
+"""
+Facet index for filter dropdowns.
+
+Built once per loaded dataset: every filterable column is factorized into
+integer codes, so the distinct values of a column and their counts under the
+other active filters take one boolean mask and one np.bincount, instead of
+re-scanning the DataFrame on every widget interaction.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class FacetIndex:
+    """
+    Distinct values and per-option counts for the filterable columns of a frame.
+
+    Args:
+        df: The loaded dataset
+        columns: Filterable columns (missing columns are skipped)
+        measures: Numeric columns that can be summed instead of counting rows
+
+    Selections are passed as {column: value or list of values}; None, "All"
+    or an empty list means the column is not filtered.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str], measures: Iterable[str] = ()):
+        self.n_rows = len(df)
+        self.columns: List[str] = [c for c in columns if c in df.columns]
+        self.values: Dict[str, list] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._positions: Dict[str, dict] = {}
+        for column in self.columns:
+            # Missing values get code -1 and are never counted
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self._codes[column] = codes
+            self.values[column] = uniques.tolist()
+            self._positions[column] = {value: i for i, value in enumerate(self.values[column])}
+        self._measures: Dict[str, np.ndarray] = {
+            m: pd.to_numeric(df[m], errors="coerce").fillna(0).to_numpy(dtype=float)
+            for m in measures if m in df.columns
+        }
+
+    def mask(
+        self,
+        selections: Optional[dict] = None,
+        exclude: Optional[str] = None,
+        base: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Rows matching every selection except the one on `exclude`"""
+        mask = np.ones(self.n_rows, dtype=bool) if base is None else base.copy()
+        for column, selected in (selections or {}).items():
+            if column == exclude or column not in self._codes:
+                continue
+            selected = _as_list(selected)
+            if not selected:
+                continue
+            # Lookup table over codes; the extra last slot is hit by code -1
+            allowed = np.zeros(len(self.values[column]) + 1, dtype=bool)
+            positions = self._positions[column]
+            allowed[[positions[v] for v in selected if v in positions]] = True
+            mask &= allowed[self._codes[column]]
+        return mask
+
+    def counts(
+        self,
+        column: str,
+        selections: Optional[dict] = None,
+        base: Optional[np.ndarray] = None,
+        measure: Optional[str] = None
+    ) -> pd.Series:
+        """Rows (or the sum of `measure`) per distinct value of `column` under the other selections"""
+        mask = self.mask(selections, exclude=column, base=base)
+        mask &= self._codes[column] >= 0
+        weights = self._measures[measure][mask] if measure else None
+        counts = np.bincount(self._codes[column][mask], weights=weights, minlength=len(self.values[column]))
+        if measure is None or np.all(counts == np.round(counts)):
+            counts = counts.astype(np.int64)
+        return pd.Series(counts, index=pd.Index(self.values[column], name=column), name="count")
+
+    def count(self, selections: Optional[dict] = None, base: Optional[np.ndarray] = None) -> int:
+        """Rows matching all selections"""
+        return int(self.mask(selections, base=base).sum())
+
+    def options(
+        self,
+        column: str,
+        selections: Optional[dict] = None,
+        hide_empty: bool = False,
+        base: Optional[np.ndarray] = None,
+        counts: Optional[pd.Series] = None
+    ) -> List:
+        """
+        Sorted distinct values of `column`; with hide_empty, only values that
+        still match rows under the other selections (the current selection of
+        `column` is always kept so the widget does not lose it). Pass
+        precomputed `counts` to avoid counting twice.
+        """
+        if not hide_empty:
+            return list(self.values[column])
+        if counts is None:
+            counts = self.counts(column, selections, base)
+        keep = set(_as_list((selections or {}).get(column)))
+        return [value for value, n in counts.items() if n > 0 or value in keep]
+
+
+def _as_list(selected) -> list:
+    if selected is None or (isinstance(selected, str) and selected == "All"):
+        return []
+    if isinstance(selected, (list, tuple, set)):
+        return list(selected)
+    return [selected]
+
+
+def format_option(value, counts: Optional[pd.Series]) -> str:
+    """Dropdown label like 'amazon (1,234)'; plain value when counts are unknown"""
+    if counts is None:
+        return str(value)
+    if value == "All":
+        return f"All ({int(counts.sum()):,})"
+    if value not in counts.index:
+        return str(value)
+    return f"{value} ({int(counts[value]):,})"
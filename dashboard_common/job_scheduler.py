@@ -0,0 +1,310 @@
+"""
+In-process scheduler for warehouse jobs.
+
+Every query goes through one bounded pool of worker threads per process:
+
+- a global cap (`max_workers`) and a per-owner cap (`per_owner_limit`, one
+  owner per Streamlit session) on jobs running at once
+- interactive jobs start before background refreshes
+- a bounded queue: when it is full, queued background jobs are shed first
+  and new jobs are rejected with `SchedulerBusy` instead of piling up threads
+- timeouts and cancellation; a cancelled job runs its cancel callbacks
+  (e.g. `QueryJob.cancel()`) so the warehouse stops working on it too
+- a newer job with the same (owner, key) supersedes the older one
+
+`stats()` exposes queue depth, running jobs and wait times.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Recent wait / run times kept for stats
+MAX_SAMPLES = 1000
+
+
+class SchedulerBusy(Exception):
+    """The queue is full; try again later"""
+
+
+class JobCancelled(Exception):
+    """The job was cancelled before it finished"""
+
+
+class JobTimeout(JobCancelled):
+    """The job did not finish within its timeout and was cancelled"""
+
+
+class Job:
+    """A scheduled call; `fn` receives the Job so it can register cancel callbacks"""
+
+    def __init__(self, fn: Callable[["Job"], Any], owner, priority: int, key):
+        self.fn = fn
+        self.owner = owner
+        self.priority = priority
+        self.key = key
+        self.state = "queued"
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_reason: Optional[str] = None
+        self._result = None
+        self._error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._cancel_callbacks: List[Callable[[], Any]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.state == "cancelled"
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Call `callback` if the job is cancelled (immediately if it already was)"""
+        with self._lock:
+            if not self.cancelled:
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def _finish(self, state: str, result=None, error: Optional[BaseException] = None) -> bool:
+        with self._lock:
+            if self.done:
+                return False
+            self.state = state
+            self._result = result
+            self._error = error
+            self.finished_at = time.monotonic()
+            self._done.set()
+            callbacks = self._cancel_callbacks if state == "cancelled" else []
+            self._cancel_callbacks = []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def result(self):
+        """The return value of `fn`; raises its error or JobCancelled"""
+        self._done.wait()
+        if self.cancelled:
+            error = JobTimeout if self.cancel_reason == "timeout" else JobCancelled
+            raise error(f"Query {self.cancel_reason or 'cancelled'}")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class JobScheduler:
+    """
+    Args:
+        max_workers: Jobs running at once across all owners (worker threads)
+        per_owner_limit: Jobs running at once for one owner
+        max_queue: Queued (not yet running) jobs before new ones are rejected
+        poll_s: How often waiters check for timeouts and staleness
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        per_owner_limit: int = 2,
+        max_queue: int = 100,
+        poll_s: float = 0.2
+    ):
+        self.max_workers = max_workers
+        self.per_owner_limit = per_owner_limit
+        self.max_queue = max_queue
+        self.poll_s = poll_s
+
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._running: Dict[Any, int] = {}
+        self._active: set = set()
+        self._by_key: Dict[Any, Job] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "timed_out": 0, "rejected": 0}
+        self._max_queued = 0
+        self._waits_ms: deque = deque(maxlen=MAX_SAMPLES)
+        self._runs_ms: deque = deque(maxlen=MAX_SAMPLES)
+
+    # -- submitting -------------------------------------------------------
+
+    def submit(
+        self,
+        fn: Callable[[Job], Any],
+        owner=None,
+        priority: int = INTERACTIVE,
+        key=None
+    ) -> Job:
+        """Queue `fn(job)`; raises SchedulerBusy when the queue is full"""
+        job = Job(fn, owner, priority, key)
+        with self._cond:
+            if key is not None:
+                previous = self._by_key.get((owner, key))
+                if previous is not None and not previous.done:
+                    self._cancel_locked(previous, "superseded")
+                self._by_key[(owner, key)] = job
+
+            if self._queued_locked() >= self.max_queue and not self._shed_locked(priority):
+                self._counts["rejected"] += 1
+                raise SchedulerBusy(
+                    f"Warehouse queue is full ({self.max_queue} queries waiting); please retry shortly"
+                )
+
+            heapq.heappush(self._queue, (priority, next(self._sequence), job))
+            self._counts["submitted"] += 1
+            self._max_queued = max(self._max_queued, self._queued_locked())
+            self._start_workers_locked()
+            self._cond.notify_all()
+        return job
+
+    def run(
+        self,
+        fn: Callable[[Job], Any],
+        owner=None,
+        priority: int = INTERACTIVE,
+        key=None,
+        timeout_s: Optional[float] = None,
+        is_stale: Optional[Callable[[], bool]] = None
+    ):
+        """
+        Submit `fn` and wait for its result.
+
+        The job is cancelled (and JobTimeout / JobCancelled raised) when it
+        does not finish within `timeout_s` or when `is_stale()` turns true,
+        e.g. because the session that asked for it has moved on.
+        """
+        job = self.submit(fn, owner, priority, key)
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while not job._done.wait(self.poll_s):
+            if deadline is not None and time.monotonic() >= deadline:
+                self.cancel(job, "timeout")
+            elif is_stale is not None and is_stale():
+                self.cancel(job, "cancelled: superseded by a newer run")
+        return job.result()
+
+    # -- cancelling -------------------------------------------------------
+
+    def cancel(self, job: Job, reason: str = "cancelled") -> bool:
+        with self._cond:
+            return self._cancel_locked(job, reason)
+
+    def cancel_owner(self, owner, reason: str = "cancelled") -> int:
+        """Cancel every unfinished job of `owner`; returns how many were cancelled"""
+        with self._cond:
+            jobs = [j for _, _, j in self._queue if j.owner == owner]
+            jobs += [j for j in self._active if j.owner == owner]
+            return sum(self._cancel_locked(j, reason) for j in jobs)
+
+    def _cancel_locked(self, job: Job, reason: str) -> bool:
+        if job.done:
+            return False
+        job.cancel_reason = reason
+        was_queued = job.state == "queued"
+        if not job._finish("cancelled"):
+            return False
+        self._counts["timed_out" if reason == "timeout" else "cancelled"] += 1
+        if self._by_key.get((job.owner, job.key)) is job:
+            del self._by_key[(job.owner, job.key)]
+        if was_queued:
+            self._queue = [entry for entry in self._queue if entry[2] is not job]
+            heapq.heapify(self._queue)
+        self._cond.notify_all()
+        return True
+
+    def _shed_locked(self, priority: int) -> bool:
+        """Make room for a job of `priority` by dropping the newest queued lower-priority job"""
+        candidates = [entry for entry in self._queue if entry[0] > priority]
+        if not candidates:
+            return False
+        return self._cancel_locked(max(candidates)[2], "shed: queue full")
+
+    # -- workers ----------------------------------------------------------
+
+    def _queued_locked(self) -> int:
+        return len(self._queue)
+
+    def _start_workers_locked(self):
+        while len(self._threads) < self.max_workers and len(self._threads) < self._queued_locked() + sum(self._running.values()):
+            thread = threading.Thread(
+                target=self._worker, name=f"warehouse-job-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job_locked(self) -> Optional[Job]:
+        """Highest-priority, oldest queued job whose owner is under its cap"""
+        for entry in sorted(self._queue):
+            job = entry[2]
+            if job.owner is None or self._running.get(job.owner, 0) < self.per_owner_limit:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job_locked()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job_locked()
+                job.state = "running"
+                job.started_at = time.monotonic()
+                self._running[job.owner] = self._running.get(job.owner, 0) + 1
+                self._active.add(job)
+                self._waits_ms.append((job.started_at - job.submitted_at) * 1000)
+
+            try:
+                result, error = job.fn(job), None
+            except BaseException as e:
+                result, error = None, e
+
+            with self._cond:
+                self._active.discard(job)
+                self._running[job.owner] -= 1
+                if not self._running[job.owner]:
+                    del self._running[job.owner]
+                if self._by_key.get((job.owner, job.key)) is job:
+                    del self._by_key[(job.owner, job.key)]
+                if job._finish("failed" if error else "done", result, error):
+                    self._counts["failed" if error else "completed"] += 1
+                    self._runs_ms.append((job.finished_at - job.started_at) * 1000)
+                self._cond.notify_all()
+
+    # -- metrics ----------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Queue depth, running jobs, totals and p50/p95 queue wait and run times (ms)"""
+        with self._cond:
+            queued_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._queue:
+                queued_by_priority[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            waits = np.array(self._waits_ms)
+            runs = np.array(self._runs_ms)
+            return {
+                "queued": self._queued_locked(),
+                "queued_by_priority": queued_by_priority,
+                "max_queued": self._max_queued,
+                "running": sum(self._running.values()),
+                "workers": len(self._threads),
+                **self._counts,
+                "wait_p50_ms": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                "wait_p95_ms": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                "run_p50_ms": float(np.percentile(runs, 50)) if len(runs) else 0.0,
+            }
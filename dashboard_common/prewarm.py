@@ -0,0 +1,133 @@
+"""
+Background cache pre-warming.
+
+A `Prewarmer` runs a fixed set of warm-up tasks (usually the queries every
+session starts with) once when the process starts and then, optionally, on
+a schedule, so the first user of the day reads them from cache.
+
+`UsageLog` records which Summary Dashboard selections users apply; the most
+common recent ones are prefetched speculatively by the dashboard's tasks.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+USAGE_LOG_PATH = os.environ.get(
+    "USAGE_LOG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "usage_log.jsonl")
+)
+
+# Tasks run at once during a warm-up
+PREWARM_WORKERS = 4
+
+# Warm-ups after the one at process start (PREWARM_INTERVAL_MIN, 0 to turn off);
+# they also pick up the new as-of date after midnight UTC
+PREWARM_INTERVAL_S = float(os.environ.get("PREWARM_INTERVAL_MIN", 60)) * 60 or None
+
+
+class UsageLog:
+    """Append-only JSON-lines log of applied selections, shared by replicas on a shared path"""
+
+    def __init__(self, path: str = USAGE_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, **selection):
+        entry = {"ts": datetime.datetime.now(datetime.timezone.utc).isoformat(), **selection}
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        except OSError:
+            # The log only guides prefetching; never fail the caller over it
+            pass
+
+    def top(self, fields: Tuple[str, ...], n: int = 5, days: int = 14) -> List[Tuple]:
+        """The `n` most common values of `fields` recorded in the last `days` days"""
+        since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)).isoformat()
+        counts = Counter()
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("ts", "") >= since:
+                        counts[tuple(entry.get(field) for field in fields)] += 1
+        except FileNotFoundError:
+            return []
+        return [values for values, _ in counts.most_common(n)]
+
+
+class Prewarmer:
+    """
+    Args:
+        tasks: {name: callable}; each call should leave its result in a cache
+        interval_s: Run the tasks again this often (None: only at start)
+    """
+
+    def __init__(self, tasks: Dict[str, Callable[[], Any]], interval_s: Optional[float] = None):
+        self.tasks = tasks
+        self.interval_s = interval_s
+        self._status: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Prewarmer":
+        """Run the tasks in a background thread (once, then every interval_s)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            if not self.interval_s:
+                return
+            time.sleep(self.interval_s)
+
+    def _run_task(self, name: str, task: Callable[[], Any]):
+        started = time.perf_counter()
+        try:
+            task()
+            error = None
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self._status[name] = {
+                "task": name,
+                "finished": datetime.datetime.now().strftime("%H:%M:%S"),
+                "duration_ms": round((time.perf_counter() - started) * 1000),
+                "error": error,
+            }
+
+    def run_once(self):
+        """Run every task now and wait for them"""
+        with ThreadPoolExecutor(max_workers=PREWARM_WORKERS, thread_name_prefix="prewarm") as pool:
+            for name, task in self.tasks.items():
+                pool.submit(self._run_task, name, task)
+
+    def status(self) -> pd.DataFrame:
+        """Last run of each task"""
+        with self._lock:
+            rows = list(self._status.values())
+        return pd.DataFrame(rows, columns=["task", "finished", "duration_ms", "error"])
+
+
+def render_prewarm_status(prewarmer: Prewarmer):
+    """Sidebar table of the last warm-up of each task"""
+    with st.sidebar.expander("🔥 Cache pre-warm"):
+        status = prewarmer.status()
+        if status.empty:
+            st.caption("Warming up...")
+        else:
+            st.dataframe(status, hide_index=True)
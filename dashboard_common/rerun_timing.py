@@ -0,0 +1,76 @@
+"""
+Rerun latency per interaction type.
+
+Wrap the full script run and each fragment body in `timed(scope)`; the
+durations are kept per process (shared by every session) so the cost of a
+full rerun can be compared with the partial reruns that fragments allow.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Most recent runs kept per scope
+MAX_SAMPLES = 500
+
+FULL_RUN = "full rerun"
+
+
+@st.cache_resource
+def _store():
+    return defaultdict(lambda: deque(maxlen=MAX_SAMPLES)), threading.Lock()
+
+
+def record(scope: str, started: float):
+    """Record the time since `started` (a time.perf_counter() value) under `scope`"""
+    samples, lock = _store()
+    with lock:
+        samples[scope].append((time.perf_counter() - started) * 1000)
+
+
+@contextmanager
+def timed(scope: str):
+    """Record how long the block (or decorated function) takes under `scope`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(scope, started)
+
+
+def timing_samples() -> dict:
+    """Copy of the recorded latencies (ms) per scope"""
+    samples, lock = _store()
+    with lock:
+        return {scope: list(values) for scope, values in samples.items()}
+
+
+def timing_summary() -> pd.DataFrame:
+    """Runs and p50/p95/max latency (ms) per scope"""
+    snapshot = {scope: np.array(values) for scope, values in timing_samples().items() if values}
+    rows = [
+        {
+            "scope": scope,
+            "runs": len(values),
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p95_ms": round(float(np.percentile(values, 95)), 1),
+            "max_ms": round(float(values.max()), 1),
+        }
+        for scope, values in snapshot.items()
+    ]
+    return pd.DataFrame(rows, columns=["scope", "runs", "p50_ms", "p95_ms", "max_ms"])
+
+
+def render_timings():
+    """Sidebar table of the timings recorded so far in this process"""
+    with st.sidebar.expander("⏱️ Rerun timings"):
+        summary = timing_summary()
+        if summary.empty:
+            st.caption("No runs recorded yet.")
+        else:
+            st.dataframe(summary, hide_index=True)
+            st.caption("Fragment scopes rerun alone when their own widgets change.")
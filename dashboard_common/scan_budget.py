@@ -0,0 +1,104 @@
+"""
+Scan-bytes guardrails for warehouse queries.
+
+Before a query runs, its dry-run estimate of bytes processed is checked
+against a per-query limit and against what the session has already scanned.
+After it runs, the actual bytes are recorded next to the estimate.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+import pandas as pd
+
+GB = 1024 ** 3
+TB = 1024 ** 4
+
+# Recent queries kept for the estimated-vs-actual table
+MAX_HISTORY = 200
+
+# Sessions whose usage is remembered (oldest are forgotten first)
+MAX_OWNERS = 10_000
+
+
+class QueryBudgetExceeded(Exception):
+    """The query would scan more than its per-query or per-session budget"""
+
+
+def normalize_query(query: str) -> str:
+    """Query text with comments dropped and whitespace collapsed, for cache keys"""
+    query = re.sub(r"--[^\n]*", " ", query)
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def format_bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "-"
+    for unit, size in (("TB", TB), ("GB", GB), ("MB", 1024 ** 2), ("KB", 1024)):
+        if n >= size:
+            return f"{n / size:.1f} {unit}"
+    return f"{int(n)} B"
+
+
+class ScanLedger:
+    """
+    Per-owner scanned bytes and per-query estimates vs actuals.
+
+    Args:
+        per_query_limit: Largest estimate allowed for one query
+        per_owner_limit: Total bytes one owner (session) may scan
+    """
+
+    def __init__(self, per_query_limit: int, per_owner_limit: int):
+        self.per_query_limit = per_query_limit
+        self.per_owner_limit = per_owner_limit
+        self._usage: OrderedDict = OrderedDict()
+        self._history: deque = deque(maxlen=MAX_HISTORY)
+        self._lock = threading.Lock()
+
+    def usage(self, owner) -> int:
+        with self._lock:
+            return self._usage.get(owner, 0)
+
+    def check(self, owner, estimated_bytes: int):
+        """Raise QueryBudgetExceeded if a query of `estimated_bytes` is not allowed for `owner`"""
+        if estimated_bytes > self.per_query_limit:
+            raise QueryBudgetExceeded(
+                f"Query would scan {format_bytes(estimated_bytes)}, over the per-query limit of "
+                f"{format_bytes(self.per_query_limit)}"
+            )
+        if owner is None:
+            return
+        used = self.usage(owner)
+        if used + estimated_bytes > self.per_owner_limit:
+            raise QueryBudgetExceeded(
+                f"Query would scan {format_bytes(estimated_bytes)}; this session has already scanned "
+                f"{format_bytes(used)} of its {format_bytes(self.per_owner_limit)} budget"
+            )
+
+    def record(self, owner, query: str, estimated_bytes: Optional[int], actual_bytes: Optional[int]):
+        """Charge `owner` for the actual bytes and remember the estimate for comparison"""
+        with self._lock:
+            if owner is not None:
+                self._usage[owner] = self._usage.get(owner, 0) + (actual_bytes or 0)
+                self._usage.move_to_end(owner)
+                while len(self._usage) > MAX_OWNERS:
+                    self._usage.popitem(last=False)
+            self._history.append({
+                "time": time.strftime("%H:%M:%S"),
+                "query": normalize_query(query)[:80],
+                "estimated_bytes": estimated_bytes,
+                "actual_bytes": actual_bytes,
+            })
+
+    def history(self) -> pd.DataFrame:
+        """Recent queries, newest first, with actual / estimated ratio"""
+        with self._lock:
+            rows = list(self._history)[::-1]
+        df = pd.DataFrame(rows, columns=["time", "query", "estimated_bytes", "actual_bytes"])
+        estimated = pd.to_numeric(df["estimated_bytes"], errors="coerce")
+        actual = pd.to_numeric(df["actual_bytes"], errors="coerce")
+        df["actual_vs_estimate"] = (actual / estimated.where(estimated > 0)).round(2)
+        return df
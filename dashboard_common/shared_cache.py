@@ -0,0 +1,306 @@
+"""
+Result cache shared by every replica of the app.
+
+DataFrames are stored as zstd-compressed Arrow IPC blobs in a backend that
+all replicas can reach:
+
+- `RedisBackend`: any Redis-compatible server (`redis://` / `rediss://` URLs)
+- `FileBackend`: a directory on a shared filesystem
+- `MemoryBackend`: in-process stand-in for tests and single-replica runs
+
+Each entry is fresh for `fresh_s` and then served stale for up to `stale_s`
+more. Refreshing an entry needs a per-key lease, so when it expires exactly
+one replica queries the warehouse while the others keep serving the stale
+copy, and on a cold miss the other replicas wait for the lease holder's
+result instead of running the same query.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import pandas as pd
+
+# How long a lease is held at most (a replica that dies mid-refresh frees it after this)
+LEASE_TTL_S = 6 * 60
+
+# How often a replica waiting on another's lease checks for the result
+WAIT_POLL_S = 0.1
+
+
+def cache_key(*parts) -> str:
+    """Stable key for `parts` (e.g. normalized query text and its parameters)"""
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def to_blob(df: pd.DataFrame, fresh_until: float, expires_at: float) -> bytes:
+    """DataFrame as a JSON header line followed by a compressed Arrow IPC stream"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        writer.write_table(table)
+    header = json.dumps({"fresh_until": fresh_until, "expires_at": expires_at}).encode()
+    return header + b"\n" + sink.getvalue().to_pybytes()
+
+
+def from_blob(blob: bytes):
+    """(DataFrame, header) from `to_blob` output"""
+    import pyarrow as pa
+
+    header, _, body = blob.partition(b"\n")
+    table = pa.ipc.open_stream(io.BytesIO(body)).read_all()
+    return table.to_pandas(), json.loads(header)
+
+
+class MemoryBackend:
+    """Process-local stand-in with the same semantics as the shared backends"""
+
+    def __init__(self):
+        self._values = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value, expires_at = self._values.get(key, (None, 0))
+            if value is not None and expires_at <= time.time():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl_s)
+
+    def acquire_lease(self, key: str, token: str, ttl_s: float) -> bool:
+        with self._lock:
+            holder = self._leases.get(key)
+            if holder is not None and holder[1] > time.time():
+                return False
+            self._leases[key] = (token, time.time() + ttl_s)
+            return True
+
+    def release_lease(self, key: str, token: str):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == token:
+                del self._leases[key]
+
+
+class FileBackend:
+    """
+    Entries and leases as files under `root` (e.g. an NFS/EFS mount).
+
+    Leases are created with O_EXCL, which is atomic on local and NFSv3+
+    filesystems; an expired lease file is removed by the next replica.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{key}{suffix}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key, ".arrow"), "rb") as f:
+                expires_at = float(f.readline())
+                if expires_at <= time.time():
+                    return None
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        path = self._path(key, ".arrow")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{time.time() + ttl_s}\n".encode())
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def acquire_lease(self, key: str, token: str, ttl_s: float) -> bool:
+        path = self._path(key, ".lease")
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path) as f:
+                        _, expires_at = f.read().split()
+                    if float(expires_at) > time.time():
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except ValueError:
+                    # Being written right now, or left empty by a crashed replica
+                    try:
+                        if os.path.getmtime(path) < time.time() - ttl_s:
+                            os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{token} {time.time() + ttl_s}")
+            return True
+        return False
+
+    def release_lease(self, key: str, token: str):
+        path = self._path(key, ".lease")
+        try:
+            with open(path) as f:
+                if f.read().split()[0] == token:
+                    os.remove(path)
+        except (FileNotFoundError, IndexError):
+            pass
+
+
+# Delete the lease only if it is still ours
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Entries and leases in a Redis-compatible server (requires the `redis` package)"""
+
+    def __init__(self, url: str, prefix: str = "dashboard-cache:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        self._redis.set(self.prefix + key, value, px=max(1, int(ttl_s * 1000)))
+
+    def acquire_lease(self, key: str, token: str, ttl_s: float) -> bool:
+        return bool(self._redis.set(f"{self.prefix}{key}:lease", token, nx=True, px=int(ttl_s * 1000)))
+
+    def release_lease(self, key: str, token: str):
+        self._redis.eval(_RELEASE_SCRIPT, 1, f"{self.prefix}{key}:lease", token)
+
+
+def backend_from_url(url: Optional[str]):
+    """`redis://…` → RedisBackend, `file:///path` or a path → FileBackend, empty or `memory://` → MemoryBackend"""
+    if not url or url == "memory://":
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    return FileBackend(url)
+
+
+class SharedCache:
+    """
+    Args:
+        backend: One of the backends above
+        lease_ttl_s: Longest a refresh may hold its key's lease
+    """
+
+    def __init__(self, backend, lease_ttl_s: float = LEASE_TTL_S):
+        self.backend = backend
+        self.lease_ttl_s = lease_ttl_s
+        self._token = uuid.uuid4().hex
+        self._refreshes = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shared-cache-refresh")
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "stale_hits": 0, "misses": 0, "waits": 0, "refreshes": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _read(self, key: str):
+        blob = self.backend.get(key)
+        if blob is None:
+            return None, None
+        try:
+            return from_blob(blob)
+        except Exception:
+            self._count("errors")
+            return None, None
+
+    def _store(self, key: str, df: pd.DataFrame, fresh_s: float, stale_s: float):
+        now = time.time()
+        try:
+            self.backend.set(key, to_blob(df, now + fresh_s, now + fresh_s + stale_s), fresh_s + stale_s)
+        except Exception:
+            # Frames Arrow cannot encode are simply not shared
+            self._count("errors")
+
+    def _compute_and_store(self, key, compute, fresh_s, stale_s, token) -> pd.DataFrame:
+        try:
+            df = compute()
+            self._store(key, df, fresh_s, stale_s)
+            return df
+        finally:
+            self.backend.release_lease(key, token)
+
+    def _refresh(self, key, compute, fresh_s, stale_s, token):
+        try:
+            self._compute_and_store(key, compute, fresh_s, stale_s, token)
+            self._count("refreshes")
+        except Exception:
+            # Keep serving the stale entry; the next reader retries
+            self._count("errors")
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], pd.DataFrame],
+        fresh_s: float,
+        stale_s: float = 0,
+        refresh: Optional[Callable[[], pd.DataFrame]] = None
+    ) -> pd.DataFrame:
+        """
+        The cached frame for `key`, computing it with `compute()` on a miss.
+
+        A stale entry is returned as is while one replica refreshes it in the
+        background with `refresh()` (default `compute`).
+        """
+        df, header = self._read(key)
+        if df is not None and header["fresh_until"] > time.time():
+            self._count("hits")
+            return df
+
+        token = f"{self._token}:{uuid.uuid4().hex}"
+        if df is not None:
+            self._count("stale_hits")
+            if self.backend.acquire_lease(key, token, self.lease_ttl_s):
+                self._refreshes.submit(self._refresh, key, refresh or compute, fresh_s, stale_s, token)
+            return df
+
+        self._count("misses")
+        if not self.backend.acquire_lease(key, token, self.lease_ttl_s):
+            # Another replica (or thread) is computing this key; wait for its result
+            self._count("waits")
+            deadline = time.monotonic() + self.lease_ttl_s
+            while True:
+                time.sleep(WAIT_POLL_S)
+                df, _ = self._read(key)
+                if df is not None:
+                    return df
+                # The holder failed (and released the lease): compute it here
+                if self.backend.acquire_lease(key, token, self.lease_ttl_s):
+                    break
+                if time.monotonic() >= deadline:
+                    return compute()
+        return self._compute_and_store(key, compute, fresh_s, stale_s, token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,325 @@
+"""
+Warehouse access shared by the dashboard and the query viewer.
+
+Both apps' `bigquery_utils` re-export this module and add their own queries.
+It holds the BigQuery client, one job scheduler per process (priorities,
+per-session limits, cancellation of superseded runs), the dry-run scan
+budgets and the result cache shared by every replica. App-specific
+post-processing of results (e.g. the dashboard's postcode lookup) is
+registered with `add_result_transform`.
+"""
+import datetime
+import os
+from typing import Callable, List
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from dashboard_common.job_scheduler import JobScheduler, INTERACTIVE, BACKGROUND
+from dashboard_common.scan_budget import GB, ScanLedger, QueryBudgetExceeded, normalize_query, format_bytes
+from dashboard_common.shared_cache import SharedCache, backend_from_url, cache_key
+
+# Lazy initialization of BigQuery client
+_client = None
+
+def get_bigquery_client():
+    """Get or create BigQuery client (lazy initialization)"""
+    global _client
+    if _client is None:
+        # Imported here so the app can boot without loading the BigQuery client
+        from google.cloud import bigquery
+        from google.oauth2 import service_account
+
+        try:
+            credentials = service_account.Credentials.from_service_account_info(
+                st.secrets["gcp_service_account"]
+            )
+
+            _client = bigquery.Client(
+                credentials=credentials,
+                project=credentials.project_id,
+            )
+
+        except Exception as e:
+            raise Exception(
+                f"Failed to initialize BigQuery client: {str(e)}"
+            )
+
+    return _client
+
+
+def today_utc() -> datetime.date:
+    """The date BigQuery's CURRENT_DATE() would return (UTC)"""
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _param_type(value) -> str:
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime.datetime):
+        return "TIMESTAMP"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    return "STRING"
+
+
+def _query_job_config(params, **options):
+    """
+    Build a QueryJobConfig with named parameters (e.g. {"as_of_date": date});
+    lists and tuples become ARRAY parameters for `IN UNNEST(@name)`.
+    """
+    from google.cloud import bigquery
+
+    query_parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            element_type = _param_type(value[0]) if value else "STRING"
+            query_parameters.append(bigquery.ArrayQueryParameter(name, element_type, list(value)))
+        else:
+            query_parameters.append(bigquery.ScalarQueryParameter(name, _param_type(value), value))
+    return bigquery.QueryJobConfig(query_parameters=query_parameters, **options)
+
+
+# Every query runs through one scheduler per process (see job_scheduler.py)
+MAX_CONCURRENT_QUERIES = 8
+MAX_QUERIES_PER_SESSION = 2
+MAX_QUEUED_QUERIES = 50
+QUERY_TIMEOUT_S = 5 * 60
+
+scheduler = JobScheduler(
+    max_workers=MAX_CONCURRENT_QUERIES,
+    per_owner_limit=MAX_QUERIES_PER_SESSION,
+    max_queue=MAX_QUEUED_QUERIES
+)
+
+
+# Scan-bytes guardrails (see scan_budget.py). Every query is dry-run first;
+# budgets are in GB and can be overridden with environment variables.
+MAX_SCAN_BYTES_PER_QUERY = int(float(os.environ.get("MAX_SCAN_GB_PER_QUERY", 500)) * GB)
+MAX_SCAN_BYTES_PER_SESSION = int(float(os.environ.get("MAX_SCAN_GB_PER_SESSION", 2048)) * GB)
+CONFIRM_SCAN_BYTES = int(float(os.environ.get("CONFIRM_SCAN_GB", 100)) * GB)
+SCAN_ESTIMATE_TTL_S = 60 * 60
+
+scan_ledger = ScanLedger(MAX_SCAN_BYTES_PER_QUERY, MAX_SCAN_BYTES_PER_SESSION)
+
+
+def _estimate_params(params):
+    """
+    The parameters a dry-run estimate depends on. Array parameters (the keys
+    of a keyed lookup such as @user_ids) are left out: BigQuery bills the
+    columns read, not which keys match, so one estimate serves every page.
+    """
+    return tuple(sorted(
+        (name, value) for name, value in (params or {}).items() if not isinstance(value, (list, tuple))
+    ))
+
+
+@st.cache_data(ttl=SCAN_ESTIMATE_TTL_S, show_spinner=False)
+def _dry_run_bytes(normalized_query, estimate_params, _query, _params, _owner, _priority):
+    def run(job):
+        job_config = _query_job_config(_params or {}, dry_run=True, use_query_cache=False)
+        return int(get_bigquery_client().query(_query, job_config=job_config).total_bytes_processed or 0)
+
+    return scheduler.run(run, owner=_owner, priority=_priority, timeout_s=QUERY_TIMEOUT_S)
+
+
+def estimate_query_bytes(query, params=None, owner=None, priority=INTERACTIVE):
+    """
+    Bytes BigQuery would process for `query`: a dry run queued on `scheduler`
+    like any other job, cached per normalized query and non-array parameters.
+    """
+    return _dry_run_bytes(normalize_query(query), _estimate_params(params), query, params, owner, priority)
+
+
+def current_owner():
+    """The calling Streamlit session's id (None outside a session), used as the scheduler owner"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+# Counts this session's full script runs (see `count_script_run`)
+RUN_COUNT_KEY = "script_run_count"
+
+
+def count_script_run():
+    """
+    Call first in every full run of the app script. A query an earlier run
+    is still waiting for is cancelled once it sees the count change; fragment
+    reruns do not count, so they never cancel the full run's queries.
+    """
+    st.session_state[RUN_COUNT_KEY] = st.session_state.get(RUN_COUNT_KEY, 0) + 1
+
+
+def _run_superseded(session_id, run_count) -> bool:
+    """True when a newer full run of the session has started, or the session has closed"""
+    if st.session_state.get(RUN_COUNT_KEY) != run_count:
+        return True
+    return Runtime.exists() and not Runtime.instance().is_active_session(session_id)
+
+
+_result_transforms: List[Callable[[pd.DataFrame], pd.DataFrame]] = []
+
+
+def add_result_transform(transform: Callable[[pd.DataFrame], pd.DataFrame]):
+    """Apply `transform` to every query result of this process, before it is cached"""
+    if transform not in _result_transforms:
+        _result_transforms.append(transform)
+
+
+def query_bigquery(query, params=None, priority=INTERACTIVE, owner=None, key=None, timeout_s=QUERY_TIMEOUT_S):
+    """
+    Execute a BigQuery query (with optional named parameters) and return results as DataFrame.
+
+    The query is queued on `scheduler`: `owner` (default: the calling Streamlit
+    session) is limited to MAX_QUERIES_PER_SESSION running queries, INTERACTIVE
+    queries start before BACKGROUND ones, a newer query with the same (owner,
+    key) cancels the older one, and the BigQuery job is cancelled after
+    `timeout_s` or when the calling session has started a newer full run
+    (see `count_script_run`) or closed.
+
+    Before it is queued the query is dry-run: QueryBudgetExceeded is raised if
+    the estimate is over MAX_SCAN_BYTES_PER_QUERY or over what is left of the
+    owner's MAX_SCAN_BYTES_PER_SESSION. The actual bytes are recorded in
+    `scan_ledger` next to the estimate.
+
+    Every result goes through the `add_result_transform` functions before
+    it is returned (and cached).
+    """
+    client = get_bigquery_client()
+    job_config = _query_job_config(params) if params else None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if owner is None and ctx is not None:
+        owner = ctx.session_id
+
+    estimated_bytes = estimate_query_bytes(query, params, owner, priority)
+    scan_ledger.check(owner, estimated_bytes)
+    run_count = st.session_state.get(RUN_COUNT_KEY) if ctx is not None else None
+
+    def run(job):
+        query_job = client.query(query, job_config=job_config)
+        job.on_cancel(query_job.cancel)
+        df = query_job.to_dataframe()
+        scan_ledger.record(owner, query, estimated_bytes, query_job.total_bytes_processed)
+        return df
+
+    df = scheduler.run(
+        run,
+        owner=owner,
+        priority=priority,
+        key=key,
+        timeout_s=timeout_s,
+        is_stale=(lambda: _run_superseded(ctx.session_id, run_count)) if ctx is not None else None
+    )
+    for transform in _result_transforms:
+        df = transform(df)
+    return df
+
+
+def render_queue_status():
+    """Sidebar summary of the warehouse queue in this process"""
+    stats = scheduler.stats()
+    with st.sidebar.expander("🚦 Warehouse queue"):
+        col1, col2 = st.columns(2)
+        col1.metric("Queued", stats["queued"])
+        col2.metric("Running", f"{stats['running']}/{MAX_CONCURRENT_QUERIES}")
+        st.caption(
+            f"Wait p50 {stats['wait_p50_ms'] / 1000:.1f}s · p95 {stats['wait_p95_ms'] / 1000:.1f}s · "
+            f"{stats['cancelled']} cancelled · {stats['timed_out']} timed out · {stats['rejected']} rejected"
+        )
+        cache = shared_cache.stats()
+        st.caption(
+            f"Shared cache: {cache['hits']} hits · {cache['stale_hits']} stale · {cache['misses']} misses "
+            f"({cache['waits']} waited on another replica) · {cache['refreshes']} background refreshes"
+        )
+
+
+def render_scan_estimate(query, params=None, key="scan"):
+    """
+    Show what running `query` would scan before it runs.
+
+    Returns False when the run would be refused by the scan budgets, or when
+    it is over CONFIRM_SCAN_BYTES and the user has not ticked the confirmation
+    checkbox (widget key `confirm_<key>`).
+    """
+    try:
+        estimated_bytes = estimate_query_bytes(query, params, current_owner())
+    except Exception as e:
+        st.caption(f"⚠️ Could not estimate the scan size: {e}")
+        return True
+
+    used = scan_ledger.usage(current_owner())
+    st.caption(
+        f"🔎 Estimated scan: {format_bytes(estimated_bytes)} if not already cached · "
+        f"this session has scanned {format_bytes(used)} of {format_bytes(MAX_SCAN_BYTES_PER_SESSION)}"
+    )
+    try:
+        scan_ledger.check(current_owner(), estimated_bytes)
+    except QueryBudgetExceeded as e:
+        st.error(f"🚫 {e}")
+        return False
+    if estimated_bytes > CONFIRM_SCAN_BYTES:
+        return st.checkbox(
+            f"Run anyway (scans {format_bytes(estimated_bytes)})",
+            key=f"confirm_{key}"
+        )
+    return True
+
+
+def render_scan_usage():
+    """Sidebar summary of scanned bytes and estimated vs actual bytes of recent queries"""
+    with st.sidebar.expander("💾 Scan bytes"):
+        st.metric(
+            "Scanned this session",
+            format_bytes(scan_ledger.usage(current_owner())),
+            help=f"Budget {format_bytes(MAX_SCAN_BYTES_PER_SESSION)} per session, "
+                 f"{format_bytes(MAX_SCAN_BYTES_PER_QUERY)} per query"
+        )
+        history = scan_ledger.history()
+        if history.empty:
+            st.caption("No queries run yet in this process.")
+        else:
+            for column in ("estimated_bytes", "actual_bytes"):
+                history[column] = history[column].map(format_bytes)
+            st.dataframe(history, hide_index=True)
+
+
+# Results are keyed on the query text and its parameters (including
+# as_of_date), so each day's data is cached separately
+QUERY_CACHE_TTL_S = 6 * 60 * 60
+
+# Results are shared by every replica (see shared_cache.py). Set
+# SHARED_CACHE_URL to a redis:// URL or a shared directory when running more
+# than one replica; the default only shares within this process.
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "memory://")
+SHARED_CACHE_STALE_S = 60 * 60
+LOCAL_CACHE_TTL_S = 5 * 60
+
+shared_cache = SharedCache(backend_from_url(SHARED_CACHE_URL))
+
+
+def shared_query(query, params=None, fresh_s=QUERY_CACHE_TTL_S, stale_s=SHARED_CACHE_STALE_S, priority=INTERACTIVE):
+    """
+    `query_bigquery` through the shared cache.
+
+    A result is fresh for `fresh_s`, then served stale for up to `stale_s`
+    while one replica refreshes it as BACKGROUND work.
+    """
+    return shared_cache.get_or_compute(
+        cache_key(normalize_query(query), sorted((params or {}).items())),
+        lambda: query_bigquery(query, params, priority=priority),
+        fresh_s=fresh_s,
+        stale_s=stale_s,
+        refresh=lambda: query_bigquery(query, params, priority=BACKGROUND)
+    )
+
+
+@st.cache_data(ttl=LOCAL_CACHE_TTL_S, show_spinner=False)
+def cached_query(query, params=None):
+    """`shared_query` with an in-memory copy per replica for LOCAL_CACHE_TTL_S"""
+    return shared_query(query, params)
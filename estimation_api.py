@@ -0,0 +1,292 @@
+"""
+Headless HTTP API for the collaboration estimates.
+
+Serves the Summary Dashboard's numbers as JSON without a Streamlit session:
+the active users data comes from the same shared result cache as the apps
+(`bigquery_utils.shared_query`) and scenarios are counted with the same
+filter engine (`filter_engine.SummaryCounter`, equivalent to `summary_mask`).
+
+Every scenario carries the Summary filters as
+`"filters": {"as_of_date", "platform", "campaign_type", "gender", "locations",
+"districts", "pincode_prefixes"}` (all optional; as_of_date defaults to today UTC).
+
+Endpoints:
+    GET  /health
+    POST /v1/filtered-count       {"filters": {...}}
+    POST /v1/collaborations       {"filters": {...}, "product_desirability", "average_price",
+                                   "utility_score", "default_safety"}
+    POST /v1/feasibility          {"eligible_users" (default: the filtered count of "filters"),
+                                   "product_category", "brand_strength", "campaign_type",
+                                   "incentive_type"}
+    POST /v1/<endpoint>/batch     {"scenarios": [...]} -> {"results": [...]}, one result
+                                  (or {"error": ...}) per scenario, in order
+
+Usage:
+    python estimation_api.py --port 8080
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from bigquery_utils import shared_query, today_utc, summary_users_query, LOCAL_CACHE_TTL_S
+from feasibility import calculate_feasibility
+from filter_engine import CAMPAIGN_TYPE_MAP, SummaryCounter
+from multiplier_calc import calculate_collaborations, DEFAULT_SAFETY_NUMBER
+from pincodes import pincode_prefix_mask
+
+# Scenarios accepted in one batch request
+MAX_BATCH_SCENARIOS = 1000
+
+
+class ScenarioError(ValueError):
+    """The scenario is invalid; reported to the client as a 400 / per-scenario error"""
+
+
+class DatasetUnavailable(RuntimeError):
+    """The active users data could not be loaded; reported to the client as a 503"""
+
+
+class DatasetCache:
+    """
+    One `SummaryCounter` per as-of date, rebuilt from the shared cache after
+    LOCAL_CACHE_TTL_S. Concurrent requests for a date wait for one load.
+    """
+
+    def __init__(self, ttl_s: float = LOCAL_CACHE_TTL_S):
+        self.ttl_s = ttl_s
+        self._counters: Dict[datetime.date, tuple] = {}
+        self._loading: Dict[datetime.date, asyncio.Future] = {}
+
+    async def get(self, as_of_date: datetime.date) -> SummaryCounter:
+        cached = self._counters.get(as_of_date)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl_s:
+            return cached[0]
+        if as_of_date in self._loading:
+            return await asyncio.shield(self._loading[as_of_date])
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[as_of_date] = future
+        try:
+            df = await asyncio.to_thread(shared_query, summary_users_query, {"as_of_date": as_of_date})
+            counter = await asyncio.to_thread(SummaryCounter, df)
+            self._counters[as_of_date] = (counter, time.monotonic())
+            future.set_result(counter)
+            return counter
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else needs to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._loading[as_of_date]
+
+
+def _parse_filters(filters: Optional[dict]) -> dict:
+    filters = dict(filters or {})
+    unknown = set(filters) - {
+        "as_of_date", "platform", "campaign_type", "gender", "locations", "districts", "pincode_prefixes"
+    }
+    if unknown:
+        raise ScenarioError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+    try:
+        as_of_date = datetime.date.fromisoformat(filters["as_of_date"]) if filters.get("as_of_date") else today_utc()
+    except (TypeError, ValueError):
+        raise ScenarioError(f"as_of_date must be YYYY-MM-DD, got {filters['as_of_date']!r}")
+    if as_of_date > today_utc():
+        raise ScenarioError("as_of_date cannot be in the future")
+    for name, what in (("locations", "state names"), ("districts", "district names"), ("pincode_prefixes", "strings")):
+        values = filters.get(name)
+        if values is not None and not (isinstance(values, list) and all(isinstance(v, str) for v in values)):
+            raise ScenarioError(f"{name} must be a list of {what}")
+    try:
+        pincode_prefix_mask([], filters.get("pincode_prefixes") or [])
+    except ValueError as e:
+        raise ScenarioError(str(e))
+    for name in ("platform", "gender"):
+        if filters.get(name) is not None and not isinstance(filters[name], str):
+            raise ScenarioError(f"{name} must be a string")
+    campaign_type = filters.get("campaign_type")
+    if campaign_type is not None and campaign_type not in CAMPAIGN_TYPE_MAP:
+        raise ScenarioError(f"campaign_type must be one of {', '.join(CAMPAIGN_TYPE_MAP)}")
+    return {
+        "as_of_date": as_of_date,
+        "platform": filters.get("platform"),
+        "execution_types": CAMPAIGN_TYPE_MAP.get(campaign_type),
+        "gender": filters.get("gender"),
+        "locations": filters.get("locations"),
+        "districts": filters.get("districts"),
+        "pincode_prefixes": filters.get("pincode_prefixes"),
+    }
+
+
+def _optional_number(scenario: dict, name: str) -> Optional[float]:
+    value = scenario.get(name)
+    if value is not None and (
+        isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+    ):
+        raise ScenarioError(f"{name} must be a finite number")
+    return value
+
+
+def filtered_count(counter: SummaryCounter, filters: dict) -> int:
+    return counter.count(
+        filters["platform"], filters["execution_types"], filters["gender"], filters["locations"],
+        filters["districts"], filters["pincode_prefixes"]
+    )
+
+
+def estimate_filtered_count(scenario: dict, counter: SummaryCounter, filters: dict) -> dict:
+    return {"filtered_count": filtered_count(counter, filters)}
+
+
+def estimate_collaborations(scenario: dict, counter: SummaryCounter, filters: dict) -> dict:
+    default_safety = _optional_number(scenario, "default_safety")
+    mask = counter.mask(
+        filters["platform"], filters["execution_types"], filters["gender"], filters["locations"],
+        filters["districts"], filters["pincode_prefixes"]
+    )
+    return calculate_collaborations(
+        filtered_count=int(mask.sum()),
+        propensity_sum=counter.propensity_sum(mask=mask),
+        product_desirability=_optional_number(scenario, "product_desirability"),
+        average_price=_optional_number(scenario, "average_price"),
+        utility_score=_optional_number(scenario, "utility_score"),
+        default_safety=DEFAULT_SAFETY_NUMBER if default_safety is None else default_safety
+    )
+
+
+def estimate_feasibility(scenario: dict, counter: Optional[SummaryCounter], filters: dict) -> dict:
+    eligible_users = scenario.get("eligible_users")
+    if eligible_users is None:
+        eligible_users = filtered_count(counter, filters)
+    elif isinstance(eligible_users, bool) or not isinstance(eligible_users, int):
+        raise ScenarioError("eligible_users must be an integer")
+    try:
+        return calculate_feasibility(
+            eligible_users=eligible_users,
+            product_category=scenario["product_category"],
+            brand_strength=scenario["brand_strength"],
+            campaign_type=scenario["campaign_type"],
+            incentive_type=scenario["incentive_type"]
+        )
+    except KeyError as e:
+        raise ScenarioError(f"Missing or unknown value for {e}")
+
+
+# endpoint name -> (estimator, needs the active users data)
+ESTIMATORS = {
+    "filtered-count": (estimate_filtered_count, lambda scenario: True),
+    "collaborations": (estimate_collaborations, lambda scenario: True),
+    "feasibility": (estimate_feasibility, lambda scenario: scenario.get("eligible_users") is None),
+}
+
+
+async def evaluate(datasets: DatasetCache, endpoint: str, scenarios: list) -> list:
+    """
+    Results (or {"error": ...}) for each scenario; each as-of date is loaded
+    once. Raises DatasetUnavailable when a date's data cannot be loaded.
+    """
+    estimator, needs_data = ESTIMATORS[endpoint]
+    parsed = []
+    for scenario in scenarios:
+        try:
+            if not isinstance(scenario, dict):
+                raise ScenarioError("Each scenario must be a JSON object")
+            parsed.append((scenario, _parse_filters(scenario.get("filters")), None))
+        except ScenarioError as e:
+            parsed.append((scenario, None, str(e)))
+
+    dates = list({filters["as_of_date"] for scenario, filters, error in parsed if error is None and needs_data(scenario)})
+    try:
+        counters = dict(zip(dates, await asyncio.gather(*(datasets.get(d) for d in dates))))
+    except Exception as e:
+        raise DatasetUnavailable(f"Could not load active users data: {e}") from e
+
+    def run():
+        results = []
+        for scenario, filters, error in parsed:
+            if error is None:
+                try:
+                    counter = counters.get(filters["as_of_date"]) if needs_data(scenario) else None
+                    results.append(estimator(scenario, counter, filters))
+                    continue
+                except ScenarioError as e:
+                    error = str(e)
+                except Exception as e:
+                    # One scenario the estimator cannot handle does not fail the batch
+                    error = f"Could not estimate this scenario: {e}"
+            results.append({"error": error})
+        return results
+
+    # Large batches are counted off the event loop
+    return run() if len(parsed) <= 10 else await asyncio.to_thread(run)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _json_response(payload, status: int = 200) -> web.Response:
+    return web.json_response(payload, status=status, dumps=lambda obj: json.dumps(obj, default=_json_default))
+
+
+async def _read_json(request: web.Request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text='{"error": "Body must be JSON"}', content_type="application/json")
+
+
+def create_app(datasets: Optional[DatasetCache] = None) -> web.Application:
+    datasets = datasets or DatasetCache()
+
+    async def single(request: web.Request) -> web.Response:
+        scenario = await _read_json(request)
+        try:
+            result, = await evaluate(datasets, request.match_info["endpoint"], [scenario])
+        except DatasetUnavailable as e:
+            return _json_response({"error": str(e)}, status=503)
+        return _json_response(result, status=400 if "error" in result else 200)
+
+    async def batch(request: web.Request) -> web.Response:
+        body = await _read_json(request)
+        scenarios = body.get("scenarios") if isinstance(body, dict) else None
+        if not isinstance(scenarios, list):
+            return _json_response({"error": 'Body must be {"scenarios": [...]}'}, status=400)
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            return _json_response({"error": f"At most {MAX_BATCH_SCENARIOS} scenarios per batch"}, status=413)
+        try:
+            results = await evaluate(datasets, request.match_info["endpoint"], scenarios)
+        except DatasetUnavailable as e:
+            return _json_response({"error": str(e)}, status=503)
+        return _json_response({"results": results})
+
+    async def health(request: web.Request) -> web.Response:
+        return _json_response({"status": "ok"})
+
+    endpoints = "{endpoint:" + "|".join(ESTIMATORS) + "}"
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_post(f"/v1/{endpoints}", single)
+    app.router.add_post(f"/v1/{endpoints}/batch", batch)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
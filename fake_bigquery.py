@@ -0,0 +1,360 @@
+"""
+Local stand-in for the BigQuery client.
+
+Returns synthetic DataFrames shaped like the dashboard queries, with an
+injected per-query latency, so the apps can be exercised without warehouse
+access (load tests, benchmarks). Dry runs (`job_config.dry_run`) return at
+once with a bytes-processed estimate per query kind.
+
+Active users queries return only the columns they select (and only the
+users of a `sample_predicate` sample), and profile queries keyed on `@user_ids`
+only the rows of those users. User postcodes come from a synthetic pincode
+dimension, which the `dim_pincode` export returns.
+"""
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+PLATFORMS = [
+    "youtube", "instagram", "content_creation", "ecommerce_website", "amazon",
+    "flipkart", "myntra", "nykaa", "purplle", "healthkart", "sublime", "1mg",
+    "snapdeal", "bigbasket", "swiggy", "tira", "swiggy_instamart", "blinkit",
+    "zepto", "meesho", "jiomart", "firstcry"
+]
+
+EXECUTION_TYPES = [
+    "regular_barter", "barter_brand_shipment", "order_and_payout",
+    "regular_payout", "barter_with_payout", "other"
+]
+
+STATES = [
+    "Andhra Pradesh", "Assam", "Bihar", "Delhi", "Goa", "Gujarat", "Haryana",
+    "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Odisha", "Punjab",
+    "Rajasthan", "Tamil Nadu", "Telangana", "Uttar Pradesh", "West Bengal"
+]
+
+CONTENT_TYPES = ["review", "image", "video", "reel"]
+
+GB = 1024 ** 3
+
+# Dry-run estimate per query kind; actual runs scan a bit less, like BigQuery.
+# An active users query joining the profiles also scans "user_profiles"; a
+# profile lookup by key scans USER_PROFILES_KEYED_FRACTION of it.
+SCAN_BYTES = {
+    "active_users": 48 * GB,
+    "user_profiles": 12 * GB,
+    "campaign_history": 25 * GB,
+    "pt_orders": 2 * GB,
+    "pending_probe": GB // 2,
+    "agent_efficiency": 8 * GB,
+    "pending_evals": GB,
+    "pincodes": GB // 16,
+    "creators": 3 * GB,
+    "creator_activity": 30 * GB,
+}
+USER_PROFILES_KEYED_FRACTION = 1 / 64
+
+# Latency of a sampled query (see `sample_predicate`) relative to the full
+# query (scan bytes are unchanged: every collaboration is still read)
+SAMPLED_LATENCY_FACTOR = 0.2
+
+
+class FakeQueryJob:
+    """
+    Mimics the parts of `bigquery.QueryJob` the apps use.
+
+    Like a real job it starts when created and the caller waits in
+    `result()`; `cancel()` stops it early. `total_bytes_processed` is the
+    estimate for a dry run and the scanned bytes once a real run finishes.
+    """
+
+    def __init__(self, client: "FakeBigQueryClient", query: str, dry_run: bool = False, params: Optional[dict] = None):
+        self._client = client
+        self._query = query
+        self._params = params or {}
+        self._df: Optional[pd.DataFrame] = None
+        self._cancelled = threading.Event()
+        self.dry_run = dry_run
+        self.total_bytes_processed: Optional[int] = client._scan_estimate(query) if dry_run else None
+
+    def cancel(self) -> bool:
+        self._cancelled.set()
+        return True
+
+    def result(self, timeout: Optional[float] = None):
+        if self._df is None and not self.dry_run:
+            self._df = self._client._execute(self._query, self._params, self._cancelled)
+            self.total_bytes_processed = self._client._scanned_bytes(self._query)
+        return self
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.result()._df.copy()
+
+
+class FakeBigQueryClient:
+    """
+    Drop-in replacement for `bigquery.Client` answering the dashboard queries.
+
+    Args:
+        latency: Seconds each query sleeps before returning
+        active_users_rows: Number of rows in the active users data
+        seed: Random seed for the synthetic data
+        slots: Optional semaphore limiting concurrent queries (models warehouse slots)
+        scan_bytes: Overrides of SCAN_BYTES per query kind
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        active_users_rows: int = 50_000,
+        seed: int = 0,
+        slots=None,
+        scan_bytes: Optional[dict] = None
+    ):
+        self.latency = latency
+        self.active_users_rows = active_users_rows
+        self.slots = slots
+        self.queries_executed = 0
+        self.queries_cancelled = 0
+        self.dry_runs = 0
+        self.scan_bytes = {**SCAN_BYTES, **(scan_bytes or {})}
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._frames = {}
+        self._frames_lock = threading.RLock()
+
+    def query(self, query: str, job_config=None) -> FakeQueryJob:
+        dry_run = bool(getattr(job_config, "dry_run", False))
+        if dry_run:
+            self.dry_runs += 1
+        params = {
+            p.name: getattr(p, "values", getattr(p, "value", None))
+            for p in getattr(job_config, "query_parameters", None) or []
+        }
+        return FakeQueryJob(self, query, dry_run=dry_run, params=params)
+
+    def _execute(self, query: str, params: dict, cancelled: threading.Event) -> pd.DataFrame:
+        if self.slots is not None:
+            self.slots.acquire()
+        try:
+            latency = self.latency * (SAMPLED_LATENCY_FACTOR if "FARM_FINGERPRINT" in query else 1)
+            if cancelled.wait(latency) if latency > 0 else cancelled.is_set():
+                self.queries_cancelled += 1
+                raise RuntimeError("Job cancelled")
+            self.queries_executed += 1
+            return self._result_for(query, params)
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def _scan_estimate(self, query: str) -> int:
+        kind = self._kind_for(query)
+        if kind == "active_users" and "JOIN location" in query:
+            return self.scan_bytes["active_users"] + self.scan_bytes["user_profiles"]
+        if kind == "user_profiles" and "@user_ids" in query:
+            return int(self.scan_bytes["user_profiles"] * USER_PROFILES_KEYED_FRACTION)
+        return self.scan_bytes[kind]
+
+    def _scanned_bytes(self, query: str) -> int:
+        return int(self._scan_estimate(query) * np.random.uniform(0.85, 1.0))
+
+    def _kind_for(self, query: str) -> str:
+        """The synthetic dataset matching the shape of `query`"""
+        if "audience_size" in query:
+            kind = "campaign_history"
+        elif "product_bundle" in query:
+            kind = "pt_orders"
+        elif "AS STRUCT" in query:
+            kind = "pending_probe"
+        elif "reviewed_by_agent_id" in query:
+            kind = "agent_efficiency"
+        elif "review_stage = 'PENDING'" in query:
+            kind = "pending_evals"
+        elif "signup_date" in query:
+            kind = "creator_activity"
+        elif "instagram_id" in query:
+            kind = "creators"
+        elif "dim_pincode" in query:
+            kind = "pincodes"
+        elif "FROM location l" in query:
+            kind = "user_profiles"
+        else:
+            kind = "active_users"
+        return kind
+
+    def _frame(self, kind: str) -> pd.DataFrame:
+        # One build per kind even when concurrent queries ask for it (the frames share an RNG)
+        with self._frames_lock:
+            if kind not in self._frames:
+                self._frames[kind] = getattr(self, f"_make_{kind}")()
+            return self._frames[kind]
+
+    def _result_for(self, query: str, params: Optional[dict] = None) -> pd.DataFrame:
+        """Pick the synthetic frame matching the shape of `query`"""
+        kind = self._kind_for(query)
+        if kind == "user_profiles":
+            users = self._frame("active_users")
+            profiles = users[["user_id", "gender", "postcode"]].drop_duplicates("user_id")
+            if "@user_ids" in query:
+                profiles = profiles[profiles["user_id"].isin((params or {}).get("user_ids") or [])]
+            return profiles.reset_index(drop=True)
+        df = self._frame(kind)
+        if kind == "active_users":
+            # Only the selected columns ("SELECT u.a, l.b FROM users u")
+            selected = re.search(r"SELECT (.*) FROM users u", query)
+            if selected:
+                df = df[[column.split(".")[-1].strip() for column in selected.group(1).split(",")]]
+            sampled = re.search(r"FARM_FINGERPRINT\(CAST\(c\.user_id AS STRING\)\)\), 10000\) < (\d+)", query)
+            if sampled:
+                # The same users for every query sampling this percent
+                buckets = pd.util.hash_pandas_object(df["user_id"], index=False).to_numpy() % 10_000
+                df = df[buckets < int(sampled.group(1))]
+        return df
+
+    def _make_pincodes(self) -> pd.DataFrame:
+        """20,000 pincodes; the first two digits pick the state, the third the district"""
+        # Its own RNG: the same dimension whichever query asks for it first
+        rng = np.random.default_rng(self.seed)
+        pincodes = np.sort(rng.choice(np.arange(110_000, 1_000_000), 20_000, replace=False))
+        states = np.array(STATES)[(pincodes // 10_000 - 11) * len(STATES) // 89]
+        dim = pd.DataFrame({
+            "pincode": pincodes,
+            "state": states,
+            "district": [f"{state} {digit}" for state, digit in zip(states, pincodes // 1_000 % 10)],
+        })
+        # Like the real dimension, some pincodes are listed more than once
+        return pd.concat([dim, dim.sample(500, random_state=0)], ignore_index=True)
+
+    def _make_active_users(self) -> pd.DataFrame:
+        n = self.active_users_rows
+        pincodes = self._frame("pincodes")["pincode"].unique()
+        rng = self._rng
+        postcodes = pd.array(rng.choice(pincodes, n), dtype="Int64")
+        postcodes[rng.random(n) < 0.05] = pd.NA
+        accepted = rng.integers(1, 40, n)
+        accepted_180 = np.minimum(accepted, rng.integers(0, 15, n))
+        return pd.DataFrame({
+            "user_id": [f"u{i:07d}" for i in range(n)],
+            "platform": rng.choice(PLATFORMS, n),
+            "execution_type": rng.choice(EXECUTION_TYPES, n),
+            "invited": accepted + rng.integers(0, 20, n),
+            "accepted": accepted,
+            "accepted_180": accepted_180,
+            "completed_180": np.minimum(accepted_180, rng.integers(0, 15, n)),
+            "gender": rng.choice(["male", "female", None], n, p=[0.45, 0.45, 0.1]),
+            "postcode": postcodes,
+        })
+
+    def _make_creator_activity(self) -> pd.DataFrame:
+        """One row per active user: signup and acceptance dates relative to today"""
+        users = self._frame("active_users").groupby("user_id", sort=False)[["accepted", "accepted_180"]].sum()
+        n = len(users)
+        rng = np.random.default_rng(self.seed)
+        today = np.datetime64(pd.Timestamp.now(tz="UTC").date(), "D")
+        accepted_180 = users["accepted_180"].to_numpy()
+        # Recent acceptances for users with any in the last 180 days
+        last_days = np.where(accepted_180 > 0, rng.integers(0, 180, n), rng.integers(180, 900, n))
+        signup_days = last_days + rng.integers(1, 1_200, n)
+        first_pt = today - (last_days + rng.integers(0, 300, n)).astype("timedelta64[D]")
+        return pd.DataFrame({
+            "user_id": users.index.to_numpy(),
+            "signup_date": (today - signup_days.astype("timedelta64[D]")).astype("datetime64[ns]"),
+            "first_pt_accepted_on": np.where(rng.random(n) < 0.6, first_pt, np.datetime64("NaT")).astype("datetime64[ns]"),
+            "last_accepted_on": (today - last_days.astype("timedelta64[D]")).astype("datetime64[ns]"),
+            "accepted_collabs": users["accepted"].to_numpy(),
+            "completed_collabs": (users["accepted"].to_numpy() * rng.beta(4, 1.5, n)).astype(int),
+            "accepted_last_30_days": np.minimum(accepted_180, rng.integers(0, 3, n)),
+            "accepted_last_90_days": np.minimum(accepted_180, rng.integers(0, 8, n)),
+            "accepted_last_180_days": accepted_180,
+        })
+
+    def _make_creators(self) -> pd.DataFrame:
+        """One row per active user, with made-up usernames and account IDs"""
+        user_ids = self._frame("active_users")["user_id"].unique()
+        n = len(user_ids)
+        rng = np.random.default_rng(self.seed)
+        syllables = np.array(["ra", "dhi", "ka", "noel", "pri", "ya", "beau", "ty", "fit", "zo", "an", "shi", "vlog", "mi"])
+        parts = rng.integers(0, len(syllables), (n, 3))
+        first = pd.Series(syllables[parts[:, 0]]).str.cat([syllables[parts[:, 1]]])
+        username = first.str.cat([np.where(rng.random(n) < 0.5, "_", "."), syllables[parts[:, 2]], rng.integers(0, 1000, n).astype(str)])
+        alphabet = np.array(list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+        amazon = pd.Series(alphabet[rng.integers(0, 36, (n, 8))].view("<U8").ravel())
+        return pd.DataFrame({
+            "user_id": user_ids,
+            "name": first.str.title() + " " + pd.Series(syllables[parts[:, 2]]).str.title(),
+            "username": username,
+            "instagram_id": np.where(rng.random(n) < 0.8, rng.integers(10 ** 15, 10 ** 16, n).astype(str), None),
+            "amazon_id": np.where(rng.random(n) < 0.6, "amzn1.account.AE" + amazon, None),
+        })
+
+    def _make_campaign_history(self) -> pd.DataFrame:
+        n = 2_000
+        rng = self._rng
+        audience = rng.integers(10, 5_000, n)
+        return pd.DataFrame({
+            "campaign_id": np.arange(n),
+            "platform": rng.choice(PLATFORMS, n),
+            "execution_type": rng.choice(EXECUTION_TYPES, n),
+            "audience_size": audience,
+            "collaborations": (audience * rng.uniform(0.05, 0.4, n)).astype(int),
+        })
+
+    def _make_pt_orders(self) -> pd.DataFrame:
+        n = 500
+        rng = self._rng
+        quantity = rng.integers(10, 500, n)
+        return pd.DataFrame({
+            "product_id": np.arange(100_000, 100_000 + n),
+            "product_platform": rng.choice(["amazon", "flipkart", "nykaa", "myntra"], n),
+            "buying_url": [f"https://example.com/p/{i}" for i in range(n)],
+            "daily_limit": rng.integers(0, 50, n),
+            "accepted_yesterday": rng.integers(0, 30, n),
+            "new_user_seats": rng.integers(0, 10, n),
+            "total_acceptances": (quantity * rng.random(n)).astype(int),
+            "total_quantity": quantity,
+            "campaigns": [f"{i} - {i * 7}" for i in range(n)],
+            "project_name": rng.choice([f"Project {c}" for c in "ABCDEFGH"], n),
+        })
+
+    def _make_agent_efficiency(self) -> pd.DataFrame:
+        rng = self._rng
+        index = pd.MultiIndex.from_product(
+            [[f"Agent {i:02d}" for i in range(40)], CONTENT_TYPES + ["POP"]],
+            names=["agent_name", "content_type"]
+        )
+        df = index.to_frame(index=False)
+        df["rated"] = rng.integers(1, 200, len(df))
+        df["approved"] = (df["rated"] * rng.random(len(df))).astype(int)
+        df["rejected"] = df["rated"] - df["approved"]
+        return df
+
+    def _make_pending_probe(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "submissions": [{"pending": 1_234, "latest_created_at": "2026-01-01T00:00:00"}],
+            "pop": [{"pending": 321}],
+            "campaigns": [{"running": 87, "auto_review": 12, "latest_updated_at": "2026-01-01T00:00:00"}],
+            "deliverables": [{"latest_updated_at": "2026-01-01T00:00:00"}],
+        })
+
+    def _make_pending_evals(self) -> pd.DataFrame:
+        rng = self._rng
+        content_types = CONTENT_TYPES + ["POP"]
+        return pd.DataFrame({
+            "content_type": content_types,
+            "auto_submissions": rng.integers(0, 500, len(content_types)),
+            "manual_submission_pending": rng.integers(0, 500, len(content_types)),
+        })
+
+
+def install_fake_client(client: Optional[FakeBigQueryClient] = None) -> FakeBigQueryClient:
+    """Make both apps' `query_bigquery` (dashboard_common/warehouse.py) use a fake client"""
+    from dashboard_common import warehouse
+
+    if client is None:
+        client = FakeBigQueryClient()
+    warehouse._client = client
+    return client
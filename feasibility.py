@@ -1,4 +1,4 @@
-from predictor import (
+from scores import (
     PRODUCT_UTILITY_SCORE,
     BRAND_SCORE,
     PARTICIPATION_RATE_BY_SCORE,
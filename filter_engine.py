@@ -0,0 +1,274 @@
+"""
+Vectorized filters for the active users data.
+
+Each filter set is evaluated as one boolean mask over the loaded frame and
+the result is taken with a single indexing step, instead of chaining a
+filtered copy per condition.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pincodes import pincode_prefix_mask
+from propensity import propensity_scores, PROPENSITY_COLUMNS
+
+# Map campaign type from UI to database values (execution_type)
+CAMPAIGN_TYPE_MAP = {
+    "Barter": ["regular_barter", "barter_brand_shipment"],
+    "Cashback": ["order_and_payout"],
+    "Payout": ["regular_payout"],
+    "Barter with Payout": ["barter_with_payout"],
+    "Other": ["other"]
+}
+
+# Summary Dashboard platform dropdown until active users are loaded
+PLATFORM_OPTIONS = [
+    "youtube",
+    "instagram",
+    "content_creation",
+    "ecommerce_website",
+    "amazon",
+    "flipkart",
+    "myntra",
+    "nykaa",
+    "purplle",
+    "healthkart",
+    "sublime",
+    "1mg",
+    "snapdeal",
+    "bigbasket",
+    "swiggy",
+    "tira",
+    "swiggy_instamart",
+    "blinkit",
+    "zepto",
+    "meesho",
+    "jiomart",
+    "firstcry"
+]
+
+# Map UI gender values to database values (compared case-insensitively)
+GENDER_VALUES = {
+    "Male": ["male", "m"],
+    "Female": ["female", "f"],
+}
+
+# Minimum-count filters of the Active Users tab
+MIN_FILTER_COLUMNS = [
+    "accepted", "accepted_30", "accepted_90", "accepted_180",
+    "completed", "completed_60", "completed_90", "completed_180",
+    "invited",
+]
+
+
+def _lower(series: pd.Series) -> pd.Series:
+    return series.astype("string").str.lower()
+
+
+def _mask_builder(n_rows: int, base: Optional[np.ndarray] = None):
+    mask = np.ones(n_rows, dtype=bool) if base is None else base.copy()
+    steps = []
+
+    def apply(condition, description):
+        nonlocal mask
+        mask &= np.asarray(condition, dtype=bool)
+        steps.append((description, int(mask.sum())))
+
+    return apply, lambda: (mask, steps)
+
+
+def selection_mask(
+    df: pd.DataFrame,
+    platform: Optional[str],
+    execution_types: Optional[List[str]]
+) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
+    """
+    Active users of a platform and campaign type (the first half of `summary_mask`).
+
+    Returns (mask, steps) like `summary_mask`.
+    """
+    apply, result = _mask_builder(len(df))
+    if platform:
+        apply(
+            df["platform"].str.contains(platform, case=False, na=False, regex=False),
+            f"platform filter (contains '{platform}')"
+        )
+    if execution_types:
+        apply(df["execution_type"].isin(execution_types), f"execution_type filter ({', '.join(execution_types)})")
+
+    # Active users: accepted and completed at least once in the last 180 days
+    if "accepted_180" in df.columns and "completed_180" in df.columns:
+        apply(
+            (df["accepted_180"] > 0) & (df["completed_180"] > 0),
+            "active users filter (accepted_180 > 0 AND completed_180 > 0)"
+        )
+    else:
+        apply(np.zeros(len(df), dtype=bool), "active users filter (accepted_180/completed_180 missing)")
+    return result()
+
+
+def demographic_mask(
+    df: pd.DataFrame,
+    gender: Optional[str] = None,
+    locations: Optional[List[str]] = None,
+    base: Optional[np.ndarray] = None,
+    districts: Optional[List[str]] = None,
+    pincode_prefixes: Optional[List[str]] = None
+) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
+    """
+    Gender and location filters (the second half of `summary_mask`), on top of `base`.
+
+    Returns (mask, steps) like `summary_mask`; steps is empty when neither applies.
+    """
+    apply, result = _mask_builder(len(df), base)
+    if gender in GENDER_VALUES and "gender" in df.columns:
+        apply(_lower(df["gender"]).isin(GENDER_VALUES[gender]).fillna(False), f"gender filter ({gender})")
+
+    if locations and "state" in df.columns:
+        apply(
+            _lower(df["state"]).isin([loc.lower() for loc in locations]).fillna(False),
+            f"location filter (states: {', '.join(locations)})"
+        )
+
+    if districts and "district" in df.columns:
+        apply(
+            _lower(df["district"]).isin([d.lower() for d in districts]).fillna(False),
+            f"district filter ({', '.join(districts)})"
+        )
+
+    if pincode_prefixes and "postcode" in df.columns:
+        apply(
+            pincode_prefix_mask(df["postcode"], pincode_prefixes),
+            f"pincode filter (prefixes: {', '.join(pincode_prefixes)})"
+        )
+    return result()
+
+
+def summary_mask(
+    df: pd.DataFrame,
+    platform: Optional[str],
+    execution_types: Optional[List[str]],
+    gender: Optional[str] = None,
+    locations: Optional[List[str]] = None,
+    districts: Optional[List[str]] = None,
+    pincode_prefixes: Optional[List[str]] = None
+) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
+    """
+    Rows counted by the Summary Dashboard.
+
+    Args:
+        df: Active users data
+        platform: Matched case-insensitively anywhere in the `platform` column
+        execution_types: Database execution types of the campaign type
+        gender: "Male", "Female", or "Mixed"/None for no gender filter
+        locations: States to keep (case-insensitive); None or empty for all
+        districts: Districts to keep (case-insensitive); None or empty for all
+        pincode_prefixes: Keep postcodes starting with any of these; None or empty for all
+
+    Returns:
+        (mask, steps) where steps lists (filter description, rows remaining)
+        after each applied filter, for logging
+    """
+    mask, steps = selection_mask(df, platform, execution_types)
+    mask, demographic_steps = demographic_mask(df, gender, locations, mask, districts, pincode_prefixes)
+    return mask, steps + demographic_steps
+
+
+def active_users_mask(
+    df: pd.DataFrame,
+    platform: str = "All",
+    execution_type: str = "All",
+    minimums: Optional[Dict[str, int]] = None
+) -> np.ndarray:
+    """
+    Rows matching the Active Users tab filters.
+
+    Args:
+        df: Active users data
+        platform, execution_type: Exact values, or "All"
+        minimums: {column: minimum value}; columns missing from `df` are ignored
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if platform != "All" and "platform" in df.columns:
+        mask &= (df["platform"] == platform).to_numpy()
+    if execution_type != "All" and "execution_type" in df.columns:
+        mask &= (df["execution_type"] == execution_type).to_numpy()
+    for column, minimum in (minimums or {}).items():
+        if minimum is not None and column in df.columns:
+            mask &= (df[column] >= minimum).to_numpy()
+    return mask
+
+
+class SummaryCounter:
+    """
+    `summary_mask` over one fixed frame, for evaluating many scenarios.
+
+    The filter columns are factorized once; each scenario then costs a few
+    lookups over integer codes instead of string comparisons over the frame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self._codes: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, list] = {}
+        for column in ("platform", "execution_type", "gender", "state", "district"):
+            if column in df.columns:
+                codes, uniques = pd.factorize(df[column])
+                self._codes[column] = codes
+                self._values[column] = list(uniques)
+        if "accepted_180" in df.columns and "completed_180" in df.columns:
+            self._active = ((df["accepted_180"] > 0) & (df["completed_180"] > 0)).to_numpy()
+        else:
+            self._active = np.zeros(self.n_rows, dtype=bool)
+        self._postcodes = df["postcode"].to_numpy() if "postcode" in df.columns else None
+        self._propensity = propensity_scores(df) if set(PROPENSITY_COLUMNS) <= set(df.columns) else None
+
+    def _matching(self, column: str, keep) -> np.ndarray:
+        """Rows whose `column` value satisfies `keep(value)`; missing values never match"""
+        allowed = np.zeros(len(self._values[column]) + 1, dtype=bool)
+        allowed[:-1] = [keep(value) for value in self._values[column]]
+        return allowed[self._codes[column]]
+
+    def mask(
+        self,
+        platform: Optional[str],
+        execution_types: Optional[List[str]],
+        gender: Optional[str] = None,
+        locations: Optional[List[str]] = None,
+        districts: Optional[List[str]] = None,
+        pincode_prefixes: Optional[List[str]] = None
+    ) -> np.ndarray:
+        """Same rows as `summary_mask` with the same arguments"""
+        mask = self._active.copy()
+        if platform:
+            platform = platform.lower()
+            mask &= self._matching("platform", lambda v: platform in str(v).lower())
+        if execution_types:
+            mask &= self._matching("execution_type", lambda v: v in execution_types)
+        if gender in GENDER_VALUES and "gender" in self._codes:
+            mask &= self._matching("gender", lambda v: str(v).lower() in GENDER_VALUES[gender])
+        if locations and "state" in self._codes:
+            wanted = {loc.lower() for loc in locations}
+            mask &= self._matching("state", lambda v: str(v).lower() in wanted)
+        if districts and "district" in self._codes:
+            wanted_districts = {d.lower() for d in districts}
+            mask &= self._matching("district", lambda v: str(v).lower() in wanted_districts)
+        if pincode_prefixes and self._postcodes is not None:
+            mask &= pincode_prefix_mask(self._postcodes, pincode_prefixes)
+        return mask
+
+    def count(self, *args, **kwargs) -> int:
+        """Rows `summary_mask` would keep"""
+        return int(self.mask(*args, **kwargs).sum())
+
+    def propensity_sum(self, *args, mask: Optional[np.ndarray] = None, **kwargs) -> Optional[float]:
+        """
+        Sum of the propensity scores of the rows `summary_mask` would keep
+        (or of `mask`); None when the data has no history columns.
+        """
+        if self._propensity is None:
+            return None
+        if mask is None:
+            mask = self.mask(*args, **kwargs)
+        return float(self._propensity[mask].sum(dtype=np.float64))
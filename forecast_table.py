@@ -0,0 +1,276 @@
+"""
+Nightly precomputed Summary Dashboard counts.
+
+The batch job counts the active users of every platform × campaign type ×
+gender × state combination in one grouped pass over the active users data
+and writes the result as one small Parquet file per as-of date:
+
+    forecast_tables/date=YYYY-MM-DD.parquet
+
+The dashboard reads it back as a `ForecastTable`, so applying a Summary
+selection is a keyed lookup plus a sum over the selected states instead of
+filtering the full frame. Counts match `filter_engine.summary_mask`; each
+combination also stores the sum of its rows' propensity scores
+(propensity.py), so per-creator expected collaborations are a lookup too.
+
+Run nightly (e.g. from cron shortly after midnight UTC); the dashboard's
+pre-warm also builds today's table when it is missing:
+
+    python forecast_table.py [--as-of-date YYYY-MM-DD] [--force]
+"""
+import datetime
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import CAMPAIGN_TYPE_MAP, GENDER_VALUES, PLATFORM_OPTIONS
+from multiplier_calc import calculate_collaborations, DEFAULT_SAFETY_NUMBER
+from propensity import propensity_scores, PROPENSITY_COLUMNS
+
+FORECAST_TABLE_DIR = os.environ.get(
+    "FORECAST_TABLE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecast_tables")
+)
+
+KEY_COLUMNS = ["platform", "campaign_type", "gender", "state"]
+
+# Database execution_type -> UI campaign type
+CAMPAIGN_TYPE_OF = {
+    execution_type: campaign_type
+    for campaign_type, execution_types in CAMPAIGN_TYPE_MAP.items()
+    for execution_type in execution_types
+}
+
+# Gender group of users matching neither "Male" nor "Female" (only counted under "Mixed")
+OTHER_GENDER = "Other"
+
+
+def _gender_group(value) -> str:
+    value = str(value).lower() if not pd.isna(value) else None
+    for group, values in GENDER_VALUES.items():
+        if value in values:
+            return group
+    return OTHER_GENDER
+
+
+def _decode(codes: np.ndarray, uniques, convert) -> np.ndarray:
+    """Map factorized `codes` through `convert`; code -1 (missing) becomes convert(None)"""
+    lookup = np.array([convert(v) for v in uniques] + [convert(None)], dtype=object)
+    return lookup[codes]
+
+
+def build_forecast_table(df: pd.DataFrame, platform_options: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Active users per (platform option, campaign type, gender group, lower-cased state).
+
+    Args:
+        df: Active users data
+        platform_options: Summary platform choices (default PLATFORM_OPTIONS);
+            the platforms present in `df` are always added, like the dropdown.
+            An option counts every platform value containing it.
+
+    Returns:
+        Frame with KEY_COLUMNS, `users` and, when `df` has PROPENSITY_COLUMNS,
+        `propensity` (sum of the rows' scores); state is "" for users without one
+    """
+    required = {"platform", "execution_type", "gender", "state", "accepted_180", "completed_180"}
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"Active users data is missing column(s): {', '.join(sorted(missing))}")
+
+    # One grouped pass over integer codes of the active rows
+    active = ((df["accepted_180"] > 0) & (df["completed_180"] > 0)).to_numpy()
+    codes, uniques = {}, {}
+    for column in ("platform", "execution_type", "gender", "state"):
+        codes[column], uniques[column] = pd.factorize(df[column])
+    keys = pd.DataFrame({column: column_codes[active] for column, column_codes in codes.items()})
+    keys["users"] = 1
+    sums = ["users"]
+    if set(PROPENSITY_COLUMNS) <= set(df.columns):
+        keys["propensity"] = propensity_scores(df)[active].astype(np.float64)
+        sums.append("propensity")
+    groups = keys.groupby(list(codes), sort=False, dropna=False)[sums].sum().reset_index()
+
+    groups["platform"] = _decode(groups["platform"], uniques["platform"], lambda v: v)
+    groups["campaign_type"] = _decode(groups["execution_type"], uniques["execution_type"], CAMPAIGN_TYPE_OF.get)
+    groups["gender"] = _decode(groups["gender"], uniques["gender"], _gender_group)
+    groups["state"] = _decode(groups["state"], uniques["state"], lambda v: "" if pd.isna(v) else str(v).lower())
+    groups = groups[groups["campaign_type"].notna() & groups["platform"].notna()]
+
+    # Each option covers every platform value containing it (an overlapping, many-to-many match)
+    data_platforms = [str(v) for v in uniques["platform"]]
+    options = list(dict.fromkeys((PLATFORM_OPTIONS if platform_options is None else platform_options) + data_platforms))
+    pieces = []
+    for option in options:
+        matching = [v for v in data_platforms if option.lower() in v.lower()]
+        piece = groups[groups["platform"].isin(matching)]
+        pieces.append(piece.assign(platform=option))
+    combined = pd.concat(pieces, ignore_index=True) if pieces else groups.iloc[:0]
+
+    table = combined.groupby(KEY_COLUMNS, sort=True)[sums].sum().reset_index()
+    table["users"] = table["users"].astype("int64")
+    table.attrs["platforms"] = options
+    return table
+
+
+class ForecastTable:
+    """
+    Lookups over a `build_forecast_table` result.
+
+    Args:
+        table: The built (or stored) table
+        as_of_date, built_at: Shown in the dashboard; optional
+    """
+
+    def __init__(self, table: pd.DataFrame, as_of_date: Optional[datetime.date] = None, built_at: Optional[float] = None):
+        self.table = table
+        self.as_of_date = as_of_date
+        self.built_at = built_at
+        self.platforms = set(table.attrs.get("platforms") or table["platform"].unique())
+        # Tables built before propensity scores have no `propensity` column
+        self.has_propensity = "propensity" in table.columns
+        self._cells: Dict[tuple, tuple] = {
+            key: (
+                cell["gender"].to_numpy(), cell["state"].to_numpy(), cell["users"].to_numpy(),
+                cell["propensity"].to_numpy() if self.has_propensity else None
+            )
+            for key, cell in table.groupby(["platform", "campaign_type"], sort=False)
+        }
+
+    def covers(self, platform: Optional[str], campaign_type: Optional[str]) -> bool:
+        return platform in self.platforms and campaign_type in CAMPAIGN_TYPE_MAP
+
+    def _lookup(self, platform, campaign_type, gender, locations, districts, pincode_prefixes) -> Optional[tuple]:
+        """(users, propensity sum) of the Summary filters, or None when not covered"""
+        if not self.covers(platform, campaign_type) or districts or pincode_prefixes:
+            return None
+        cell = self._cells.get((platform, campaign_type))
+        if cell is None:
+            return 0, (0.0 if self.has_propensity else None)
+        genders, states, users, propensity = cell
+        keep = np.ones(len(users), dtype=bool)
+        if gender in GENDER_VALUES:
+            keep &= genders == gender
+        if locations:
+            keep &= np.isin(states, [loc.lower() for loc in locations])
+        return int(users[keep].sum()), None if propensity is None else float(propensity[keep].sum())
+
+    def count(
+        self,
+        platform: str,
+        campaign_type: str,
+        gender: Optional[str] = None,
+        locations: Optional[List[str]] = None,
+        districts: Optional[List[str]] = None,
+        pincode_prefixes: Optional[List[str]] = None
+    ) -> Optional[int]:
+        """
+        Rows `summary_mask` keeps for the Summary filters, or None when the
+        table does not cover the platform / campaign type or a region finer
+        than a state is selected.
+        """
+        found = self._lookup(platform, campaign_type, gender, locations, districts, pincode_prefixes)
+        return None if found is None else found[0]
+
+    def propensity_sum(
+        self,
+        platform: str,
+        campaign_type: str,
+        gender: Optional[str] = None,
+        locations: Optional[List[str]] = None,
+        districts: Optional[List[str]] = None,
+        pincode_prefixes: Optional[List[str]] = None
+    ) -> Optional[float]:
+        """Sum of the propensity scores of the rows `count` counts (None when not covered or not stored)"""
+        found = self._lookup(platform, campaign_type, gender, locations, districts, pincode_prefixes)
+        return None if found is None else found[1]
+
+    def forecast(
+        self,
+        platform: str,
+        campaign_type: str,
+        gender: Optional[str] = None,
+        locations: Optional[List[str]] = None,
+        product_desirability: Optional[float] = None,
+        average_price: Optional[float] = None,
+        utility_score: Optional[float] = None,
+        default_safety: float = DEFAULT_SAFETY_NUMBER
+    ) -> Optional[dict]:
+        """`calculate_collaborations` for the looked-up count, or None when not covered"""
+        found = self._lookup(platform, campaign_type, gender, locations, None, None)
+        if found is None:
+            return None
+        filtered_count, propensity_sum = found
+        return calculate_collaborations(
+            filtered_count=filtered_count,
+            propensity_sum=propensity_sum,
+            product_desirability=product_desirability,
+            average_price=average_price,
+            utility_score=utility_score,
+            default_safety=default_safety
+        )
+
+
+def table_path(as_of_date: datetime.date, root: str = FORECAST_TABLE_DIR) -> str:
+    return os.path.join(root, f"date={as_of_date.isoformat()}.parquet")
+
+
+def write_forecast_table(table: pd.DataFrame, as_of_date: datetime.date, root: str = FORECAST_TABLE_DIR) -> str:
+    """Write (or replace) one date's table; atomic so readers never see a partial file"""
+    path = table_path(as_of_date, root)
+    os.makedirs(root, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_forecast_table(as_of_date: datetime.date, root: str = FORECAST_TABLE_DIR) -> Optional[ForecastTable]:
+    """The stored table for `as_of_date`, or None if the job has not built it"""
+    path = table_path(as_of_date, root)
+    try:
+        built_at = os.path.getmtime(path)
+        table = pd.read_parquet(path)
+    except FileNotFoundError:
+        return None
+    return ForecastTable(table, as_of_date, built_at)
+
+
+def ensure_forecast_table(as_of_date: datetime.date, root: str = FORECAST_TABLE_DIR, force: bool = False) -> str:
+    """Build and store the table for `as_of_date` unless it exists; returns its path"""
+    path = table_path(as_of_date, root)
+    if force or not os.path.exists(path):
+        from bigquery_utils import shared_query, summary_users_query, BACKGROUND
+
+        df = shared_query(summary_users_query, {"as_of_date": as_of_date}, priority=BACKGROUND)
+        write_forecast_table(build_forecast_table(df), as_of_date, root)
+    return path
+
+
+def main(argv=None):
+    # Imported here: the app imports this module at boot, the CLI only needs argparse
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--as-of-date", type=datetime.date.fromisoformat, help="Default: today (UTC)")
+    parser.add_argument("--root", default=FORECAST_TABLE_DIR, help="Output directory")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the table exists")
+    args = parser.parse_args(argv)
+
+    from bigquery_utils import today_utc
+
+    as_of_date = args.as_of_date or today_utc()
+    started = time.perf_counter()
+    path = ensure_forecast_table(as_of_date, args.root, force=args.force)
+    table = pd.read_parquet(path)
+    print(
+        f"✅ Forecast table for {as_of_date}: {len(table):,} combinations "
+        f"({os.path.getsize(path) / 1024:,.0f} KiB) in {time.perf_counter() - started:.1f}s → {path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
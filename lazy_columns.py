@@ -0,0 +1,81 @@
+"""
+Display columns fetched by key, on first use.
+
+Views load only the columns they filter on; columns that are merely shown
+(e.g. a user's gender and state in the Active Users table) are fetched for
+the keys on screen when they are first displayed, and kept for every later
+page and session of the same dataset version.
+"""
+import threading
+from typing import Callable, Iterable, List, Optional
+
+import pandas as pd
+
+# Above this many missing keys, one query for every key is cheaper than a keyed lookup
+MAX_KEYED_FETCH = 20_000
+
+
+class LazyColumns:
+    """
+    Args:
+        key: Key column shared with the frames passed to `join`
+        columns: Columns provided
+        fetch_keys: fetch_keys(keys) -> frame of `key` + `columns` for those keys
+        fetch_all: fetch_all() -> frame of `key` + `columns` for every key
+        max_keyed_fetch: Fetch everything instead when more keys are missing
+    """
+
+    def __init__(
+        self,
+        key: str,
+        columns: List[str],
+        fetch_keys: Callable[[List], pd.DataFrame],
+        fetch_all: Optional[Callable[[], pd.DataFrame]] = None,
+        max_keyed_fetch: int = MAX_KEYED_FETCH
+    ):
+        self.key = key
+        self.columns = list(columns)
+        self.fetch_keys = fetch_keys
+        self.fetch_all = fetch_all
+        self.max_keyed_fetch = max_keyed_fetch
+        self._values = pd.DataFrame(columns=self.columns, index=pd.Index([], name=key))
+        self._complete = False
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _add(self, fetched: pd.DataFrame):
+        fetched = fetched.drop_duplicates(self.key).set_index(self.key)[self.columns]
+        if self._values.empty:
+            self._values = fetched
+        else:
+            self._values = pd.concat([self._values, fetched[~fetched.index.isin(self._values.index)]])
+
+    def values(self, keys: Iterable) -> pd.DataFrame:
+        """`columns` indexed by key for `keys`, fetching the ones not seen yet"""
+        keys = pd.Index(pd.unique(pd.Series(list(keys), dtype=object).dropna()))
+        with self._lock:
+            missing = [] if self._complete else keys[~keys.isin(self._values.index)].tolist()
+            if missing:
+                self.fetches += 1
+                if self.fetch_all is not None and len(missing) > self.max_keyed_fetch:
+                    self._values = self._values.iloc[:0]
+                    self._add(self.fetch_all())
+                    self._complete = True
+                else:
+                    fetched = self.fetch_keys(missing)
+                    # Keys the source does not know are remembered as empty
+                    unknown = pd.Index(missing).difference(fetched[self.key])
+                    self._add(pd.concat([fetched, pd.DataFrame({self.key: unknown})], ignore_index=True))
+            return self._values.reindex(keys)
+
+    def join(self, df: pd.DataFrame) -> pd.DataFrame:
+        """`df` with `columns` added by its key column (already present columns are kept)"""
+        wanted = [c for c in self.columns if c not in df.columns]
+        if not wanted:
+            return df
+        if df.empty:
+            return df.reindex(columns=[*df.columns, *wanted])
+        return df.join(self.values(df[self.key])[wanted], on=self.key)
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,316 @@
+"""
+Concurrent-session load test for the Streamlit apps.
+
+Drives simulated sessions against `app.py` and `query_viewer/app.py` with
+Streamlit's AppTest, backed by `fake_bigquery.FakeBigQueryClient`, and reports
+throughput, p50/p99 rerun latency and peak memory per worker process as the
+number of sessions grows.
+
+Every AppTest interaction is a full script rerun, so the per-action latency
+is the cost without fragments. The apps also time each fragment body
+(`dashboard_common/rerun_timing.py`); the per-scope report shows what the
+partial rerun for a widget inside that fragment costs.
+
+AppTest swaps a process-global runtime on every run, so scripts cannot rerun
+concurrently inside one process. Sessions are therefore spread over worker
+processes (like running several Streamlit replicas) and each worker
+interleaves its sessions step by step. All workers share one backend
+semaphore, so `--slots` models the warehouse concurrency limit, and by
+default one file-backed shared result cache
+(`dashboard_common/shared_cache.py`, fresh per scale level), so the "queries" column shows warehouse load as replicas are
+added; `--cache local` gives each replica its own cache instead.
+
+Usage:
+    python load_test.py --app both --sessions 1,10,50,200 --latency 0.5
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+APPS = {
+    "dashboard": os.path.join(ROOT_DIR, "app.py"),
+    "query_viewer": os.path.join(ROOT_DIR, "query_viewer", "app.py"),
+}
+
+DEFAULT_SESSIONS = [1, 5, 10, 25, 50, 100, 200]
+
+_backend_slots = None
+
+
+def _init_worker(slots):
+    global _backend_slots
+    _backend_slots = slots
+
+
+def _find(elements, label: str):
+    """Return the first widget with the given label, or None"""
+    for element in elements:
+        if element.label == label:
+            return element
+    return None
+
+
+def _select_other(widget, rng: random.Random):
+    """Pick a random option different from the current one"""
+    choices = [o for o in widget.options if o != widget.value] or widget.options
+    return widget.set_value(rng.choice(choices))
+
+
+def _dashboard_steps(at, rng: random.Random):
+    """Scripted interactions for `app.py`; yields (action, run_callable)"""
+    yield "open", at.run
+    platform = _find(at.selectbox, "Platform")
+    if platform is not None:
+        yield "select_platform", _select_other(platform, rng).run
+    apply_button = _find(at.button, "🔍 Apply Filters")
+    if apply_button is not None:
+        yield "apply_filters", apply_button.click().run
+    load_button = _find(at.button, "📥 Load Active Users Data")
+    if load_button is not None:
+        yield "load_active_users", load_button.click().run
+    accepted_180 = _find(at.number_input, "Accepted 180 (min)")
+    submit = _find(at.button, "🔍 Apply Active Users Filters")
+    if accepted_180 is not None and submit is not None:
+        accepted_180.set_value(rng.randint(1, 5))
+        yield "active_users_filters", submit.click().run
+    items_per_page = _find(at.selectbox, "Items per page")
+    if items_per_page is not None:
+        yield "items_per_page", _select_other(items_per_page, rng).run
+    for page in (2, 3):
+        page_input = _find(at.number_input, "Page")
+        if page_input is not None and (page_input.max is None or page <= page_input.max):
+            yield "page", page_input.set_value(page).run
+    for label in ("📥 Download Filtered Data (CSV)", "📥 Download Full Dataset (CSV)"):
+        download = _find(at.get("download_button"), label)
+        if download is not None:
+            yield "download", download.click().run
+
+
+def _query_viewer_steps(at, rng: random.Random):
+    """Scripted interactions for `query_viewer/app.py`"""
+    yield "open", at.run
+    for label, action in (
+        ("Filter by Product Platform:", "select_platform"),
+        ("Filter by Project Name:", "select_project"),
+        ("Filter by Agent Name:", "select_agent"),
+    ):
+        widget = _find(at.selectbox, label)
+        if widget is not None:
+            yield action, _select_other(widget, rng).run
+    view = _find(at.radio, "View:")
+    if view is not None:
+        yield "select_view", _select_other(view, rng).run
+
+
+SCENARIOS = {
+    "dashboard": _dashboard_steps,
+    "query_viewer": _query_viewer_steps,
+}
+
+
+def _run_worker(
+    app: str,
+    n_sessions: int,
+    latency: float,
+    rows: int,
+    seed: int,
+    cache_url: str,
+    level_dir: str
+) -> Dict:
+    """Run `n_sessions` interleaved sessions of `app` inside this process"""
+    os.environ["SHARED_CACHE_URL"] = cache_url
+    # Replicas of a level share one usage log, one set of forecast tables and one pincode dimension
+    os.environ["USAGE_LOG_PATH"] = os.path.join(level_dir, "usage_log.jsonl")
+    os.environ["FORECAST_TABLE_DIR"] = os.path.join(level_dir, "forecast_tables")
+    os.environ["PINCODE_DIM_PATH"] = os.path.join(level_dir, "pincode_dim.npz")
+    script_path = APPS[app]
+    sys.path.insert(0, os.path.dirname(script_path))
+    sys.path.insert(1, ROOT_DIR)
+
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    # Before importing modules that create caches, which log a warning outside a runtime
+    set_log_level("error")
+    import bigquery_utils
+    from fake_bigquery import FakeBigQueryClient, install_fake_client
+    from dashboard_common.rerun_timing import timing_samples
+    client = install_fake_client(
+        FakeBigQueryClient(latency=latency, active_users_rows=rows, seed=seed, slots=_backend_slots)
+    )
+
+    timeout = 60 + 10 * latency
+    rng = random.Random(seed)
+    sessions = [
+        SCENARIOS[app](AppTest.from_file(script_path, default_timeout=timeout), rng)
+        for _ in range(n_sessions)
+    ]
+
+    samples = []
+    errors = 0
+    # Step-major order: every live session takes one step before any takes the next
+    while sessions:
+        still_running = []
+        for steps in sessions:
+            try:
+                action, run = next(steps)
+            except StopIteration:
+                continue
+            except Exception:
+                errors += 1
+                continue
+            started = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    at = run()
+                if at.exception:
+                    errors += 1
+            except Exception:
+                errors += 1
+            samples.append((action, time.perf_counter() - started))
+            still_running.append(steps)
+        sessions = still_running
+
+    return {
+        "samples": samples,
+        "errors": errors,
+        "queries": client.queries_executed,
+        "dry_runs": client.dry_runs,
+        "scope_ms": timing_samples(),
+        "queue": bigquery_utils.scheduler.stats(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_load_level(
+    app: str,
+    sessions: int,
+    workers: int,
+    latency: float,
+    rows: int,
+    slots: Optional[int],
+    cache: str = "shared"
+) -> Dict:
+    """Run one scale level and aggregate the worker results"""
+    ctx = mp.get_context("spawn")
+    n_workers = max(1, min(workers, sessions))
+    per_worker = [sessions // n_workers + (1 if i < sessions % n_workers else 0) for i in range(n_workers)]
+    backend_slots = ctx.BoundedSemaphore(slots) if slots else None
+    level_dir = tempfile.mkdtemp(prefix="load-test-")
+    cache_url = f"file://{os.path.join(level_dir, 'cache')}" if cache == "shared" else "memory://"
+
+    started = time.perf_counter()
+    with ctx.Pool(n_workers, initializer=_init_worker, initargs=(backend_slots,)) as pool:
+        results = pool.starmap(
+            _run_worker,
+            [(app, n, latency, rows, seed, cache_url, level_dir) for seed, n in enumerate(per_worker)]
+        )
+    wall = time.perf_counter() - started
+    shutil.rmtree(level_dir, ignore_errors=True)
+
+    samples = [s for r in results for s in r["samples"]]
+    latencies = np.array([s[1] for s in samples]) * 1000
+    by_action = {}
+    for action, seconds in samples:
+        by_action.setdefault(action, []).append(seconds * 1000)
+    by_scope = {}
+    for r in results:
+        for scope, values in r["scope_ms"].items():
+            by_scope.setdefault(scope, []).extend(values)
+
+    return {
+        "app": app,
+        "sessions": sessions,
+        "workers": n_workers,
+        "reruns": len(samples),
+        "errors": sum(r["errors"] for r in results),
+        "queries": sum(r["queries"] for r in results),
+        "wall_s": wall,
+        "throughput": len(samples) / wall if wall > 0 else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in results),
+        "p50_by_action_ms": {a: float(np.percentile(v, 50)) for a, v in by_action.items()},
+        "p50_by_scope_ms": {k: float(np.percentile(v, 50)) for k, v in by_scope.items()},
+        "queue_max_depth": max(r["queue"]["max_queued"] for r in results),
+        "queue_wait_p95_ms": max(r["queue"]["wait_p95_ms"] for r in results),
+        "queries_cancelled": sum(r["queue"]["cancelled"] + r["queue"]["timed_out"] for r in results),
+        "queries_rejected": sum(r["queue"]["rejected"] for r in results),
+        "dry_runs": sum(r["dry_runs"] for r in results),
+    }
+
+
+def print_report(rows: List[Dict]):
+    header = f"{'app':<14}{'sessions':>9}{'workers':>8}{'reruns':>8}{'errors':>7}{'queries':>8}{'rerun/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'RSS/proc MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['app']:<14}{r['sessions']:>9}{r['workers']:>8}{r['reruns']:>8}{r['errors']:>7}{r['queries']:>8}"
+            f"{r['throughput']:>9.1f}{r['p50_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['peak_rss_mb']:>13.0f}"
+        )
+    print()
+    print("p50 rerun latency by action (ms):")
+    for r in rows:
+        actions = ", ".join(f"{a}={v:.0f}" for a, v in r["p50_by_action_ms"].items())
+        print(f"  {r['app']} x{r['sessions']}: {actions}")
+    print()
+    print("Warehouse queue per worker process (job_scheduler):")
+    for r in rows:
+        print(
+            f"  {r['app']} x{r['sessions']}: max depth {r['queue_max_depth']}, "
+            f"worst p95 wait {r['queue_wait_p95_ms']:.0f} ms, "
+            f"{r['queries_cancelled']} cancelled, {r['queries_rejected']} rejected, "
+            f"{r['dry_runs']} dry runs"
+        )
+    print()
+    print("p50 in-app time by scope (ms; a widget change inside a fragment reruns only that scope):")
+    for r in rows:
+        scopes = ", ".join(f"{k}={v:.1f}" for k, v in r["p50_by_scope_ms"].items())
+        print(f"  {r['app']} x{r['sessions']}: {scopes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=["dashboard", "query_viewer", "both"], default="both")
+    parser.add_argument("--sessions", default=",".join(map(str, DEFAULT_SESSIONS)),
+                        help="Comma-separated session counts to step through")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (simulated app replicas)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Injected seconds per query")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows of the active users data")
+    parser.add_argument("--slots", type=int, default=None,
+                        help="Max concurrent backend queries across all workers (default: unlimited)")
+    parser.add_argument("--cache", choices=["shared", "local"], default="shared",
+                        help="One result cache shared by all workers, or one per worker")
+    args = parser.parse_args(argv)
+
+    apps = list(APPS) if args.app == "both" else [args.app]
+    levels = [int(s) for s in args.sessions.split(",") if s.strip()]
+
+    report = []
+    for app in apps:
+        for sessions in levels:
+            print(f"▶ {app}: {sessions} session(s)...", flush=True)
+            report.append(run_load_level(app, sessions, args.workers, args.latency, args.rows, args.slots, args.cache))
+    print()
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
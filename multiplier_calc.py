@@ -8,6 +8,30 @@ from typing import Optional
 # Default safety number - adjust this value as needed
 DEFAULT_SAFETY_NUMBER = 0.09
 
+# Weights of the normalized (0-1) inputs
+DESIRABILITY_WEIGHT = 0.35
+UTILITY_WEIGHT = 0.35
+PRICE_WEIGHT = 0.2
+
+# Subtracted from the final multiplier
+MULTIPLIER_OFFSET = 0.1
+
+# Price factor bands: prices below each upper bound get that factor
+# (the 1000 bound is inclusive); anything above gets ABOVE_MAX_PRICE_FACTOR.
+# Run `python backtest.py` to calibrate these against past campaigns.
+PRICE_BAND_EDGES = [100, 200, 300, 400, 1000]
+PRICE_BAND_FACTORS = [0.5, 0.6, 0.7, 0.8, 0.9]
+ABOVE_MAX_PRICE_FACTOR = 0.75
+
+
+def price_factor_for(average_price: float) -> float:
+    """Price factor for the band `average_price` falls in"""
+    for i, edge in enumerate(PRICE_BAND_EDGES):
+        is_last = i == len(PRICE_BAND_EDGES) - 1
+        if average_price < edge or (is_last and average_price <= edge):
+            return PRICE_BAND_FACTORS[i]
+    return ABOVE_MAX_PRICE_FACTOR
+
 
 def calculate_multiplier(
     product_desirability: Optional[float] = None,
@@ -32,37 +56,51 @@ def calculate_multiplier(
     # Normalize product desirability (0-10 scale to 0-1)
     if product_desirability is not None:
         desirability_factor = product_desirability /10.0
-        multiplier += (0.35 * desirability_factor)  # Weight: 0.5 to 1.0
+        multiplier += (DESIRABILITY_WEIGHT * desirability_factor)
     
     # Normalize utility score (0-10 scale to 0-1)
     if utility_score is not None:
         utility_factor = utility_score / 10.0
-        multiplier += (0.35 * utility_factor)  # Weight: 0.5 to 1.0
+        multiplier += (UTILITY_WEIGHT * utility_factor)
     
     # Price factor - range-based model
     if average_price is not None:
-        if average_price < 100:
-            price_factor = 0.5
-        elif 100 <= average_price < 200:
-            price_factor = 0.6
-        elif 200 <= average_price < 300:
-            price_factor = 0.7
-        elif 300 <= average_price < 400:
-            price_factor = 0.8
-        elif 400 <= average_price <= 1000:
-            price_factor = 0.9
-        else:  # > 1000
-            price_factor = 0.75
-        multiplier += (0.2 * price_factor) 
+        price_factor = price_factor_for(average_price)
+        multiplier += (PRICE_WEIGHT * price_factor)
     
-    return multiplier - 0.1
+    return multiplier - MULTIPLIER_OFFSET
+
+
+# Campaign inputs per-creator propensities are taken to describe (the Summary
+# Dashboard's defaults); other inputs scale them by their multiplier relative
+# to this one
+REFERENCE_INPUTS = {"product_desirability": 5, "average_price": None, "utility_score": 5}
+
+
+def campaign_factor(
+    product_desirability: Optional[float] = None,
+    average_price: Optional[float] = None,
+    utility_score: Optional[float] = None,
+    default_safety: float = DEFAULT_SAFETY_NUMBER
+) -> float:
+    """Multiplier of these campaign inputs relative to REFERENCE_INPUTS (at the default safety)"""
+    reference = calculate_multiplier(**REFERENCE_INPUTS, default_safety=DEFAULT_SAFETY_NUMBER)
+    multiplier = calculate_multiplier(
+        product_desirability=product_desirability,
+        average_price=average_price,
+        utility_score=utility_score,
+        default_safety=default_safety
+    )
+    return max(multiplier, 0.0) / reference
+
 
 def calculate_collaborations(
     filtered_count: int,
     product_desirability: Optional[float] = None,
     average_price: Optional[float] = None,
     utility_score: Optional[float] = None,
-    default_safety: float = DEFAULT_SAFETY_NUMBER
+    default_safety: float = DEFAULT_SAFETY_NUMBER,
+    propensity_sum: Optional[float] = None
 ) -> dict:
     """
     Calculate total number of collaborations that can be executed.
@@ -73,9 +111,14 @@ def calculate_collaborations(
         average_price: Average product price
         utility_score: Utility score (out of 10)
         default_safety: Default safety multiplier
+        propensity_sum: Sum of the filtered creators' propensity scores
+            (see propensity.py); when given, total collaborations are this
+            sum times `campaign_factor` instead of count × multiplier
     
     Returns:
-        Dictionary with multiplier and total collaborations
+        Dictionary with multiplier and total collaborations; with
+        `propensity_sum`, `multiplier` is the effective one (total / count)
+        and `global_multiplier` the one from the campaign inputs
     """
     multiplier = calculate_multiplier(
         product_desirability=product_desirability,
@@ -83,13 +126,21 @@ def calculate_collaborations(
         utility_score=utility_score,
         default_safety=default_safety
     )
+    global_multiplier = multiplier
     
-    total_collaborations = int(filtered_count * multiplier)
+    if propensity_sum is None:
+        total_collaborations = int(filtered_count * multiplier)
+    else:
+        factor = campaign_factor(product_desirability, average_price, utility_score, default_safety)
+        total_collaborations = min(int(propensity_sum * factor), filtered_count)
+        multiplier = total_collaborations / filtered_count if filtered_count else 0.0
     
     return {
         "filtered_count": filtered_count,
         "multiplier": multiplier,
         "total_collaborations": total_collaborations,
+        "global_multiplier": global_multiplier,
+        "propensity_sum": propensity_sum,
         "product_desirability": product_desirability,
         "average_price": average_price,
         "utility_score": utility_score,
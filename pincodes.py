@@ -0,0 +1,251 @@
+"""
+Local pincode dimension: 6-digit pincode -> state and district.
+
+Active users queries used to join every user's postcode to
+`facts.dim_pincode` (deduplicated with a ROW_NUMBER() window) on every run,
+only to attach a state. Instead the dimension is exported once into dense
+arrays indexed by pincode: 1,000,000 slots of int8 state codes and int16
+district codes, about 3 MB. It is stored as one versioned file. Queries
+return the raw postcode, and `add_locations` adds state and district with
+one gather per result.
+
+Queries never export it: without a built dimension their results just lack
+state and district. Refresh it when the dimension changes (the dashboard's
+pre-warm builds it when it is missing):
+
+    python pincodes.py [--force]
+"""
+import datetime
+import hashlib
+import os
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PINCODE_SLOTS = 1_000_000
+
+PINCODE_DIM_PATH = os.environ.get(
+    "PINCODE_DIM_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pincode_dim.npz")
+)
+
+# Columns `add_locations` derives from the postcode
+LOCATION_COLUMNS = ["state", "district"]
+
+pincode_dim_query = """
+SELECT pincode, state, district
+FROM `facts.dim_pincode`
+"""
+
+
+def _slots(postcodes) -> np.ndarray:
+    """Array index of each postcode, or -1 when missing or not a 6-digit pincode"""
+    values = pd.to_numeric(pd.Series(postcodes, copy=False), errors="coerce").astype(float).to_numpy()
+    valid = (values >= 0) & (values < PINCODE_SLOTS) & (values == np.floor(values))
+    return np.where(valid, values, -1).astype(np.int64)
+
+
+def _gather(codes: np.ndarray, names: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """Names at `slots` (None for -1 slots and unknown pincodes)"""
+    lookup = np.append(names.astype(object), None)
+    found = np.where(slots >= 0, codes[np.maximum(slots, 0)], -1)
+    return lookup[found]
+
+
+class PincodeDimension:
+    """
+    Dense pincode -> state / district arrays.
+
+    Args:
+        state_codes: int8[PINCODE_SLOTS], index into `states` (-1 unknown)
+        states: State names
+        district_codes: int16[PINCODE_SLOTS], index into `districts` (-1 unknown)
+        districts: District names
+        version: Identifies the dimension the arrays were built from
+    """
+
+    def __init__(self, state_codes, states, district_codes, districts, version: str):
+        self.state_codes = np.asarray(state_codes, dtype=np.int8)
+        self.states = np.asarray(states, dtype=str)
+        self.district_codes = np.asarray(district_codes, dtype=np.int16)
+        self.districts = np.asarray(districts, dtype=str)
+        self.version = version
+        self._districts_by_state = None
+
+    @classmethod
+    def from_table(cls, dim: pd.DataFrame) -> "PincodeDimension":
+        """
+        Build from `pincode_dim_query` rows; the first row of a repeated
+        pincode wins. Without a district column every district is unknown.
+        """
+        dim = dim.drop_duplicates("pincode")
+        slots = _slots(dim["pincode"])
+        dim, slots = dim[slots >= 0], slots[slots >= 0]
+        state_codes, states = pd.factorize(dim["state"])
+        district = dim["district"] if "district" in dim.columns else pd.Series(None, index=dim.index, dtype=object)
+        district_codes, districts = pd.factorize(district)
+        if len(states) > np.iinfo(np.int8).max or len(districts) > np.iinfo(np.int16).max:
+            raise ValueError(f"Too many states ({len(states)}) or districts ({len(districts)}) for the code arrays")
+
+        state_array = np.full(PINCODE_SLOTS, -1, dtype=np.int8)
+        state_array[slots] = state_codes
+        district_array = np.full(PINCODE_SLOTS, -1, dtype=np.int16)
+        district_array[slots] = district_codes
+        digest = hashlib.sha1()
+        for part in (state_array, district_array, "\0".join(states), "\0".join(districts)):
+            digest.update(part.tobytes() if isinstance(part, np.ndarray) else part.encode())
+        version = f"{datetime.date.today().isoformat()}-{digest.hexdigest()[:8]}"
+        return cls(state_array, list(states), district_array, list(districts), version)
+
+    def states_of(self, postcodes) -> np.ndarray:
+        return _gather(self.state_codes, self.states, _slots(postcodes))
+
+    def districts_of(self, postcodes) -> np.ndarray:
+        return _gather(self.district_codes, self.districts, _slots(postcodes))
+
+    def add_locations(self, df: pd.DataFrame, column: str = "postcode") -> pd.DataFrame:
+        """`df` with LOCATION_COLUMNS looked up from its `column`"""
+        slots = _slots(df[column])
+        df = df.copy(deep=False)
+        df["state"] = _gather(self.state_codes, self.states, slots)
+        df["district"] = _gather(self.district_codes, self.districts, slots)
+        return df
+
+    def districts_in(self, states: Optional[Iterable[str]] = None) -> List[str]:
+        """Districts (sorted) of the given states, or all of them"""
+        if self._districts_by_state is None:
+            known = (self.state_codes >= 0) & (self.district_codes >= 0)
+            pairs = pd.DataFrame({
+                "state": self.states[self.state_codes[known]],
+                "district": self.districts[self.district_codes[known]],
+            }).drop_duplicates()
+            self._districts_by_state = pairs.groupby("state")["district"].apply(sorted).to_dict()
+        if states is None:
+            return sorted(self.districts.tolist())
+        wanted = {s.lower() for s in states}
+        found = [d for s, ds in self._districts_by_state.items() if s.lower() in wanted for d in ds]
+        return sorted(set(found))
+
+    def save(self, path: str = PINCODE_DIM_PATH) -> str:
+        """Write atomically, so readers never see a partial file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            state_codes=self.state_codes, states=self.states,
+            district_codes=self.district_codes, districts=self.districts,
+            version=np.array(self.version)
+        )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = PINCODE_DIM_PATH) -> "PincodeDimension":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["state_codes"], data["states"], data["district_codes"], data["districts"], str(data["version"])
+            )
+
+
+def pincode_prefix_mask(postcodes, prefixes: Iterable[str]) -> np.ndarray:
+    """
+    Rows whose postcode starts with any of `prefixes` (e.g. "110" for Delhi,
+    "4000" for central Mumbai); each prefix is a range check on the number.
+    """
+    slots = _slots(postcodes)
+    mask = np.zeros(len(slots), dtype=bool)
+    for prefix in prefixes:
+        prefix = str(prefix).strip()
+        if not prefix.isdigit() or len(prefix) > 6:
+            raise ValueError(f"Pincode prefix must be 1-6 digits: {prefix!r}")
+        width = 10 ** (6 - len(prefix))
+        low = int(prefix) * width
+        mask |= (slots >= low) & (slots < low + width)
+    return mask
+
+
+def parse_pincode_prefixes(text: str) -> List[str]:
+    """Comma/space separated prefixes from a text input; raises ValueError on a bad one"""
+    prefixes = [p for p in text.replace(",", " ").split() if p]
+    pincode_prefix_mask([], prefixes)
+    return prefixes
+
+
+_loaded = {}
+_load_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+def get_pincode_dimension(path: str = PINCODE_DIM_PATH) -> Optional[PincodeDimension]:
+    """The stored dimension (reloaded when the file is replaced), or None if it has not been built"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _load_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _loaded[path] = (mtime, PincodeDimension.load(path))
+        return cached[1]
+
+
+def ensure_pincode_dimension(path: str = PINCODE_DIM_PATH, force: bool = False) -> PincodeDimension:
+    """The stored dimension, exported from the warehouse first if it is missing (or `force`)"""
+    dimension = None if force else get_pincode_dimension(path)
+    if dimension is not None:
+        return dimension
+    # One export at a time (they would share the temporary file)
+    with _export_lock:
+        dimension = None if force else get_pincode_dimension(path)
+        if dimension is not None:
+            return dimension
+        from bigquery_utils import query_bigquery, shared_query, BACKGROUND
+
+        if force:
+            dim = query_bigquery(pincode_dim_query, priority=BACKGROUND)
+        else:
+            dim = shared_query(pincode_dim_query, priority=BACKGROUND)
+        PincodeDimension.from_table(dim).save(path)
+        dimension = get_pincode_dimension(path)
+    return dimension
+
+
+def add_locations(df: pd.DataFrame, column: str = "postcode") -> pd.DataFrame:
+    """
+    `df` with state and district from the stored dimension, or `df` as it is
+    (with a warning) when the dimension is missing or cannot be read.
+    """
+    try:
+        dimension = get_pincode_dimension()
+        if dimension is None:
+            raise FileNotFoundError(f"{PINCODE_DIM_PATH} has not been built yet")
+        return dimension.add_locations(df, column)
+    except Exception as e:
+        print(f"⚠️ Skipping state/district lookup: {e}")
+        return df
+
+
+def main(argv=None):
+    # Imported here: the app imports this module at boot, the CLI only needs argparse
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=PINCODE_DIM_PATH, help="Output file")
+    parser.add_argument("--force", action="store_true", help="Re-export even if the file exists")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    dimension = ensure_pincode_dimension(args.path, force=args.force)
+    known = int((dimension.state_codes >= 0).sum())
+    print(
+        f"✅ Pincode dimension {dimension.version}: {known:,} pincodes, {len(dimension.states)} states, "
+        f"{len(dimension.districts):,} districts ({os.path.getsize(args.path) / 1024:,.0f} KiB) "
+        f"in {time.perf_counter() - started:.1f}s → {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,293 @@
 """
 Prediction model utilities.
+
+scikit-learn is imported on first use (see `_load_sklearn`) so that importing
+this module, or the scoring constants it re-exports, stays cheap.
 """
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
-import pickle
 import os
+import pickle
 from typing import Optional, Tuple, Dict, Any
 
-PRODUCT_UTILITY_SCORE = {
-    "Utility": 3,
-    "Semi-Utility": 2,
-    "Non-Utility": 1
-}
+import pandas as pd
 
-BRAND_SCORE = {
-    "Established": 3,
-    "Mid": 2,
-    "New": 1
-}
+from scores import (
+    PRODUCT_UTILITY_SCORE,
+    BRAND_SCORE,
+    PARTICIPATION_RATE_BY_SCORE,
+    PLATFORM_CONFIDENCE
+)
 
-PARTICIPATION_RATE_BY_SCORE = {
-    (7, 9): 0.80,
-    (5, 6): 0.55,
-    (3, 4): 0.30
+_SKLEARN_NAMES = {
+    "train_test_split": "sklearn.model_selection",
+    "KFold": "sklearn.model_selection",
+    "RandomForestRegressor": "sklearn.ensemble",
+    "RandomForestClassifier": "sklearn.ensemble",
+    "StandardScaler": "sklearn.preprocessing",
+    "LabelEncoder": "sklearn.preprocessing",
+    "mean_squared_error": "sklearn.metrics",
+    "accuracy_score": "sklearn.metrics",
+    "classification_report": "sklearn.metrics",
+    "r2_score": "sklearn.metrics",
 }
 
-PLATFORM_CONFIDENCE = {
-    ("Review", "Paid"): 0.90,
-    ("Instagram", "Paid"): 0.60,
-    ("Instagram", "Barter"): 0.40
+
+def _patch_numpy_fft():
+    """Workaround for numpy.fft import issue with numpy 2.0+"""
+    try:
+        import numpy
+        if not hasattr(numpy.fft, '__all__'):
+            numpy.fft.__all__ = [
+                'fft', 'ifft', 'fft2', 'ifft2', 'fftn', 'ifftn',
+                'rfft', 'irfft', 'rfft2', 'irfft2', 'rfftn', 'irfftn',
+                'hfft', 'ihfft', 'fftfreq', 'rfftfreq', 'fftshift', 'ifftshift'
+            ]
+    except (ImportError, AttributeError):
+        pass
+
+
+def _load_sklearn(name: str):
+    """Import a scikit-learn object on first use"""
+    import importlib
+    _patch_numpy_fft()
+    value = getattr(importlib.import_module(_SKLEARN_NAMES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name: str):
+    if name in _SKLEARN_NAMES:
+        return _load_sklearn(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+# Bump when the feature encoding or training procedure changes so that
+# models saved by older code are not reused
+MODEL_VERSION = 1
+
+CATEGORICAL_FEATURES = ["platform", "execution_type"]
+NUMERIC_FEATURES = ["audience_size"]
+TARGET_COLUMN = "collaborations"
+
+DEFAULT_MODEL_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 10,
+    "min_samples_leaf": 3,
+    "random_state": 42
 }
+
+
+class CollaborationPredictor:
+    """
+    Predicts collaborations per campaign from historical campaign outcomes.
+
+    The forest learns the acceptance rate (collaborations / audience_size),
+    which transfers across audience sizes; `predict` scales it back to a
+    collaboration count.
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        self.params = {**DEFAULT_MODEL_PARAMS, **(params or {})}
+        self.categories_: Dict[str, list] = {}
+        self.model_ = None
+        self.cv_metrics_: Optional[Dict[str, Any]] = None
+        self.n_training_rows_ = 0
+
+    def _encode(self, df: pd.DataFrame):
+        """Encode features into a float matrix; unseen categories become -1"""
+        import numpy as np
+
+        columns = [
+            pd.Categorical(df[col], categories=self.categories_[col]).codes
+            for col in CATEGORICAL_FEATURES
+        ]
+        columns += [pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy() for col in NUMERIC_FEATURES]
+        return np.column_stack(columns).astype(np.float32)
+
+    def fit(self, history: pd.DataFrame, n_jobs: int = -1) -> "CollaborationPredictor":
+        """
+        Train on historical campaigns.
+
+        Args:
+            history: One row per campaign with the feature columns and `collaborations`
+            n_jobs: Cores used to grow trees (-1 = all)
+
+        Returns:
+            self
+        """
+        history = _training_rows(history)
+        if history.empty:
+            raise ValueError("No campaigns with a positive audience_size to train on")
+
+        self.categories_ = {
+            col: sorted(history[col].dropna().astype(str).unique().tolist())
+            for col in CATEGORICAL_FEATURES
+        }
+        RandomForestRegressor = _load_sklearn("RandomForestRegressor")
+        self.model_ = RandomForestRegressor(n_jobs=n_jobs, **self.params)
+        self.model_.fit(self._encode(history), _acceptance_rate(history))
+        # Inference happens on small batches inside a dashboard rerun, where
+        # thread start-up would cost more than it saves
+        self.model_.set_params(n_jobs=1)
+        self.n_training_rows_ = len(history)
+        return self
+
+    def predict_rate(self, scenarios: pd.DataFrame):
+        """Predicted acceptance rate for every scenario row (vectorized)"""
+        if self.model_ is None:
+            raise ValueError("Model has not been trained")
+        return self.model_.predict(self._encode(scenarios))
+
+    def predict(self, scenarios: pd.DataFrame):
+        """
+        Predicted collaborations for every scenario row in one call.
+
+        Args:
+            scenarios: DataFrame with `platform`, `execution_type` and `audience_size`
+
+        Returns:
+            numpy array of expected collaborations, one per row
+        """
+        audience = pd.to_numeric(scenarios["audience_size"], errors="coerce").fillna(0).to_numpy()
+        return self.predict_rate(scenarios) * audience
+
+
+def _training_rows(history: pd.DataFrame) -> pd.DataFrame:
+    history = history.dropna(subset=NUMERIC_FEATURES + [TARGET_COLUMN])
+    history = history[history["audience_size"] > 0].reset_index(drop=True)
+    for col in CATEGORICAL_FEATURES:
+        history[col] = history[col].astype(str)
+    return history
+
+
+def _acceptance_rate(history: pd.DataFrame):
+    return (history[TARGET_COLUMN] / history["audience_size"]).clip(0, 1).to_numpy()
+
+
+def _fit_and_score_fold(history: pd.DataFrame, train_idx, test_idx, params: Dict[str, Any]) -> Dict[str, float]:
+    """Train on one CV fold and score it (runs in a worker process)"""
+    import numpy as np
+
+    model = CollaborationPredictor(params).fit(history.iloc[train_idx], n_jobs=1)
+    test = history.iloc[test_idx]
+    predicted = model.predict(test)
+    actual = test[TARGET_COLUMN].to_numpy(dtype=float)
+    return {
+        "mae": float(np.mean(np.abs(predicted - actual))),
+        "wape": float(np.sum(np.abs(predicted - actual)) / max(np.sum(actual), 1.0)),
+        "r2": float(_load_sklearn("r2_score")(actual, predicted)) if len(test) > 1 else float("nan"),
+    }
+
+
+def cross_validate(
+    history: pd.DataFrame,
+    params: Optional[Dict[str, Any]] = None,
+    n_splits: int = 5,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    K-fold cross-validation with one process per fold.
+
+    Args:
+        history: Historical campaigns (see `CollaborationPredictor.fit`)
+        params: RandomForest parameters (defaults to DEFAULT_MODEL_PARAMS)
+        n_splits: Number of folds
+        max_workers: Process pool size (default: one per fold, capped at CPU count)
+
+    Returns:
+        Dictionary with mean MAE, WAPE and R² plus the per-fold scores
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    history = _training_rows(history)
+    n_splits = min(n_splits, len(history))
+    if n_splits < 2:
+        return {"folds": [], "mae": float("nan"), "wape": float("nan"), "r2": float("nan")}
+
+    params = {**DEFAULT_MODEL_PARAMS, **(params or {})}
+    KFold = _load_sklearn("KFold")
+    splits = KFold(n_splits=n_splits, shuffle=True, random_state=params.get("random_state")).split(history)
+    workers = max_workers or min(n_splits, os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_fit_and_score_fold, history, train_idx, test_idx, params)
+            for train_idx, test_idx in splits
+        ]
+        folds = [f.result() for f in futures]
+
+    return {
+        "folds": folds,
+        **{metric: sum(f[metric] for f in folds) / len(folds) for metric in ("mae", "wape", "r2")}
+    }
+
+
+def model_key(history: pd.DataFrame, params: Optional[Dict[str, Any]] = None) -> str:
+    """Content hash of the training data, parameters and feature spec"""
+    import hashlib
+    import json
+
+    columns = CATEGORICAL_FEATURES + NUMERIC_FEATURES + [TARGET_COLUMN]
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(history[columns], index=False).to_numpy().tobytes())
+    digest.update(json.dumps({
+        "params": {**DEFAULT_MODEL_PARAMS, **(params or {})},
+        "features": columns,
+        "version": MODEL_VERSION
+    }, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    On-disk store of fitted models keyed by `model_key`.
+
+    The same training data and parameters always map to the same file, so a
+    model is trained once and then loaded by every session and process.
+    """
+
+    def __init__(self, directory: str = MODEL_DIR):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"collaboration_model_{key}.pkl")
+
+    def load(self, key: str) -> Optional[CollaborationPredictor]:
+        """Load a saved model, or None if it does not exist"""
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, model: CollaborationPredictor):
+        """Write atomically so concurrent readers never see a partial file"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(key))
+
+    def get_or_train(
+        self,
+        history: pd.DataFrame,
+        params: Optional[Dict[str, Any]] = None,
+        cv_folds: int = 5
+    ) -> Tuple[CollaborationPredictor, str, bool]:
+        """
+        Return the model for `history`, training and saving it if needed.
+
+        Returns:
+            (model, key, trained) where `trained` is False for a cache hit
+        """
+        key = model_key(history, params)
+        model = self.load(key)
+        if model is not None:
+            return model, key, False
+
+        model = CollaborationPredictor(params).fit(history)
+        if cv_folds:
+            model.cv_metrics_ = cross_validate(history, params, n_splits=cv_folds)
+        self.save(key, model)
+        return model, key, True
@@ -0,0 +1,46 @@
+"""
+Per-creator collaboration propensity.
+
+The global multiplier treats every creator in the audience alike. Instead,
+each row of the active users data gets the probability that its creator
+accepts and completes a collaboration, from their own history:
+
+    p = P(accept) × P(complete | accepted)
+
+Both rates are shrunk towards the dataset-wide rate with PRIOR_STRENGTH
+pseudo-invites (pseudo-acceptances), so a creator with 1 invite and 1
+acceptance is not scored as certain. The campaign inputs (desirability,
+utility, price) scale every score by the same
+`multiplier_calc.campaign_factor`, so the expected collaborations of an
+audience are one masked sum of the precomputed scores times that factor.
+"""
+import numpy as np
+import pandas as pd
+
+# Pseudo-observations of the dataset-wide rate added to every creator's history
+PRIOR_STRENGTH = 10
+
+# Columns the scores are computed from
+PROPENSITY_COLUMNS = ["invited", "accepted", "accepted_180", "completed_180"]
+
+
+def _column(df: pd.DataFrame, column: str) -> np.ndarray:
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+
+def _smoothed_rate(successes: np.ndarray, trials: np.ndarray, strength: float) -> np.ndarray:
+    """(successes + strength × overall rate) / (trials + strength), capped at 1"""
+    total = trials.sum()
+    prior = successes.sum() / total if total > 0 else 0.0
+    return np.minimum((successes + strength * prior) / (trials + strength), 1.0)
+
+
+def propensity_scores(df: pd.DataFrame, strength: float = PRIOR_STRENGTH) -> np.ndarray:
+    """float32 probability per row that its creator accepts and completes a collaboration"""
+    missing = [c for c in PROPENSITY_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Active users data is missing column(s): {', '.join(missing)}")
+    invited, accepted, accepted_180, completed_180 = (_column(df, c) for c in PROPENSITY_COLUMNS)
+    accept = _smoothed_rate(accepted, np.maximum(invited, accepted), strength)
+    complete = _smoothed_rate(completed_180, np.maximum(accepted_180, completed_180), strength)
+    return (accept * complete).astype(np.float32)
@@ -0,0 +1,125 @@
+"""
+Agent efficiency: one long-format query, pivoted locally.
+
+The query returns numeric counts per agent x content_type. The wide
+"Total / APPROVED % / REJECTED %" table and the per-agent and per-content-type
+views are all built from that one cached result with vectorized pandas ops.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+agent_efficiency_query = """
+WITH subs AS (
+  SELECT
+    s.id AS subm_id,
+    content_type,
+    review_stage,
+    reviewed_by_agent_id
+  FROM opa_hybrid.submission s
+  LEFT JOIN opa_hybrid.deliverable d
+    ON s.deliverable_id = d.id
+  WHERE review_stage != 'PENDING'
+    AND DATE(JSON_VALUE(review_props, '$.created_at')) = DATE_SUB(@as_of_date, INTERVAL 1 DAY)
+),
+pop AS (
+  SELECT
+    c.id AS collaboration_id,
+    pop_review_stage,
+    CAST(JSON_VALUE(pop_review_props, '$.agent_id') AS INT64) AS agent_id
+  FROM opa_hybrid.collaboration c
+  LEFT JOIN opa_hybrid.campaign cam
+    ON c.campaign_id = cam.id
+  WHERE platform IN ('product_trials', 'instagram_and_product_trials')
+    AND pop_review_stage IN ('APPROVED', 'REJECTED')
+    AND DATE(JSON_VALUE(pop_review_props, '$.created_at')) = DATE_SUB(@as_of_date, INTERVAL 1 DAY)
+),
+agent AS (
+  SELECT
+    id AS agent_id,
+    CONCAT(given_name, ' ', family_name) AS name
+  FROM opa_hybrid.agent
+)
+SELECT
+  name AS agent_name,
+  content_type,
+  COUNT(DISTINCT subm_id) AS rated,
+  COUNT(DISTINCT IF(review_stage = 'APPROVED', subm_id, NULL)) AS approved,
+  COUNT(DISTINCT IF(review_stage = 'REJECTED', subm_id, NULL)) AS rejected
+FROM subs s
+LEFT JOIN agent a
+  ON s.reviewed_by_agent_id = a.agent_id
+GROUP BY 1, 2
+UNION ALL
+SELECT
+  name AS agent_name,
+  'POP' AS content_type,
+  COUNT(DISTINCT collaboration_id) AS rated,
+  COUNT(DISTINCT IF(pop_review_stage = 'APPROVED', collaboration_id, NULL)) AS approved,
+  COUNT(DISTINCT IF(pop_review_stage = 'REJECTED', collaboration_id, NULL)) AS rejected
+FROM pop p
+LEFT JOIN agent a
+  ON p.agent_id = a.agent_id
+GROUP BY 1, 2
+"""
+
+COUNT_COLUMNS = ["rated", "approved", "rejected"]
+
+
+def add_rates(counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add approved_pct / rejected_pct (0-100) to a frame of counts, rounded half
+    up like BigQuery's ROUND(x, 0) (12.5 -> 13; np.rint would give 12)
+    """
+    counts = counts.copy()
+    rated = counts["rated"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        counts["approved_pct"] = np.floor(counts["approved"].to_numpy() / rated * 100 + 0.5)
+        counts["rejected_pct"] = np.floor(counts["rejected"].to_numpy() / rated * 100 + 0.5)
+    return counts
+
+
+def breakup_cells(counts: pd.DataFrame) -> pd.Series:
+    """'Total : n / APPROVED : x% / REJECTED : y%' cell text, one line each"""
+    counts = add_rates(counts)
+
+    def pct(column):
+        return counts[column].map(lambda v: "-" if np.isnan(v) else f"{v:.0f}")
+
+    return (
+        "Total : " + counts["rated"].astype(int).astype(str)
+        + "\nAPPROVED : " + pct("approved_pct") + "%"
+        + "\nREJECTED : " + pct("rejected_pct") + "%"
+    )
+
+
+def content_type_columns(long_df: pd.DataFrame) -> list:
+    """Content types in display order: alphabetical, POP last"""
+    types = sorted(t for t in long_df["content_type"].dropna().astype(str).unique() if t != "POP")
+    if (long_df["content_type"] == "POP").any():
+        types.append("POP")
+    return types
+
+
+def pivot_breakup(long_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agent x content_type table of breakup cells, matching the old SQL PIVOT.
+
+    Column names are sanitized the same way the SQL aliases were.
+    """
+    if long_df.empty:
+        return pd.DataFrame(columns=["agent_name"])
+
+    cells = long_df[["agent_name", "content_type"]].copy()
+    cells["breakup"] = breakup_cells(long_df)
+    wide = cells.set_index(["agent_name", "content_type"])["breakup"].unstack()
+    wide = wide.reindex(columns=content_type_columns(long_df))
+    wide.columns = [re.sub(r'[^a-zA-Z0-9]', '_', str(c)) for c in wide.columns]
+    return wide.sort_index().reset_index()
+
+
+def totals_by(long_df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Summed counts and approval rates per `key` ('agent_name' or 'content_type')"""
+    totals = long_df.groupby(key, dropna=False)[COUNT_COLUMNS].sum().reset_index()
+    return add_rates(totals).sort_values("rated", ascending=False).reset_index(drop=True)
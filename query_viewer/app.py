@@ -1,9 +1,38 @@
+import datetime
+import os
+import sys
+import time
+
+# The modules shared with the dashboard live in ../dashboard_common. Appended,
+# so this app's own bigquery_utils still wins over the dashboard's.
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT_DIR not in sys.path:
+    sys.path.append(_ROOT_DIR)
+
 import streamlit as st
 import pandas as pd
-import re
-from bigquery_utils import query_bigquery
+from bigquery_utils import (
+    query_bigquery, cached_query, shared_query, today_utc, render_queue_status, render_scan_usage, current_owner,
+    count_script_run, BACKGROUND
+)
+from agent_efficiency import agent_efficiency_query, pivot_breakup, totals_by
+from history_store import HistoryStore, agent_throughput, daily_totals
+from pending_monitor import PendingEvalsMonitor
+from dashboard_common.facets import FacetIndex, format_option
+from dashboard_common.rerun_timing import timed, record, render_timings, FULL_RUN
+from dashboard_common.prewarm import Prewarmer, PREWARM_INTERVAL_S, render_prewarm_status
+from capacity_forecast import (
+    HISTORY_DATASET as PT_HISTORY_DATASET,
+    FORECAST_WINDOW_DAYS,
+    forecast_capacity,
+    history_rows,
+)
 
 st.set_page_config(page_title="Query Viewer", layout="wide")
+count_script_run()
+
+# Full-run latency is recorded at the end of the script
+run_started = time.perf_counter()
 
 st.title("BigQuery Query Viewer")
 
@@ -19,6 +48,86 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Date-relative queries take @as_of_date instead of CURRENT_DATE() so that
+# BigQuery's result cache and cached_query can serve repeat loads
+as_of_date = st.date_input(
+    "As of date",
+    value=today_utc(),
+    max_value=today_utc(),
+    help="Daily reports show the day before this date"
+)
+date_params = {"as_of_date": as_of_date}
+
+history_store = HistoryStore()
+
+# Live mode re-renders the pending table from the shared monitor this often
+LIVE_REFRESH_S = 15
+
+
+@st.cache_resource
+def get_pending_monitor(full_query):
+    """One background poller per process, shared by every session"""
+    return PendingEvalsMonitor(
+        lambda query: query_bigquery(query, priority=BACKGROUND),
+        full_query,
+        on_refresh=lambda snapshot: history_store.write_partition("pending_evals", today_utc(), snapshot)
+    )
+
+
+def render_pending_table(df):
+    # Render with HTML so that line breaks are respected reliably
+    html_table = df.reset_index(drop=True).to_html(escape=False).replace("\\n", "<br>")
+    st.markdown(
+        """
+        <style>
+        .fullwidth-table {
+            max-height: 70vh;
+            overflow-y: auto;
+            overflow-x: auto;
+        }
+        .fullwidth-table table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        .fullwidth-table th,
+        .fullwidth-table td {
+            padding: 0.25rem 0.75rem;
+            text-align: center;
+            vertical-align: top;
+            white-space: pre-wrap;
+            word-wrap: break-word;
+        }
+        .fullwidth-table th {
+            background-color: #3a3a3a;
+            font-weight: 600;
+            position: sticky;
+            top: 0;
+            z-index: 10;
+        }
+        </style>
+        """,
+        unsafe_allow_html=True,
+    )
+    st.markdown(f'<div class="fullwidth-table">{html_table}</div>', unsafe_allow_html=True)
+
+
+@st.fragment(run_every=LIVE_REFRESH_S)
+def live_pending_evals(monitor):
+    """Re-renders only this fragment; numbers come from the shared monitor, not a query"""
+    state = monitor.latest()
+    if state["error"]:
+        st.error(f"Error checking for changes: {state['error']}")
+    if state["snapshot"] is None:
+        st.info("Waiting for the first snapshot...")
+        return
+    refreshed = datetime.datetime.fromtimestamp(state["refreshed_at"]).strftime("%H:%M:%S")
+    checked = datetime.datetime.fromtimestamp(state["checked_at"]).strftime("%H:%M:%S") if state["checked_at"] else "-"
+    st.caption(
+        f"🔴 Live · last change {refreshed} · last checked {checked} · "
+        f"checks every {monitor.interval_s}s, re-queries only when the backlog changes"
+    )
+    render_pending_table(state["snapshot"])
+
 tab1, tab2, tab3 = st.tabs(["PT order tracker", "Agent efficiency tracker", "Daily pending evals"])
 
 query = """
@@ -54,7 +163,7 @@ collab as (
   FROM opa_hybrid.collaboration
   WHERE invite_stage = 'ACCEPTED'
   AND is_revoked = 'false'
-  AND DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')) = CURRENT_DATE() -1
+  AND DATE(JSON_VALUE(participation_props, '$.acceptance.created_at')) = DATE_SUB(@as_of_date, INTERVAL 1 DAY)
   GROUP BY 1
 ),
 final_data as (
@@ -92,43 +201,140 @@ OR daily_limit = 0
 order by 3 asc
 """
 
-with tab1:
-    if 'df' not in st.session_state:
+pending_evals_query = """
+   WITH subs AS (
+  SELECT
+    s.id AS subm_id,
+    collaboration_id,
+    deliverable_id,
+    s.created_at AS subm_date,
+    content_type,
+    CASE WHEN JSON_VALUE(cam.extras, '$.is_auto_review_enabled') = 'true' THEN True ELSE false END as auto_review,
+  FROM opa_hybrid.submission s
+  LEFT JOIN opa_hybrid.deliverable d
+  ON s.deliverable_id = d.id
+  LEFT JOIN opa_hybrid.campaign cam
+  ON s.campaign_id = cam.id
+  WHERE review_stage = 'PENDING'
+  AND stage in ("LIVE", "PAUSED")
+),
+pop AS (
+  SELECT
+    c.id AS collaboration_id,
+  FROM opa_hybrid.collaboration c
+  LEFT JOIN opa_hybrid.campaign cam
+  ON c.campaign_id = cam.id
+  WHERE platform IN ('product_trials', 'instagram_and_product_trials')
+  AND pop_review_stage = "PENDING"
+  AND stage in ("LIVE", "PAUSED")
+)
+SELECT * FROM (
+  SELECT content_type, 
+    COUNT(DISTINCT IF(content_type = 'review' AND subs.auto_review = TRUE, subm_id, null)) as auto_submissions,
+    COUNT(DISTINCT IF((subs.auto_review = FALSE) OR (content_type != 'review' AND subs.auto_review = FALSE) OR (content_type = 'review' AND subs.auto_review = FALSE), subm_id, null)) as manual_submission_pending,
+  from subs
+  GROUP BY 1
+)
+UNION ALL(
+  SELECT 'POP' as content_type,
+  0 as auto_submissions,
+  COUNT(DISTINCT collaboration_id) as Manual_submission_pending
+  FROM pop
+  GROUP BY 1
+)
+"""
+
+# Pending counts are live: shared between sessions and replicas only briefly
+PENDING_CACHE_TTL_S = 5 * 60
+
+
+@st.cache_resource(show_spinner=False)
+def start_prewarm():
+    """Warm each tab's query in the background once per process (and every PREWARM_INTERVAL_S)"""
+    def warm_daily(daily_query):
+        def task():
+            params = {"as_of_date": today_utc()}
+            shared_query(daily_query, params, priority=BACKGROUND)
+            cached_query(daily_query, params)
+        return task
+
+    return Prewarmer({
+        "PT orders": warm_daily(query),
+        "agent efficiency": warm_daily(agent_efficiency_query),
+        "pending evals": lambda: shared_query(
+            pending_evals_query, fresh_s=PENDING_CACHE_TTL_S, stale_s=0, priority=BACKGROUND
+        ),
+    }, PREWARM_INTERVAL_S).start()
+
+
+prewarmer = start_prewarm()
+
+
+@st.fragment
+@timed("PT order tracker")
+def pt_order_tracker(as_of_date, date_params):
+    """PT order tracker tab; its widgets rerun only this fragment"""
+    if st.session_state.get('df_as_of') != as_of_date:
         try:
             with st.spinner("Executing query..."):
-                st.session_state.df = query_bigquery(query)
+                st.session_state.df = cached_query(query, date_params)
+                st.session_state.df_facets = FacetIndex(st.session_state.df, ['product_platform', 'project_name'])
+                # Only a successful load is kept for the date; a failed one is retried
+                st.session_state.df_as_of = as_of_date
+                # Selections from another date may not exist in the new data
+                st.session_state.pop('pt_platform_filter', None)
+                st.session_state.pop('pt_project_filter', None)
                 st.success(f"Query executed successfully! Found {len(st.session_state.df)} rows.")
         except Exception as e:
             st.error(f"Error executing query: {str(e)}")
             st.session_state.df = pd.DataFrame()
+            st.session_state.df_facets = None
+            st.session_state.pop('df_as_of', None)
+
+    # Keep a per-product acceptance history for the capacity forecast. Only
+    # today's view reflects current quantities, so past dates are not stored.
+    acceptance_day = as_of_date - datetime.timedelta(days=1)
+    if (
+        not st.session_state.df.empty
+        and as_of_date == today_utc()
+        and not history_store.has_partition(PT_HISTORY_DATASET, acceptance_day)
+    ):
+        history_store.write_partition(PT_HISTORY_DATASET, acceptance_day, history_rows(st.session_state.df))
 
     if not st.session_state.df.empty:
         st.subheader("Filters")
+        # Options and counts come from the facet index built when the data
+        # loaded; each dropdown counts rows under the other dropdown's choice
+        facets = st.session_state.df_facets
+        selections = {
+            'product_platform': st.session_state.get('pt_platform_filter'),
+            'project_name': st.session_state.get('pt_project_filter'),
+        }
         col1, col2 = st.columns(2)
         
         with col1:
-            unique_platforms = sorted(st.session_state.df['product_platform'].dropna().unique().tolist())
-            platform_options = ["All"] + unique_platforms
-            product_platform_filter = st.selectbox("Filter by Product Platform:", platform_options)
+            platform_counts = facets.counts('product_platform', selections)
+            platform_options = ["All"] + facets.options('product_platform', selections, hide_empty=True, counts=platform_counts)
+            product_platform_filter = st.selectbox(
+                "Filter by Product Platform:", platform_options, key="pt_platform_filter",
+                format_func=lambda v: format_option(v, platform_counts)
+            )
         
         with col2:
-            unique_project_names = sorted(st.session_state.df['project_name'].dropna().unique().tolist())
-            project_options = ["All"] + unique_project_names
-            project_name_filter = st.selectbox("Filter by Project Name:", project_options)
-        
-        filtered_df = st.session_state.df.copy()
-        
-        if product_platform_filter and product_platform_filter != "All":
-            filtered_df = filtered_df[
-                filtered_df['product_platform'] == product_platform_filter
-            ]
+            project_counts = facets.counts('project_name', selections)
+            project_options = ["All"] + facets.options('project_name', selections, hide_empty=True, counts=project_counts)
+            project_name_filter = st.selectbox(
+                "Filter by Project Name:", project_options, key="pt_project_filter",
+                format_func=lambda v: format_option(v, project_counts)
+            )
         
-        if project_name_filter and project_name_filter != "All":
-            filtered_df = filtered_df[
-                filtered_df['project_name'] == project_name_filter
-            ]
+        filtered_df = st.session_state.df[facets.mask({
+            'product_platform': product_platform_filter,
+            'project_name': project_name_filter,
+        })]
         
         filtered_df = filtered_df.reset_index(drop=True)
+        forecast_source = filtered_df
         
         # Sort by daily_limit in ascending order
         if 'daily_limit' in filtered_df.columns:
@@ -193,171 +399,96 @@ with tab1:
 
         st.markdown(f'<div class="fullwidth-table">{html_table}</div>', unsafe_allow_html=True)
 
-with tab2:
-    # 1) Simple query to get distinct content types (plus POP)
-    content_type_query = """
-    SELECT DISTINCT content_type
-    FROM `opa_hybrid.submission` s
-    LEFT JOIN opa_hybrid.deliverable d
-      ON s.deliverable_id = d.id
-    WHERE review_stage != 'PENDING'
-      AND DATE(JSON_VALUE(review_props, '$.created_at')) = CURRENT_DATE() - 1
-
-    UNION ALL
-
-    SELECT 'POP' AS content_type
-    """
-
-    # 2) Base query template where {pivot_cols} will be filled from Python
-    base_query = """
-    WITH subs AS (
-      SELECT
-        s.id AS subm_id,
-        collaboration_id,
-        deliverable_id,
-        s.created_at AS subm_date,
-        content_type,
-        review_stage,
-        review_props,
-        reviewed_by_agent_id
-      FROM opa_hybrid.submission s
-      LEFT JOIN opa_hybrid.deliverable d
-        ON s.deliverable_id = d.id
-      WHERE review_stage != 'PENDING'
-        AND DATE(JSON_VALUE(review_props, '$.created_at')) = CURRENT_DATE() - 1
-    ),
-    pop AS (
-      SELECT
-        c.id AS collaboration_id,
-        pop_props,
-        pop_review_props,
-        pop_review_stage,
-        CAST(JSON_VALUE(pop_review_props, '$.agent_id') AS INT64) AS agent_id
-      FROM opa_hybrid.collaboration c
-      LEFT JOIN opa_hybrid.campaign cam
-        ON c.campaign_id = cam.id
-      WHERE platform IN ('product_trials', 'instagram_and_product_trials')
-        AND pop_review_stage IN ('APPROVED', 'REJECTED')
-        AND DATE(JSON_VALUE(pop_review_props, '$.created_at')) = CURRENT_DATE() - 1
-    ),
-    agent AS (
-      SELECT
-        id AS agent_id,
-        CONCAT(given_name, ' ', family_name) AS name
-      FROM opa_hybrid.agent
-    ),
-    final_data AS (
-      SELECT
-        agent_name,
-        content_type,
-        breakup
-      FROM (
-        SELECT
-          name AS agent_name,
-          content_type,
-          CONCAT(
-            'Total : ',
-            submissions_rated,
-            CHR(10),
-            'APPROVED : ',
-            ROUND(approved / submissions_rated * 100, 0),
-            '%',
-            CHR(10),
-            'REJECTED : ',
-            ROUND(rejected / submissions_rated * 100, 0),
-            '%'
-          ) AS breakup
-        FROM (
-          SELECT
-            reviewed_by_agent_id AS agent_id,
-            name,
-            content_type,
-            COUNT(DISTINCT subm_id) AS submissions_rated,
-            COUNT(DISTINCT IF(review_stage = 'APPROVED', subm_id, NULL)) AS approved,
-            COUNT(DISTINCT IF(review_stage = 'REJECTED', subm_id, NULL)) AS rejected
-          FROM subs s
-          LEFT JOIN agent a
-            ON s.reviewed_by_agent_id = a.agent_id
-          GROUP BY 1, 2, 3
-        )
-        UNION ALL
-        SELECT
-          agent_name,
-          content_type,
-          CONCAT(
-            'Total : ',
-            pop_rated,
-            CHR(10),
-            'APPROVED : ',
-            ROUND(approved / pop_rated * 100, 0),
-            '%',
-            CHR(10),
-            'REJECTED : ',
-            ROUND(rejected / pop_rated * 100, 0),
-            '%'
-          ) AS breakup
-        FROM (
-          SELECT
-            name AS agent_name,
-            'POP' AS content_type,
-            COUNT(DISTINCT collaboration_id) AS pop_rated,
-            COUNT(DISTINCT IF(pop_review_stage = 'APPROVED', collaboration_id, NULL)) AS approved,
-            COUNT(DISTINCT IF(pop_review_stage = 'REJECTED', collaboration_id, NULL)) AS rejected
-          FROM pop p
-          LEFT JOIN agent a
-            ON p.agent_id = a.agent_id
-          GROUP BY 1, 2
-        )
-      )
-    )
-    SELECT *
-    FROM final_data
-    PIVOT (
-      ANY_VALUE(breakup)
-      FOR content_type IN ({pivot_cols})
-    )
-    ORDER BY agent_name
-    """
+        st.divider()
+        if st.toggle("📈 Capacity forecast", key="pt_forecast"):
+            forecast_start = acceptance_day - datetime.timedelta(days=FORECAST_WINDOW_DAYS - 1)
+            acceptance_history = history_store.read_range(PT_HISTORY_DATASET, forecast_start, acceptance_day)
+            forecast = forecast_capacity(forecast_source, acceptance_history, acceptance_day)
+
+            status_col, horizon_col = st.columns(2)
+            with status_col:
+                statuses = sorted(forecast['status'].unique().tolist())
+                status_filter = st.multiselect("Status:", statuses, default=statuses)
+            with horizon_col:
+                max_days = st.number_input("Exhausts within (days, 0 = any):", min_value=0, value=0, step=1)
+
+            forecast = forecast[forecast['status'].isin(status_filter)]
+            if max_days > 0:
+                forecast = forecast[forecast['days_to_exhaustion'] <= max_days]
+
+            st.caption(
+                f"Weighted daily acceptance rate over up to {FORECAST_WINDOW_DAYS} days of local history "
+                f"(history grows by one day each time today's tracker is loaded)"
+            )
+            st.dataframe(
+                forecast[[
+                    'rank', 'status', 'product_id', 'product_platform', 'project_name',
+                    'acceptance_rate', 'daily_limit', 'projected_fill_rate',
+                    'remaining_quantity', 'days_to_exhaustion', 'days_of_history'
+                ]],
+                use_container_width=True,
+                height=400,
+                hide_index=True
+            )
+
 
-    if 'df2' not in st.session_state:
+@st.fragment
+@timed("agent efficiency")
+def agent_efficiency_tracker(as_of_date, date_params):
+    """Agent efficiency tab; its widgets rerun only this fragment"""
+    # One long-format query (agent x content_type counts); the pivot and
+    # the alternative views below are computed locally from this result
+    if st.session_state.get('df2_as_of') != as_of_date:
         try:
             with st.spinner("Executing query..."):
-                # First query: get dynamic list of content types
-                ct_df = query_bigquery(content_type_query)
-
-                if ct_df.empty or 'content_type' not in ct_df.columns:
-                    st.warning("No content types found for the given date.")
-                    st.session_state.df2 = pd.DataFrame()
+                st.session_state.df2_long = cached_query(agent_efficiency_query, date_params)
+                st.session_state.df2 = pivot_breakup(st.session_state.df2_long)
+                st.session_state.df2_facets = FacetIndex(st.session_state.df2_long, ['agent_name'], measures=['rated'])
+                st.session_state.df2_as_of = as_of_date
+                st.session_state.pop('agent_name_filter', None)
+                if st.session_state.df2.empty:
+                    st.warning("No reviews found for the given date.")
                 else:
-                    # Build the pivot column list like: 'image' AS image, 'POP' AS POP, ...
-                    pivot_parts = []
-                    for ct in ct_df['content_type'].dropna().unique():
-                        ct_str = str(ct)
-                        alias = re.sub(r'[^a-zA-Z0-9]', '_', ct_str)
-                        pivot_parts.append(f"'{ct_str}' AS {alias}")
-                    pivot_cols_sql = ", ".join(pivot_parts)
-
-                    final_query = base_query.format(pivot_cols=pivot_cols_sql)
-                    st.session_state.df2 = query_bigquery(final_query)
-
-                st.success(f"Query executed successfully! Found {len(st.session_state.df2)} rows.")
+                    st.success(f"Query executed successfully! Found {len(st.session_state.df2)} rows.")
         except Exception as e:
             st.error(f"Error executing query: {str(e)}")
+            st.session_state.df2_long = pd.DataFrame()
             st.session_state.df2 = pd.DataFrame()
+            st.session_state.df2_facets = None
+            st.session_state.pop('df2_as_of', None)
     
     if not st.session_state.df2.empty:
         st.subheader("Filters")
         
-        unique_agents = sorted(st.session_state.df2['agent_name'].dropna().unique().tolist())
-        agent_options = ["All"] + unique_agents
-        agent_name_filter = st.selectbox("Filter by Agent Name:", agent_options)
+        view_col, agent_col = st.columns(2)
+        with view_col:
+            view = st.radio(
+                "View:",
+                ["Agent × content type", "By agent", "By content type"],
+                horizontal=True
+            )
+        with agent_col:
+            # Counts are reviews per agent for the day
+            agent_facets = st.session_state.df2_facets
+            agent_counts = agent_facets.counts('agent_name', measure='rated')
+            agent_options = ["All"] + agent_facets.options('agent_name')
+            agent_name_filter = st.selectbox(
+                "Filter by Agent Name:", agent_options, key="agent_name_filter",
+                format_func=lambda v: format_option(v, agent_counts)
+            )
         
-        filtered_df2 = st.session_state.df2.copy()
+        long_df = st.session_state.df2_long[agent_facets.mask({'agent_name': agent_name_filter})]
         
-        if agent_name_filter and agent_name_filter != "All":
-            filtered_df2 = filtered_df2[
-                filtered_df2['agent_name'] == agent_name_filter
-            ]
+        if view == "By agent":
+            filtered_df2 = totals_by(long_df, 'agent_name')
+        elif view == "By content type":
+            filtered_df2 = totals_by(long_df, 'content_type')
+        else:
+            filtered_df2 = st.session_state.df2
+            if agent_name_filter and agent_name_filter != "All":
+                filtered_df2 = filtered_df2[
+                    filtered_df2['agent_name'] == agent_name_filter
+                ]
         
         filtered_df2 = filtered_df2.reset_index(drop=True)
 
@@ -408,105 +539,94 @@ with tab2:
 
         st.markdown(f'<div class="fullwidth-table">{html_table}</div>', unsafe_allow_html=True)
 
-with tab3:
-    sample_query = """
-   WITH subs AS (
-  SELECT
-    s.id AS subm_id,
-    collaboration_id,
-    deliverable_id,
-    s.created_at AS subm_date,
-    content_type,
-    CASE WHEN JSON_VALUE(cam.extras, '$.is_auto_review_enabled') = 'true' THEN True ELSE false END as auto_review,
-  FROM opa_hybrid.submission s
-  LEFT JOIN opa_hybrid.deliverable d
-  ON s.deliverable_id = d.id
-  LEFT JOIN opa_hybrid.campaign cam
-  ON s.campaign_id = cam.id
-  WHERE review_stage = 'PENDING'
-  AND stage in ("LIVE", "PAUSED")
-),
-pop AS (
-  SELECT
-    c.id AS collaboration_id,
-  FROM opa_hybrid.collaboration c
-  LEFT JOIN opa_hybrid.campaign cam
-  ON c.campaign_id = cam.id
-  WHERE platform IN ('product_trials', 'instagram_and_product_trials')
-  AND pop_review_stage = "PENDING"
-  AND stage in ("LIVE", "PAUSED")
-)
-SELECT * FROM (
-  SELECT content_type, 
-    COUNT(DISTINCT IF(content_type = 'review' AND subs.auto_review = TRUE, subm_id, null)) as auto_submissions,
-    COUNT(DISTINCT IF((subs.auto_review = FALSE) OR (content_type != 'review' AND subs.auto_review = FALSE) OR (content_type = 'review' AND subs.auto_review = FALSE), subm_id, null)) as manual_submission_pending,
-  from subs
-  GROUP BY 1
-)
-UNION ALL(
-  SELECT 'POP' as content_type,
-  0 as auto_submissions,
-  COUNT(DISTINCT collaboration_id) as Manual_submission_pending
-  FROM pop
-  GROUP BY 1
-)
-"""
-    
-    if 'df3' not in st.session_state:
+    st.divider()
+    if st.toggle("📈 Show 7/30-day trends", key="agent_trends"):
+        trend_window = st.selectbox("Trend window (days):", [7, 30], index=1)
+        # Partitions are keyed by review day, which is the day before as_of_date
+        trend_end = as_of_date - datetime.timedelta(days=1)
+        trend_start = trend_end - datetime.timedelta(days=trend_window - 1)
         try:
-            with st.spinner("Executing query..."):
-                st.session_state.df3 = query_bigquery(sample_query)
-                st.success(f"Query executed successfully! Found {len(st.session_state.df3)} rows.")
+            missing = history_store.missing_dates("agent_efficiency", trend_start, trend_end)
+            # Backfill threads have no session, so pass it on for the per-session cap
+            session_owner = current_owner()
+            with st.spinner(f"Backfilling {len(missing)} day(s) of agent history..."):
+                history_store.ensure_range(
+                    "agent_efficiency", trend_start, trend_end,
+                    lambda day: query_bigquery(
+                        agent_efficiency_query,
+                        {"as_of_date": day + datetime.timedelta(days=1)},
+                        priority=BACKGROUND,
+                        owner=session_owner
+                    )
+                )
+            history = history_store.read_range("agent_efficiency", trend_start, trend_end)
+
+            daily = daily_totals(history, ["rated", "approved", "rejected"], trend_start, trend_end)
+            daily["rolling_7d_avg"] = daily["rated"].rolling(7, min_periods=1).mean().round(1)
+            st.write("**Reviews per day (all agents)**")
+            st.line_chart(daily[["rated", "rolling_7d_avg"]])
+
+            st.write("**Agent throughput**")
+            windows = (7, 30) if trend_window >= 30 else (7,)
+            st.dataframe(agent_throughput(history, trend_end, windows), use_container_width=True, height=400)
         except Exception as e:
-            st.error(f"Error executing query: {str(e)}")
-            st.session_state.df3 = pd.DataFrame()
+            st.error(f"Error loading agent history: {str(e)}")
+
+
+@st.fragment
+@timed("pending evals")
+def pending_evals_tab():
+    """Daily pending evals tab; its widgets rerun only this fragment"""
+    live_mode = st.toggle("🔴 Live mode (auto-refresh)", key="pending_live")
     
-    if not st.session_state.df3.empty:
-        filtered_df3 = st.session_state.df3.reset_index(drop=True)
-        
-        st.write(f"Showing {len(filtered_df3)} rows")
-        
-        # Render with HTML so that line breaks are respected reliably
-        html_table = filtered_df3.to_html(escape=False).replace("\\n", "<br>")
-        
-        st.markdown(
-            """
-            <style>
-            .fullwidth-table {
-                max-height: 70vh;
-                overflow-y: auto;
-                overflow-x: auto;
-            }
-            .fullwidth-table table {
-                width: 100%;
-                border-collapse: collapse;
-            }
-            .fullwidth-table th,
-            .fullwidth-table td {
-                padding: 0.25rem 0.75rem;
-                text-align: center;
-                vertical-align: top;
-                white-space: pre-wrap;
-                word-wrap: break-word;
-            }
-            .fullwidth-table th {
-                background-color: #3a3a3a;
-                font-weight: 600;
-                position: sticky;
-                top: 0;
-                z-index: 10;
-            }
-            .fullwidth-table a {
-                color: #1f77b4 !important;
-                text-decoration: underline;
-                font-weight: 500;
-            }
-            .fullwidth-table a:hover {
-                color: #0d5a9e !important;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
+    if live_mode:
+        live_pending_evals(get_pending_monitor(pending_evals_query))
+    else:
+        if 'df3' not in st.session_state:
+            try:
+                with st.spinner("Executing query..."):
+                    st.session_state.df3 = shared_query(pending_evals_query, fresh_s=PENDING_CACHE_TTL_S, stale_s=0)
+                    # Pending counts are a live snapshot and cannot be backfilled;
+                    # keep the latest snapshot of each day for the backlog trend
+                    history_store.write_partition("pending_evals", today_utc(), st.session_state.df3)
+                    st.success(f"Query executed successfully! Found {len(st.session_state.df3)} rows.")
+            except Exception as e:
+                st.error(f"Error executing query: {str(e)}")
+                st.session_state.df3 = pd.DataFrame()
         
-        st.markdown(f'<div class="fullwidth-table">{html_table}</div>', unsafe_allow_html=True)
+        if not st.session_state.df3.empty:
+            st.write(f"Showing {len(st.session_state.df3)} rows")
+            render_pending_table(st.session_state.df3)
+
+    st.divider()
+    if st.toggle("📈 Show backlog trend", key="backlog_trend"):
+        backlog_start = today_utc() - datetime.timedelta(days=29)
+        backlog = history_store.read_range("pending_evals", backlog_start, today_utc())
+        if backlog.empty:
+            st.info("No backlog history yet. A snapshot is stored each day this tab is opened.")
+        else:
+            backlog_daily = daily_totals(
+                backlog, ["auto_submissions", "manual_submission_pending"], backlog_start, today_utc()
+            )
+            # Days without a snapshot are gaps, not zero backlog
+            recorded = pd.DatetimeIndex(backlog["date"].unique())
+            backlog_daily = backlog_daily[backlog_daily.index.isin(recorded)]
+            st.write("**Pending evaluations (30 days)**")
+            st.line_chart(backlog_daily)
+
+
+# Each tab is a fragment: widget changes inside a tab rerun only that tab
+with tab1:
+    pt_order_tracker(as_of_date, date_params)
+
+with tab2:
+    agent_efficiency_tracker(as_of_date, date_params)
+
+with tab3:
+    pending_evals_tab()
+
+render_timings()
+render_queue_status()
+render_scan_usage()
+render_prewarm_status(prewarmer)
+record(FULL_RUN, run_started)
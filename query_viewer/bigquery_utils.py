@@ -1,22 +1,11 @@
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import streamlit as st
+"""
+BigQuery utility functions for the query viewer.
 
-_client = None
-
-def get_bigquery_client():
-    global _client
-    if _client is None:
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"]
-        )
-        _client = bigquery.Client(
-            credentials=credentials,
-            project=credentials.project_id,
-        )
-    return _client
-
-def query_bigquery(query):
-    client = get_bigquery_client()
-    df = client.query(query).to_dataframe()
-    return df
+The client, scheduler, scan budgets and caches are shared with the dashboard
+(see dashboard_common/warehouse.py); the viewer's queries live in app.py.
+"""
+from dashboard_common.warehouse import (  # noqa: F401 (re-exported for the app)
+    get_bigquery_client, today_utc, query_bigquery, shared_query, cached_query, estimate_query_bytes,
+    current_owner, count_script_run, render_queue_status, render_scan_estimate, render_scan_usage,
+    scheduler, scan_ledger, shared_cache, INTERACTIVE, BACKGROUND, QUERY_CACHE_TTL_S, LOCAL_CACHE_TTL_S
+)
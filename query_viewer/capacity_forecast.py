@@ -0,0 +1,124 @@
+"""
+Daily-capacity forecast for the PT order tracker.
+
+For every live product, estimates the daily acceptance rate from a short
+acceptance history and derives days until the remaining quantity is used up
+and how much of the daily limit will be filled. All products are forecast at
+once with array math; the history is one row per product per day in the
+local history store.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+HISTORY_DATASET = "pt_acceptances"
+
+KEY_COLUMNS = ["product_id", "product_platform"]
+HISTORY_COLUMNS = KEY_COLUMNS + ["accepted", "daily_limit", "total_acceptances", "total_quantity"]
+
+# Days of history used and how fast older days lose weight
+FORECAST_WINDOW_DAYS = 7
+HALFLIFE_DAYS = 3.0
+
+# Status thresholds
+EXHAUSTION_HORIZON_DAYS = 3
+UNDERFILL_THRESHOLD = 0.5
+
+STATUS_EXHAUSTING = "⚠️ Exhausts soon"
+STATUS_UNDERFILLING = "🐢 Underfilling"
+STATUS_NO_DEMAND = "⏸️ No acceptances"
+STATUS_ON_TRACK = "✅ On track"
+
+
+def history_rows(pt_df: pd.DataFrame) -> pd.DataFrame:
+    """One day's history rows from the PT tracker result (accepted_yesterday → accepted)"""
+    rows = pt_df[KEY_COLUMNS].copy()
+    rows["accepted"] = pd.to_numeric(pt_df["accepted_yesterday"], errors="coerce").fillna(0)
+    for column in ["daily_limit", "total_acceptances", "total_quantity"]:
+        rows[column] = pd.to_numeric(pt_df[column], errors="coerce").fillna(0)
+    return rows
+
+
+def acceptance_matrix(
+    products: pd.DataFrame,
+    history: pd.DataFrame,
+    end: datetime.date,
+    window: int = FORECAST_WINDOW_DAYS
+) -> np.ndarray:
+    """
+    (products x window) daily acceptances, oldest day first; NaN where no
+    history was recorded.
+    """
+    matrix = np.full((len(products), window), np.nan)
+    if history.empty:
+        return matrix
+    product_index = pd.MultiIndex.from_frame(products[KEY_COLUMNS].astype(str))
+    rows = product_index.get_indexer(pd.MultiIndex.from_frame(history[KEY_COLUMNS].astype(str)))
+    age = (pd.Timestamp(end) - pd.to_datetime(history["date"])).dt.days.to_numpy()
+    valid = (rows >= 0) & (age >= 0) & (age < window)
+    matrix[rows[valid], window - 1 - age[valid]] = history["accepted"].to_numpy(dtype=float)[valid]
+    return matrix
+
+
+def forecast_capacity(
+    products: pd.DataFrame,
+    history: pd.DataFrame,
+    end: datetime.date,
+    window: int = FORECAST_WINDOW_DAYS,
+    halflife: float = HALFLIFE_DAYS
+) -> pd.DataFrame:
+    """
+    Forecast every product in one vectorized pass.
+
+    Args:
+        products: Current PT tracker rows (see `history_rows` for the columns used)
+        history: Stored history rows with a `date` column
+        end: Most recent day of acceptances
+        window: Days of history used
+        halflife: Days after which a day's weight halves
+
+    Returns:
+        `products` with acceptance rate, days to exhaustion, projected fill
+        rate, status and rank columns, sorted by urgency
+    """
+    current = history_rows(products)
+    accepted = acceptance_matrix(products, history, end, window)
+    # Today's result always fills the most recent day
+    accepted[:, -1] = current["accepted"].to_numpy()
+
+    age = np.arange(window - 1, -1, -1)
+    weights = np.broadcast_to(0.5 ** (age / halflife), accepted.shape)
+    observed = ~np.isnan(accepted)
+    rate = np.nansum(accepted * weights, axis=1) / np.sum(weights * observed, axis=1)
+
+    remaining = np.clip(current["total_quantity"].to_numpy() - current["total_acceptances"].to_numpy(), 0, None)
+    daily_limit = current["daily_limit"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_to_exhaustion = np.where(rate > 0, remaining / rate, np.inf)
+        # daily_limit 0 means unlimited, so there is nothing to fill
+        fill_rate = np.where(daily_limit > 0, rate / daily_limit, np.nan)
+
+    status = np.select(
+        [
+            days_to_exhaustion <= EXHAUSTION_HORIZON_DAYS,
+            rate == 0,
+            fill_rate < UNDERFILL_THRESHOLD,
+        ],
+        [STATUS_EXHAUSTING, STATUS_NO_DEMAND, STATUS_UNDERFILLING],
+        default=STATUS_ON_TRACK
+    )
+
+    forecast = products.copy()
+    forecast["days_of_history"] = observed.sum(axis=1)
+    forecast["acceptance_rate"] = np.round(rate, 2)
+    forecast["remaining_quantity"] = remaining
+    forecast["days_to_exhaustion"] = np.round(days_to_exhaustion, 1)
+    forecast["projected_fill_rate"] = np.round(fill_rate, 2)
+    forecast["status"] = status
+
+    # Soonest exhaustion first, then the worst-filled daily limits
+    order = np.lexsort((np.nan_to_num(fill_rate, nan=np.inf), days_to_exhaustion))
+    forecast = forecast.iloc[order].reset_index(drop=True)
+    forecast.insert(0, "rank", np.arange(1, len(forecast) + 1))
+    return forecast
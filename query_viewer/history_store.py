@@ -0,0 +1,140 @@
+"""
+Local date-partitioned history of daily aggregates.
+
+Each dataset is stored as one Parquet file per day:
+
+    history/<dataset>/date=YYYY-MM-DD/part-0.parquet
+
+Trend views read their range from local partitions and only query the
+warehouse for days that are missing, so a 30-day trend costs one day's
+query once the history exists. Missing days are backfilled in parallel.
+"""
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+HISTORY_DIR = os.environ.get(
+    "HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "history")
+)
+
+# Concurrent warehouse queries during a backfill
+BACKFILL_WORKERS = 4
+
+
+def date_range(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    """Every date from start to end, inclusive"""
+    return [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class HistoryStore:
+    def __init__(self, root: str = HISTORY_DIR):
+        self.root = root
+
+    def partition_path(self, dataset: str, day: datetime.date) -> str:
+        return os.path.join(self.root, dataset, f"date={day.isoformat()}", "part-0.parquet")
+
+    def has_partition(self, dataset: str, day: datetime.date) -> bool:
+        return os.path.exists(self.partition_path(dataset, day))
+
+    def partitions(self, dataset: str) -> List[datetime.date]:
+        """Dates stored for `dataset`, sorted"""
+        directory = os.path.join(self.root, dataset)
+        if not os.path.isdir(directory):
+            return []
+        days = []
+        for name in os.listdir(directory):
+            if name.startswith("date=") and os.path.exists(os.path.join(directory, name, "part-0.parquet")):
+                days.append(datetime.date.fromisoformat(name[len("date="):]))
+        return sorted(days)
+
+    def missing_dates(self, dataset: str, start: datetime.date, end: datetime.date) -> List[datetime.date]:
+        return [day for day in date_range(start, end) if not self.has_partition(dataset, day)]
+
+    def write_partition(self, dataset: str, day: datetime.date, df: pd.DataFrame):
+        """Write (or replace) one day; atomic so readers never see a partial file"""
+        path = self.partition_path(dataset, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{id(df)}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def read_range(
+        self,
+        dataset: str,
+        start: datetime.date,
+        end: datetime.date,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """All stored rows between start and end (inclusive), with a `date` column"""
+        frames = []
+        for day in date_range(start, end):
+            path = self.partition_path(dataset, day)
+            if os.path.exists(path):
+                frame = pd.read_parquet(path, columns=columns)
+                frame.insert(0, "date", pd.Timestamp(day))
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=["date"] + (columns or []))
+        return pd.concat(frames, ignore_index=True)
+
+    def ensure_range(
+        self,
+        dataset: str,
+        start: datetime.date,
+        end: datetime.date,
+        fetch: Callable[[datetime.date], pd.DataFrame],
+        max_workers: int = BACKFILL_WORKERS
+    ) -> List[datetime.date]:
+        """
+        Fetch and store every missing day in the range, in parallel.
+
+        Args:
+            dataset: Dataset name
+            start, end: Inclusive date range
+            fetch: Returns the aggregate rows for one day (runs in worker threads)
+            max_workers: Concurrent fetches
+
+        Returns:
+            The dates that were fetched
+        """
+        missing = self.missing_dates(dataset, start, end)
+        if not missing:
+            return []
+
+        def backfill(day):
+            self.write_partition(dataset, day, fetch(day))
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            # list() re-raises the first fetch error, if any
+            list(pool.map(backfill, missing))
+        return missing
+
+
+def daily_totals(history: pd.DataFrame, columns: List[str], start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    """Per-day sums of `columns`, with zero-filled gaps, indexed by date"""
+    index = pd.DatetimeIndex([pd.Timestamp(d) for d in date_range(start, end)], name="date")
+    if history.empty:
+        return pd.DataFrame(0, index=index, columns=columns)
+    return history.groupby("date")[columns].sum().reindex(index, fill_value=0)
+
+
+def agent_throughput(history: pd.DataFrame, end: datetime.date, windows=(7, 30)) -> pd.DataFrame:
+    """Reviews and approval rate per agent over trailing windows ending at `end`"""
+    if history.empty:
+        return pd.DataFrame(columns=["agent_name"])
+    end_ts = pd.Timestamp(end)
+    result = None
+    for window in windows:
+        in_window = history[history["date"] > end_ts - pd.Timedelta(days=window)]
+        totals = in_window.groupby("agent_name")[["rated", "approved"]].sum()
+        summary = pd.DataFrame({
+            f"reviews_{window}d": totals["rated"],
+            f"per_day_{window}d": (totals["rated"] / window).round(1),
+            f"approved_pct_{window}d": (totals["approved"] / totals["rated"] * 100).round(0),
+        })
+        result = summary if result is None else result.join(summary, how="outer")
+    return result.fillna(0).sort_values(f"reviews_{windows[0]}d", ascending=False).reset_index()
@@ -0,0 +1,166 @@
+"""
+Live monitor for the pending-evals backlog.
+
+One background poller per process serves every session. On each poll it runs
+a cheap change probe (pending counts, the latest submission time, and the
+campaign stages, auto-review flags and last campaign / deliverable edits the
+backlog is grouped by); the full backlog aggregate is re-run only when the
+probe result changes, and at least every FULL_REFRESH_EVERY probes in case a
+change the probe cannot see slipped through.
+Sessions read the latest snapshot from memory, so the live view costs no
+queries per session.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+import pandas as pd
+
+pending_probe_query = """
+SELECT
+  (SELECT AS STRUCT
+     COUNTIF(review_stage = 'PENDING') AS pending,
+     MAX(created_at) AS latest_created_at
+   FROM opa_hybrid.submission) AS submissions,
+  (SELECT AS STRUCT
+     COUNTIF(pop_review_stage = 'PENDING') AS pending
+   FROM opa_hybrid.collaboration) AS pop,
+  (SELECT AS STRUCT
+     COUNTIF(stage IN ('LIVE', 'PAUSED')) AS running,
+     COUNTIF(JSON_VALUE(extras, '$.is_auto_review_enabled') = 'true') AS auto_review,
+     MAX(updated_at) AS latest_updated_at
+   FROM opa_hybrid.campaign) AS campaigns,
+  (SELECT AS STRUCT
+     MAX(updated_at) AS latest_updated_at
+   FROM opa_hybrid.deliverable) AS deliverables
+"""
+
+POLL_INTERVAL_S = 60
+
+# Re-run the full aggregate after this many probes even if none saw a change
+FULL_REFRESH_EVERY = 10
+
+# Stop polling when no session has looked at the monitor for this long
+IDLE_TIMEOUT_S = 5 * 60
+
+
+class PendingEvalsMonitor:
+    """
+    Background poller with change detection.
+
+    Args:
+        run_query: Function executing SQL and returning a DataFrame
+        full_query: The backlog aggregate to refresh when something changed
+        probe_query: Cheap query whose result changes whenever the backlog can change
+        interval_s: Seconds between probes
+        idle_timeout_s: Pause polling after this long without readers
+        on_refresh: Called with the new snapshot after each full refresh
+        full_refresh_every: Probes after which the snapshot is refreshed regardless
+    """
+
+    def __init__(
+        self,
+        run_query: Callable[[str], pd.DataFrame],
+        full_query: str,
+        probe_query: str = pending_probe_query,
+        interval_s: float = POLL_INTERVAL_S,
+        idle_timeout_s: float = IDLE_TIMEOUT_S,
+        on_refresh: Optional[Callable[[pd.DataFrame], None]] = None,
+        full_refresh_every: int = FULL_REFRESH_EVERY
+    ):
+        self.run_query = run_query
+        self.full_query = full_query
+        self.probe_query = probe_query
+        self.interval_s = interval_s
+        self.idle_timeout_s = idle_timeout_s
+        self.on_refresh = on_refresh
+        self.full_refresh_every = full_refresh_every
+
+        self.snapshot: Optional[pd.DataFrame] = None
+        self.fingerprint = None
+        self.version = 0
+        self.refreshed_at: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.probes = 0
+        self.refreshes = 0
+        self._probes_since_refresh = 0
+
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_read = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+
+    def _fingerprint(self, probe: pd.DataFrame):
+        return tuple(str(v) for v in probe.iloc[0].tolist()) if not probe.empty else None
+
+    def poll_once(self) -> bool:
+        """Probe for changes and refresh the snapshot if needed; returns True if refreshed"""
+        with self._poll_lock:
+            try:
+                fingerprint = self._fingerprint(self.run_query(self.probe_query))
+                self.probes += 1
+                self._probes_since_refresh += 1
+                changed = (
+                    fingerprint != self.fingerprint
+                    or self.snapshot is None
+                    or self._probes_since_refresh >= self.full_refresh_every
+                )
+                if changed:
+                    snapshot = self.run_query(self.full_query)
+                    # A scheduled refresh that finds nothing new is not a change
+                    updated = self.snapshot is None or fingerprint != self.fingerprint or not snapshot.equals(self.snapshot)
+                    with self._lock:
+                        self.snapshot = snapshot
+                        self.fingerprint = fingerprint
+                        if updated:
+                            self.version += 1
+                            self.refreshed_at = time.time()
+                    self.refreshes += 1
+                    self._probes_since_refresh = 0
+                    if updated and self.on_refresh is not None:
+                        self.on_refresh(snapshot)
+                with self._lock:
+                    self.checked_at = time.time()
+                    self.error = None
+                return changed
+            except Exception as e:
+                with self._lock:
+                    self.error = str(e)
+                return False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            if time.monotonic() - self._last_read < self.idle_timeout_s:
+                self.poll_once()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pending-evals-monitor", daemon=True)
+                self._thread.start()
+
+    def latest(self) -> dict:
+        """Current state for display; starts the poller and does a first poll if needed"""
+        was_idle = time.monotonic() - self._last_read >= self.idle_timeout_s
+        self._last_read = time.monotonic()
+        self.start()
+        if was_idle:
+            self.refresh_now()
+        if self.snapshot is None:
+            self.poll_once()
+        with self._lock:
+            return {
+                "snapshot": self.snapshot,
+                "version": self.version,
+                "refreshed_at": self.refreshed_at,
+                "checked_at": self.checked_at,
+                "error": self.error,
+            }
+
+    def refresh_now(self):
+        """Wake the poller for an immediate probe"""
+        self._wake.set()
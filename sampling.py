@@ -0,0 +1,82 @@
+"""
+Approximate Summary counts from a sample of users.
+
+A sample holds every active users row of a random subset of users, each
+sampled independently with probability `fraction` (see
+`bigquery_utils.sample_predicate`). Counts over the sample are scaled up
+with the Horvitz-Thompson estimator. Its variance treats each
+user (all of their platform / execution type rows) as one sampled unit, so
+the interval stays honest for users counted on several platforms.
+"""
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import SummaryCounter
+
+# Two-sided 95% normal quantile
+Z_95 = 1.96
+
+
+class CountEstimate(NamedTuple):
+    estimate: int
+    low: int
+    high: int
+
+
+def estimate_total(mask: np.ndarray, units: np.ndarray, fraction: float, z: float = Z_95) -> CountEstimate:
+    """
+    Population count of the rows in `mask` with a confidence interval.
+
+    Args:
+        mask: Matching sample rows
+        units: Sampling unit (e.g. factorized user) of each sample row
+        fraction: Probability each unit was sampled with
+        z: Normal quantile of the interval
+    """
+    per_unit = np.bincount(units[mask], minlength=units.max() + 1 if len(units) else 0)
+    estimate = per_unit.sum() / fraction
+    variance = (1 - fraction) / fraction ** 2 * np.square(per_unit, dtype=float).sum()
+    margin = z * np.sqrt(variance)
+    return CountEstimate(
+        int(round(estimate)),
+        int(max(0.0, np.floor(estimate - margin))),
+        int(np.ceil(estimate + margin))
+    )
+
+
+class SampleCounter:
+    """
+    `SummaryCounter` over a user sample, answering with `CountEstimate`s.
+
+    Args:
+        sample: Active users rows of the sampled users
+        fraction: Probability each user was sampled with (e.g. 0.01)
+        key: User column
+    """
+
+    def __init__(self, sample: pd.DataFrame, fraction: float, key: str = "user_id"):
+        self.fraction = fraction
+        self.n_rows = len(sample)
+        self.n_units = sample[key].nunique()
+        self._counter = SummaryCounter(sample)
+        self._units, _ = pd.factorize(sample[key], use_na_sentinel=False)
+
+    def count(
+        self,
+        platform: Optional[str],
+        execution_types: Optional[List[str]],
+        gender: Optional[str] = None,
+        locations: Optional[List[str]] = None,
+        districts: Optional[List[str]] = None,
+        pincode_prefixes: Optional[List[str]] = None
+    ) -> CountEstimate:
+        """Estimated `summary_mask` row count of the full data"""
+        mask = self._counter.mask(platform, execution_types, gender, locations, districts, pincode_prefixes)
+        return estimate_total(mask, self._units, self.fraction)
+
+    def propensity_sum(self, *args, **kwargs) -> Optional[float]:
+        """Estimated sum of the full data's propensity scores over the `summary_mask` rows"""
+        total = self._counter.propensity_sum(*args, **kwargs)
+        return None if total is None else total / self.fraction
@@ -0,0 +1,30 @@
+"""
+Scoring constants shared by the dashboard, feasibility and prediction code.
+
+Kept free of heavy imports so the Streamlit app can load them without
+pulling in scikit-learn.
+"""
+
+PRODUCT_UTILITY_SCORE = {
+    "Utility": 3,
+    "Semi-Utility": 2,
+    "Non-Utility": 1
+}
+
+BRAND_SCORE = {
+    "Established": 3,
+    "Mid": 2,
+    "New": 1
+}
+
+PARTICIPATION_RATE_BY_SCORE = {
+    (7, 9): 0.80,
+    (5, 6): 0.55,
+    (3, 4): 0.30
+}
+
+PLATFORM_CONFIDENCE = {
+    ("Review", "Paid"): 0.90,
+    ("Instagram", "Paid"): 0.60,
+    ("Instagram", "Barter"): 0.40
+}
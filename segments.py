@@ -0,0 +1,133 @@
+"""
+Recency / frequency / completion / tenure segments of creators.
+
+The Summary Dashboard only knows "active" (accepted and completed in the
+last 180 days). `CreatorSegments` parses the activity dates of
+`creator_activity_query` into datetime64 arrays once and buckets every
+creator on four dimensions in one vectorized pass (a `searchsorted` per
+dimension):
+
+- recency: days since the last accepted collaboration
+- frequency: accepted collaborations
+- completion: completed / accepted collaborations
+- tenure: days since signup
+
+Each dimension is stored as int8 codes per creator, so a segment filter is
+a lookup table gathered at the rows' creators.
+"""
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# dimension -> (column(s) it is computed from, bin edges, labels, label when unknown)
+# A value v falls in labels[i] for edges[i - 1] <= v < edges[i]
+SEGMENT_BINS = {
+    "recency": ("last_accepted_on", [31, 91, 181], ["≤30 days", "31–90 days", "91–180 days", "180+ days"], "Never accepted"),
+    "frequency": ("accepted_collabs", [1, 2, 5, 20], ["None", "1", "2–4", "5–19", "20+"], "None"),
+    "completion": (("completed_collabs", "accepted_collabs"), [0.5, 0.8], ["<50%", "50–80%", "80%+"], "No collabs"),
+    "tenure": ("signup_date", [90, 365, 730], ["<90 days", "90 days–1 year", "1–2 years", "2+ years"], "Unknown"),
+}
+
+SEGMENT_LABELS = {
+    "recency": "Last accepted",
+    "frequency": "Accepted collabs",
+    "completion": "Completion rate",
+    "tenure": "Time since signup",
+}
+
+
+def _days(values, as_of_date: datetime.date) -> np.ndarray:
+    """Days from each date to `as_of_date` (NaN when missing or after `as_of_date`)"""
+    dates = pd.to_datetime(pd.Series(values, copy=False), errors="coerce").to_numpy("datetime64[D]")
+    days = (np.datetime64(as_of_date, "D") - dates).astype(float)
+    days[np.isnat(dates) | (days < 0)] = np.nan
+    return days
+
+
+def _bucket(values: np.ndarray, edges: List[float], labels: List[str], unknown: str) -> Tuple[np.ndarray, List[str]]:
+    """int8 codes into `categories` (labels, then `unknown` if it is not one of them)"""
+    categories = labels if unknown in labels else labels + [unknown]
+    codes = np.searchsorted(np.asarray(edges, dtype=float), values, side="right").astype(np.int8)
+    codes[np.isnan(values)] = categories.index(unknown)
+    return codes, categories
+
+
+class CreatorSegments:
+    """
+    Segment codes per creator.
+
+    Args:
+        activity: `creator_activity_query` rows (one per creator)
+        as_of_date: Date recency and tenure are measured from
+        key: Creator column
+    """
+
+    def __init__(self, activity: pd.DataFrame, as_of_date: datetime.date, key: str = "user_id"):
+        self.as_of_date = as_of_date
+        self.users = pd.Index(activity[key].to_numpy())
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        for dimension, (columns, edges, labels, unknown) in SEGMENT_BINS.items():
+            if isinstance(columns, tuple):
+                if not all(c in activity.columns for c in columns):
+                    continue
+                completed, accepted = (pd.to_numeric(activity[c], errors="coerce").to_numpy(float) for c in columns)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = np.where(accepted > 0, completed / accepted, np.nan)
+            elif columns not in activity.columns:
+                continue
+            elif columns.endswith(("_on", "_date")):
+                values = _days(activity[columns], as_of_date)
+            else:
+                values = pd.to_numeric(activity[columns], errors="coerce").to_numpy(float)
+            self.codes[dimension], self.categories[dimension] = _bucket(values, edges, labels, unknown)
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    @property
+    def dimensions(self) -> List[str]:
+        return list(self.codes)
+
+    def counts(self, dimension: str) -> pd.Series:
+        """Creators per segment of `dimension`, in label order"""
+        categories = self.categories[dimension]
+        return pd.Series(np.bincount(self.codes[dimension], minlength=len(categories)), index=categories)
+
+    def frame(self) -> pd.DataFrame:
+        """One row per creator with a categorical column per dimension"""
+        return pd.DataFrame(
+            {
+                dimension: pd.Categorical.from_codes(codes, self.categories[dimension])
+                for dimension, codes in self.codes.items()
+            },
+            index=self.users
+        )
+
+    def mask(self, user_ids, selection: Optional[Dict[str, List[str]]]) -> np.ndarray:
+        """
+        Rows whose creator is in one of the selected segments of every
+        dimension in `selection` (dimension -> labels). Creators without
+        activity only match unknown labels ("Never accepted", "Unknown", ...).
+        """
+        rows = self.users.get_indexer(pd.Index(user_ids))
+        mask = np.ones(len(rows), dtype=bool)
+        for dimension, labels in (selection or {}).items():
+            if not labels or dimension not in self.codes:
+                continue
+            categories = self.categories[dimension]
+            unknown = SEGMENT_BINS[dimension][3]
+            # One extra slot for rows whose creator has no activity row
+            allowed = np.zeros(len(categories) + 1, dtype=bool)
+            allowed[[categories.index(label) for label in labels]] = True
+            allowed[-1] = unknown in labels
+            codes = np.append(self.codes[dimension], np.int8(len(categories)))
+            mask &= allowed[codes[rows]]
+        return mask
+
+
+def describe_selection(selection: Optional[Dict[str, List[str]]]) -> str:
+    """e.g. "recency: ≤30 days, 31–90 days; frequency: 5–19" """
+    return "; ".join(f"{dimension}: {', '.join(labels)}" for dimension, labels in (selection or {}).items() if labels)
@@ -0,0 +1,129 @@
+"""
+Cold-start benchmark for the Streamlit apps.
+
+Imports each app module in a fresh interpreter with `python -X importtime`,
+reports wall-clock boot time and the heaviest imports grouped by top-level
+package, and fails if the median boot time exceeds the target.
+
+Usage:
+    python startup_benchmark.py                # app.py, 5 runs
+    python startup_benchmark.py --runs 10 --top 15
+
+`query_viewer/app.py` runs its queries at import time, so it is not a good
+`--module` target: the timing would include the (failed) warehouse calls.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Median time to import app.py in a fresh interpreter. Streamlit, pandas and
+# numpy take almost all of it (the app's own modules import in under 10 ms);
+# between runs of the same tree the median varies by about ±0.15s, so the
+# target leaves that much room. scikit-learn and the BigQuery client must not
+# be imported at boot.
+BOOT_TIME_TARGET_S = 1.25
+
+# Packages that should only load on first use
+LAZY_PACKAGES = ["sklearn", "scipy", "google.cloud.bigquery"]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _import_snippet(module_path: str) -> str:
+    """Python code importing the script at `module_path` without running main()"""
+    directory = os.path.dirname(os.path.abspath(module_path))
+    return (
+        "import importlib.util, sys\n"
+        f"sys.path.insert(0, {directory!r})\n"
+        f"spec = importlib.util.spec_from_file_location('_bench_app', {os.path.abspath(module_path)!r})\n"
+        "module = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(module)\n"
+    )
+
+
+def measure_boot(module_path: str) -> Tuple[float, str]:
+    """Import the app once in a fresh interpreter; return (seconds, importtime stderr)"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _import_snippet(module_path)],
+        capture_output=True,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"Importing {module_path} failed:\n{tail}")
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, self_us, cumulative_us) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def group_by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Sum self import time (us) per top-level package"""
+    totals = {}
+    for module, self_us, _ in rows:
+        package = module.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.py", help="App script to import (relative to repo root)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to list")
+    parser.add_argument("--target", type=float, default=BOOT_TIME_TARGET_S, help="Max median boot time (s)")
+    args = parser.parse_args(argv)
+
+    module_path = os.path.join(ROOT_DIR, args.module)
+    timings = []
+    stderr = ""
+    for _ in range(args.runs):
+        elapsed, stderr = measure_boot(module_path)
+        timings.append(elapsed)
+
+    rows = parse_importtime(stderr)
+    imported = {module for module, _, _ in rows}
+    by_package = sorted(group_by_package(rows).items(), key=lambda kv: kv[1], reverse=True)
+    total_us = sum(self_us for _, self_us, _ in rows)
+
+    median = statistics.median(timings)
+    print(f"📊 Boot time for {args.module} over {args.runs} runs: "
+          f"median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s")
+    print(f"   Import time (last run): {total_us / 1e6:.3f}s across {len(rows)} modules")
+    print()
+    print(f"{'package':<30}{'self ms':>10}{'share':>8}")
+    for package, self_us in by_package[:args.top]:
+        print(f"{package:<30}{self_us / 1000:>10.1f}{self_us / total_us:>8.1%}")
+    print()
+
+    eager = [p for p in LAZY_PACKAGES if p in imported]
+    if eager:
+        print(f"⚠️ Imported at boot but expected to be lazy: {', '.join(eager)}")
+
+    if median > args.target or eager:
+        print(f"❌ Boot time target not met (target {args.target:.2f}s)")
+        return 1
+    print(f"✅ Boot time within target ({args.target:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())